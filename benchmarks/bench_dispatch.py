@@ -0,0 +1,54 @@
+"""
+Route dispatch with each engine as the number of routes grows, and building paths
+"""
+
+from lexington.util import route
+
+import synthetic
+
+def cases(sizes):
+    for num_routes in sizes:
+        routes = route.Routes()
+        _, paths = synthetic.add_routes(routes, num_routes)
+        for engine in sorted(route.DISPATCHERS):
+            if engine == 'linear' and num_routes > 1000:
+                continue # Too slow to be interesting
+            routing = routes.get_routing(engine=engine)
+            for kind, path in sorted(paths.items()):
+                name = 'dispatch/{}/{}/{}'.format(engine, num_routes, kind)
+                yield name, lambda routing=routing, path=path: routing.path_to_route(path, 'GET')
+    yield from host_cases(sizes)
+    yield from build_cases()
+
+def host_cases(sizes):
+    """ A route for each of num_hosts tenant hosts, in front of a shared route table """
+    for num_hosts in sizes:
+        routes = route.Routes()
+        for i in range(num_hosts):
+            host = 'tenant{}.example.com'.format(i)
+            routes.add_route('home{}'.format(i), 'GET', '/', host=host)
+        _, paths = synthetic.add_routes(routes, 100)
+        routing = routes.get_routing()
+        host = 'tenant{}.example.com'.format(num_hosts - 1)
+        name = 'dispatch/hosts/{}'.format(num_hosts)
+        yield name + '/home', lambda routing=routing, host=host: (
+            routing.path_to_route('/', 'GET', host)
+        )
+        yield name + '/named', lambda routing=routing, path=paths['named'], host=host: (
+            routing.path_to_route(path, 'GET', host)
+        )
+
+def build_cases():
+    routes = route.Routes()
+    routes.add_route('item', 'GET', r'/section/{section:\w+}/items/{id:\d+}')
+    routing = routes.get_routing()
+    path = routes._routes[0].path
+    values = {'section': 'books', 'id': 1234}
+    many_values = [{'section': 'books', 'id': i} for i in range(100)]
+
+    yield 'build/Path.build_path', lambda: path.build_path(values)
+    yield 'build/route_to_path', lambda: routing.route_to_path('item', values)
+    yield 'build/route_to_path x100', lambda: [
+        routing.route_to_path('item', v) for v in many_values
+    ]
+    yield 'build/route_to_paths x100', lambda: routing.route_to_paths('item', many_values)
@@ -0,0 +1,59 @@
+"""
+Importing lexington in a fresh interpreter.
+
+The timed cases include starting the interpreter (compare them with 'import/python').
+Run this file directly to see the `python -X importtime` breakdown instead:
+
+    python benchmarks/bench_import.py [module]
+"""
+
+import os
+import subprocess
+import sys
+
+MODULES = ['lexington.util.di', 'lexington', 'lexington.asgi']
+
+def _environment():
+    # Make sure the subprocess finds the same lexington as this process
+    environment = dict(os.environ)
+    environment['PYTHONPATH'] = os.pathsep.join(sys.path)
+    return environment
+
+def _run(code, *options):
+    return subprocess.run(
+        [sys.executable, *options, '-c', code],
+        env=_environment(), check=True, capture_output=True, text=True
+    )
+
+def import_times(module):
+    """ Returns [(seconds including submodules, module name)] for everything loaded by
+    importing the module, slowest first
+    """
+    output = _run('import ' + module, '-X', 'importtime').stderr
+    times = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(times, reverse=True)
+
+def cases(sizes):
+    yield 'import/python', lambda: _run('pass')
+    for module in MODULES:
+        yield 'import/' + module, lambda module=module: _run('import ' + module)
+
+def main():
+    modules = sys.argv[1:] or MODULES
+    for module in modules:
+        times = import_times(module)
+        loaded = {name for _, name in times}
+        print('{}: {:.1f} ms{}'.format(
+            module, times[0][0] * 1000,
+            ' (loads werkzeug)' if 'werkzeug' in loaded else ''
+        ))
+        for seconds, name in times[1:11]:
+            print('  {:>8.1f} ms  {}'.format(seconds * 1000, name))
+
+if __name__ == '__main__':
+    main()
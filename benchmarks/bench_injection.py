@@ -0,0 +1,37 @@
+"""
+Building injectors and injecting views for dependency graphs of different shapes
+"""
+
+from lexington.util import di
+
+import synthetic
+
+GRAPH_SHAPES = [(1, 1), (1, 10), (10, 1), (10, 10)]
+
+def _make_dependencies(depth, width):
+    dependencies = di.Dependencies()
+    dependencies.register_late_bound_value('path')
+    ends = synthetic.add_dependencies(dependencies.register_factory, depth, width)
+    return dependencies, ends
+
+def cases(sizes):
+    for depth, width in GRAPH_SHAPES:
+        dependencies, ends = _make_dependencies(depth, width)
+        plan = dependencies.compile()
+        shape = '{}x{}'.format(depth, width)
+        values = {'path': '/'}
+
+        yield (
+            'injection/{}/Dependencies.build_injector'.format(shape),
+            lambda dependencies=dependencies: dependencies.build_injector(values)
+        )
+        yield (
+            'injection/{}/InjectorPlan.build_injector'.format(shape),
+            lambda plan=plan: plan.build_injector(values)
+        )
+        yield (
+            'injection/{}/build_and_inject'.format(shape),
+            lambda plan=plan, ends=ends: plan.build_injector(values).inject(
+                lambda *args: None, ends
+            )
+        )
@@ -0,0 +1,34 @@
+"""
+Building an application, with and without a snapshot of its validation
+"""
+
+import os
+import tempfile
+
+import lexington
+
+import synthetic
+
+APP_SHAPES = [(5, 5)]
+
+_snapshot_directory = tempfile.TemporaryDirectory()
+
+def _make_builder(num_routes, depth, width):
+    builder = lexington.app()
+    names, _ = synthetic.add_routes(builder, num_routes)
+    ends = synthetic.add_dependencies(builder.add_factory, depth, width)
+    for name in names:
+        builder.add_view_fn(name, lambda *values: 'ok', ends)
+    return builder
+
+def cases(sizes):
+    for num_routes in sizes:
+        for depth, width in APP_SHAPES:
+            name = 'startup/{}/{}x{}'.format(num_routes, depth, width)
+            builder = _make_builder(num_routes, depth, width)
+            yield name + '/create_app', builder.create_app
+
+            builder = _make_builder(num_routes, depth, width)
+            builder.use_snapshot(os.path.join(_snapshot_directory.name, name.replace('/', '_')))
+            builder.create_app() # saves the snapshot
+            yield name + '/create_app+snapshot', builder.create_app
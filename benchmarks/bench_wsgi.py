@@ -0,0 +1,38 @@
+"""
+Whole requests through Application.__call__
+"""
+
+from werkzeug.test import Client, EnvironBuilder
+
+from lexington.util.response_cache import ResponseCache
+
+import synthetic
+
+APP_SHAPES = [(1, 1), (5, 5)]
+
+def _start_response(status, headers):
+    pass
+
+def _call(app, environ):
+    app_iter = app(dict(environ), _start_response)
+    for chunk in app_iter:
+        pass
+    if hasattr(app_iter, 'close'):
+        app_iter.close()
+
+def cases(sizes):
+    for num_routes in sizes:
+        for depth, width in APP_SHAPES:
+            app, paths = synthetic.make_app(num_routes, depth, width)
+            client = Client(app)
+            for kind in ['named', 'miss']:
+                path = paths[kind]
+                name = 'wsgi/{}/{}x{}/{}'.format(num_routes, depth, width, kind)
+                environ = EnvironBuilder(path=path).get_environ()
+                yield name + '/call', lambda app=app, environ=environ: _call(app, environ)
+                yield name + '/client', lambda client=client, path=path: client.get(path)
+
+            app, paths = synthetic.make_app(num_routes, depth, width, ResponseCache())
+            environ = EnvironBuilder(path=paths['named']).get_environ()
+            name = 'wsgi/{}/{}x{}/cached/call'.format(num_routes, depth, width)
+            yield name, lambda app=app, environ=environ: _call(app, environ)
@@ -0,0 +1,63 @@
+"""
+Timing and allocation measurements, and comparison against a saved baseline
+"""
+
+import collections
+import json
+import timeit
+import tracemalloc
+
+Result = collections.namedtuple('Result', 'name ops_per_sec peak_bytes')
+
+def measure_speed(fn, min_time=0.2, repeat=3):
+    """ Returns the best calls per second for fn over several runs """
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return number / best
+
+def measure_peak_bytes(fn):
+    """ Returns the most memory allocated at once during one call of fn (after one
+    warm-up call, so that caches are already filled).
+    """
+    fn()
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - baseline
+
+def measure(name, fn, min_time=0.2):
+    return Result(name, measure_speed(fn, min_time), measure_peak_bytes(fn))
+
+def save(results, path):
+    with open(path, 'w') as f:
+        json.dump({result.name: result._asdict() for result in results}, f, indent=2)
+
+def load(path):
+    with open(path) as f:
+        return {name: Result(**values) for name, values in json.load(f).items()}
+
+def format_result(result, baseline=None):
+    line = '{:<55} {:>14,.0f} ops/s {:>10,} B'.format(
+        result.name, result.ops_per_sec, result.peak_bytes
+    )
+    if baseline is not None:
+        change = result.ops_per_sec / baseline.ops_per_sec - 1
+        line += '   {:>+7.1%} vs baseline'.format(change)
+    return line
+
+def regressions(results, baselines, threshold):
+    """ Returns the results that are more than `threshold` (a fraction) slower than
+    their baseline
+    """
+    return [
+        result for result in results
+        if result.name in baselines
+        and result.ops_per_sec < baselines[result.name].ops_per_sec * (1 - threshold)
+    ]
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Runs the benchmarks and optionally compares them with a saved baseline.
+
+Run with `src` on the PYTHONPATH (e.g. after `source activate_env`):
+
+    python benchmarks/run.py --save baseline.json
+    ... make changes ...
+    python benchmarks/run.py --compare baseline.json
+"""
+
+import argparse
+import sys
+
+import harness
+import bench_dispatch
+import bench_import
+import bench_injection
+import bench_startup
+import bench_wsgi
+
+SUITES = [bench_dispatch, bench_injection, bench_wsgi, bench_startup, bench_import]
+SIZES = [10, 100, 1000, 10000]
+QUICK_SIZES = [10, 100]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--filter', default='', help='only run benchmarks containing this')
+    parser.add_argument('--quick', action='store_true', help='only use small sizes')
+    parser.add_argument('--save', metavar='PATH', help='save the results as a baseline')
+    parser.add_argument('--compare', metavar='PATH', help='compare with a saved baseline')
+    parser.add_argument(
+        '--threshold', type=float, default=0.1,
+        help='fail if a benchmark is this much slower than the baseline (default 0.1)'
+    )
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    sizes = QUICK_SIZES if args.quick else SIZES
+    baselines = harness.load(args.compare) if args.compare else {}
+
+    results = []
+    for suite in SUITES:
+        for name, fn in suite.cases(sizes):
+            if args.filter not in name:
+                continue
+            result = harness.measure(name, fn)
+            results.append(result)
+            print(harness.format_result(result, baselines.get(name)), flush=True)
+
+    if args.save:
+        harness.save(results, args.save)
+
+    slower = harness.regressions(results, baselines, args.threshold)
+    if slower:
+        print('\n{} benchmark(s) slower than the baseline:'.format(len(slower)))
+        for result in slower:
+            print('  ' + result.name)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Builds synthetic routes, dependency graphs and applications of a given size
+"""
+
+import lexington
+
+def add_routes(target, num_routes):
+    """ Adds num_routes routes (half static, half with a named segment) to anything with
+    an `add_route(name, method, path_description)` method.
+
+    Returns (route names, paths), where the paths are for the last static route, the
+    last named route, and a miss.
+    """
+    names = []
+    half = max(1, num_routes // 2)
+    for i in range(half):
+        names += ['page{}'.format(i), 'item{}'.format(i)]
+        target.add_route(names[-2], 'GET', '/page{}/'.format(i))
+        target.add_route(names[-1], 'GET', r'/section{}/items/{{id:\d+}}'.format(i))
+    last = half - 1
+    return names, {
+        'static': '/page{}/'.format(last),
+        'named': '/section{}/items/1234'.format(last),
+        'miss': '/not/a/page',
+    }
+
+def add_dependencies(add_factory, depth, width):
+    """ Adds `width` chains of `depth` request-scoped factories, each starting from the
+    request path, using `add_factory(name, fn, dependencies)`.
+
+    Returns the names at the end of the chains.
+    """
+    ends = []
+    for chain in range(width):
+        previous = 'path'
+        for level in range(depth):
+            name = 'dep_{}_{}'.format(chain, level)
+            add_factory(name, lambda value: value, [previous])
+            previous = name
+        ends.append(previous)
+    return ends
+
+def make_app(num_routes, depth=1, width=1, response_cache=None):
+    """ Builds an application whose routes all use the same view, which depends on
+    every chain of factories. If a response cache is given, the views are cached by
+    their `id`.
+
+    Returns (application, paths).
+    """
+    builder = lexington.app()
+    names, paths = add_routes(builder, num_routes)
+    ends = add_dependencies(builder.add_factory, depth, width)
+    cache_vary = None
+    if response_cache is not None:
+        builder.set_response_cache(response_cache)
+        cache_vary = ['id']
+    for name in names:
+        builder.add_view_fn(name, lambda *values: 'ok', ends, cache_vary)
+    return builder.create_app(), paths
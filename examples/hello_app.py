@@ -1,29 +1,11 @@
 #!/usr/bin/env python
 
-import json
 import itertools
 import jinja2
 
 import lexington
 from lexington.util.view_map import view
 
-def jinja_loader():
-    return jinja2.PackageLoader('hello_app', 'templates')
-
-def jinja_env(loader):
-    return jinja2.Environment(loader=loader)
-
-def jinja_templates(jinja_env):
-    def get_template(name):
-        return jinja_env.get_template(name)
-    return get_template
-
-def template_responder(get_template, respond):
-    def jinja_respond(template_name, values):
-        text = get_template(template_name).render(**values)
-        return respond(text, mimetype='text/html')
-    return jinja_respond
-
 def content_factory():
     n = itertools.count(1)
     def content_fn():
@@ -40,29 +22,31 @@ def show_env(environ):
 
 @view('query', ['query'])
 def show_query(query):
-    return json.dumps(query)
+    # Dicts and lists are sent as JSON
+    return query.to_dict(flat=False)
+
+@view('greet', ['name', 'times'])
+def greet(name, times):
+    return 'Hello, {}!\n'.format(name) * times
 
 @view('post', ['request'])
 def show_post(request):
     return '{}\n{}\n'.format(request, request.form)
 
-@view('show-name', ['request', 'jinja_respond'])
-def show_name(request, jinja_respond):
-    return jinja_respond('show-name.html', {
+@view('show-name', ['request', 'render'])
+def show_name(request, render):
+    return render('show-name.html', {
         'name': request.form.get('name'),
     })
 
-@view('set-name', ['jinja_respond'])
-def set_name(jinja_respond):
-    return jinja_respond('set-name.html', {})
+@view('set-name', ['render'])
+def set_name(render):
+    return render('set-name.html', stream=True)
 
 def create_app():
     builder = lexington.app()
 
-    builder.add_factory('jinja_loader', jinja_loader, [])
-    builder.add_factory('jinja_env', jinja_env, ['jinja_loader'])
-    builder.add_factory('get_template', jinja_templates, ['jinja_env'])
-    builder.add_factory('jinja_respond', template_responder, ['get_template', 'respond'])
+    builder.add_templates(jinja2.PackageLoader('hello_app', 'templates'), precompile=True)
     builder.add_value('content', content_factory())
 
     builder.add_route('index', 'GET', '/')
@@ -74,6 +58,9 @@ def create_app():
     builder.add_route('query', 'GET', '/query')
     builder.add_view(show_query)
 
+    builder.add_route('greet', 'GET', '/greet/{name}/{times:int}')
+    builder.add_view(greet)
+
     builder.add_route('no_view', 'GET', '/no-view')
 
     builder.add_route('post', 'POST', '/post')
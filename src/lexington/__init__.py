@@ -1,20 +1,40 @@
-import collections
-
-from werkzeug.wrappers import Response
+# werkzeug is only imported once an application is created (or a request is
+# handled), so that tools which only need (for example) the DI container start quickly
+import types
 
+from lexington.exceptions import LexingtonException
 from lexington.util import di
 from lexington.util import route
 from lexington.util import view_map
 from lexington.util import paths
 
+# Shared by every request to a route without named segments
+_NO_PATH_PARAMS = types.MappingProxyType({})
+
+def __getattr__(name):
+    # Keeps `lexington.Response` working without importing werkzeug up front
+    if name == 'Response':
+        return _response_class()
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+def _response_class():
+    from werkzeug.wrappers import Response
+    return Response
+
 def default_dependencies(settings):
     dependencies = di.Dependencies()
     dependencies.register_value('settings', settings)
-    dependencies.register_value('respond', Response)
+    dependencies.register_factory('respond', _response_class, scope=di.SINGLETON)
     dependencies.register_late_bound_value('environ')
+    dependencies.register_late_bound_value('path_params')
     paths.register_all(dependencies)
     return dependencies
 
+def serve(app_factory, host='localhost', port=5050, workers=None):
+    """ Serves the application from several worker processes (see `serving.serve`) """
+    from lexington.serving import serve
+    serve(app_factory, host, port, workers)
+
 def app():
     """
     Helper function to construct the application factory(!)
@@ -31,14 +51,87 @@ class ApplicationFactory:
         self._dependencies = dependencies
         self._views = views
         self._routes = routes
+        self._routing_options = {}
+        self._injector_class = None
+        self._instrumentation = None
+        # route name -> the names of its segments
+        self._segment_names = {}
+        # The segment names registered as dependencies
+        self._path_param_names = set()
+        self._snapshot_path = None
+        self._response_cache = None
+        self._response_filters = []
+        self._json_serializer = None
+
+    def add_route(self, route_name, method, path_description, host=None,
+                  content_type=None):
+        """ Adds a route. Each named segment in the path ({id:int}, {slug}, ...) becomes a
+        dependency holding the converted value (or None for routes without it), unless
+        something else already provides that name (like `path` or `host`). The value
+        of any segment is also in the `path_params` dict.
+
+        host         - only match requests for this host. A host like
+                       {tenant}.example.com matches any subdomain of example.com, and
+                       makes `tenant` a named segment.
+        content_type - only match requests whose body has this Content-Type
+        """
+        added = self._routes.add_route(
+            route_name, method, path_description, host, content_type
+        )
+        names = added.path.get_names()
+        if host is not None:
+            subdomain_name = route.parse_host(host)[0]
+            if subdomain_name is not None:
+                names.append(subdomain_name)
+        self._segment_names[route_name] = names
+
+    def add_converter(self, name, pattern, to_python, to_url=str):
+        """ Adds a converter that routes added afterwards can use as {segment:name} """
+        self._routes.add_converter(name, pattern, to_python, to_url)
+
+    def _add_path_params(self):
+        """ Registers the named segments that nothing else provides as dependencies """
+        provided = self._dependencies.provided_dependencies()
+        for names in self._segment_names.values():
+            for name in names:
+                if name in self._path_param_names or name in provided:
+                    continue
+                self._dependencies.register_factory(
+                    name, lambda path_params, name=name: path_params.get(name),
+                    ['path_params']
+                )
+                self._path_param_names.add(name)
+
+    def _check_path_params(self):
+        """ Raises RoutingException if a view uses a dependency with the same name as a
+        segment of its route, which would get the dependency rather than the segment
+        """
+        for route_name, view in self._views.views():
+            shadowed = set(self._segment_names.get(route_name, ())) - self._path_param_names
+            for name in view.all_dependencies():
+                if name in shadowed:
+                    raise route.RoutingException(
+                        'Segment {{{}}} of route {} has the same name as a dependency; '
+                        'rename the segment, or get its value from path_params'
+                        .format(name, route_name)
+                    )
 
-    def add_route(self, route_name, method, path_description):
-        self._routes.add_route(route_name, method, path_description)
+    def configure_routing(self, **options):
+        """ Sets the options passed to `Routes.get_routing` (engine, cache_size, ...) """
+        self._routing_options = options
 
-    def add_view_fn(self, route_name, fn, dependencies=None):
+    def add_view_fn(self, route_name, fn, dependencies=None, cache_vary=None,
+                    validator=None):
+        """ Adds a view.
+
+        cache_vary - if given (and a response cache is set), the view's responses are
+                     cached for each combination of the values of these dependencies
+        validator  - the name of a dependency that versions the response (see
+                     `view_map.View`), used for ETag/Last-Modified headers and 304s
+        """
         if dependencies is None:
             dependencies = []
-        view = view_map.View(fn, route_name, dependencies)
+        view = view_map.View(fn, route_name, dependencies, cache_vary, validator)
         self.add_view(view)
 
     def add_view(self, view):
@@ -47,49 +140,318 @@ class ApplicationFactory:
     def add_value(self, name, value):
         self._dependencies.register_value(name, value)
 
-    def add_factory(self, name, factory_fn, dependencies=None):
-        self._dependencies.register_factory(name, factory_fn, dependencies)
+    def add_factory(self, name, factory_fn, dependencies=None, scope=di.REQUEST,
+                    teardown=None):
+        """ Adds a factory (see `di.Dependencies.register_factory`).
+
+        teardown - called with the value once the response to the request that built
+                   it has been sent (for example, to close a connection)
+        """
+        self._dependencies.register_factory(name, factory_fn, dependencies, scope, teardown)
+
+    def add_pool(self, name, pool):
+        """ Adds `name`, a resource checked out of the pool (a `pool.ResourcePool`) for
+        each request that uses it and released once the response is sent. The pool is
+        closed when the application is.
+        """
+        from lexington.util.pool import register_pool
+        register_pool(self._dependencies, name, pool)
+
+    def add_templates(self, templates, bytecode_cache=True, precompile=False, **options):
+        """ Adds the `jinja_env` and `render` dependencies (see `templates.register_all`).
+
+        templates  - a jinja2 loader, or the path of a directory of templates
+        precompile - if True, every template is compiled when the application is created
+        """
+        from lexington.util import templates as templates_module
+        templates_module.register_all(
+            self._dependencies, templates, bytecode_cache, precompile, **options
+        )
+
+    def set_executor(self, executor):
+        """ Builds independent dependencies in parallel using the executor (for example,
+        a shared ThreadPoolExecutor) instead of one at a time. WSGI applications only;
+        `create_asgi_app` raises LexingtonException if an executor is set.
+        """
+        from lexington.util.concurrent_di import ConcurrentInjector
+        self._injector_class = ConcurrentInjector.using(executor)
 
     def create_app(self):
-        self._dependencies.check_dependencies()
-        routing = self._routes.get_routing()
+        """ Builds a WSGI application """
+        return self._create(Application)
+
+    def create_asgi_app(self):
+        """ Builds an ASGI application, which also supports `async def` views and
+        factories
+        """
+        from lexington.asgi import AsgiApplication
+        return self._create(AsgiApplication)
+
+    def set_instrumentation(self, instrumentation, stats_path=None):
+        """ Records timings for each request phase, dependency and route.
+
+        instrumentation - an `instrument.Instrumentation` to record into
+        stats_path      - if given, adds a GET route at this path that shows the timings
+        """
+        self._instrumentation = instrumentation
+        if stats_path is not None:
+            self.add_route('lexington_stats', 'GET', stats_path)
+            self.add_view_fn('lexington_stats', instrumentation.dump)
+
+    def set_response_cache(self, response_cache):
+        """ Caches the responses of views that declare `cache_vary`.
+
+        response_cache - a `response_cache.ResponseCache`
+        """
+        self._response_cache = response_cache
+
+    def set_json_serializer(self, serializer):
+        """ Sets the function used to turn the dicts, lists and `responses.JSON` values
+        returned by views into bytes (by default orjson or ujson if either is installed,
+        or else the json module)
+        """
+        self._json_serializer = serializer
+
+    def add_response_filter(self, response_filter):
+        """ Adds a stage that every response passes through before it is sent.
+
+        response_filter - called as `response_filter(response, environ)`, returning the
+                          response to send. The response is a werkzeug Response, or a
+                          `response_cache.CachedResponse` for cache hits. Filters run in
+                          the order they were added.
+        """
+        self._response_filters.append(response_filter)
+
+    def use_snapshot(self, path):
+        """ Saves the result of validating the application to the file at `path`.
+
+        When the application is created again with exactly the same routes, dependencies
+        and views, the snapshot is loaded and the validation is skipped. Any change to
+        the registrations means the snapshot is ignored (and replaced).
+        """
+        self._snapshot_path = path
+
+    def _create(self, application_class):
+        saved = None
+        key = self._registration_key(application_class)
+        if self._snapshot_path is not None:
+            from lexington import snapshot
+            saved = snapshot.load(self._snapshot_path, key)
+        check = saved is None
+        if check:
+            self._check_path_params()
+
+        injector_plan = self._dependencies.compile(
+            None if check else saved.dependency_order
+        )
+        if self._instrumentation is not None:
+            injector_plan = self._instrumentation.time_factories(injector_plan)
+        routing = self._routes.get_routing(**self._routing_options)
         view_map = self._views.create(
             routing.get_names(),
-            self._dependencies.provided_dependencies()
+            injector_plan.provided_dependencies(),
+            check
+        )
+        application = application_class(
+            injector_plan, view_map, routing, self._injector_class, self._instrumentation,
+            check, self._response_cache, self._response_filters, self._json_serializer
+        )
+
+        if check and self._snapshot_path is not None:
+            snapshot.save(self._snapshot_path, snapshot.Snapshot(key, injector_plan.get_order()))
+        injector_plan.warm()
+        return application
+
+    def _registration_key(self, application_class):
+        """ Registers the path params and returns the snapshot key (see
+        `snapshot.registration_key`), or None if there is no snapshot
+        """
+        self._add_path_params()
+        if self._snapshot_path is None:
+            return None
+        from lexington import snapshot
+        return snapshot.registration_key(
+            application_class, self._routes, self._routing_options, self._dependencies,
+            self._views
         )
-        return Application(self._dependencies, view_map, routing)
 
 class Application:
-    def __init__(self, dependencies, view_map, routing):
-        self._dependencies = dependencies
+    def __init__(self, injector_plan, view_map, routing, injector_class=None,
+                 instrumentation=None, check_views=True, response_cache=None,
+                 response_filters=(), json_serializer=None):
+        self._injector_plan = injector_plan
         self._view_map = view_map
         self._routing = routing
+        self._by_host = routing.by_host()
+        self._by_content_type = routing.by_content_type()
+        self._instrumentation = instrumentation
+        self._response_cache = response_cache
+        self._response_filters = tuple(response_filters)
+        self._json_serializer = json_serializer
+        # Injectors are reused between requests; each one is released once its
+        # response has been sent (see _send)
+        self._injector_pool = di.InjectorPool(
+            injector_plan, ('environ', 'path_params'), injector_class
+        )
+        from lexington.util import responses
+        self._responses = responses
+        if check_views:
+            self._check_views()
+
+    def _check_views(self):
+        """ WSGI can't await anything, so fail now if any view is async """
+        async_dependencies = self._injector_plan.async_dependencies()
+        for route_name in self._view_map.get_routes():
+            view = self._view_map.get_view(route_name)
+            if self._is_async_view(view, async_dependencies):
+                raise LexingtonException(
+                    'View for route {} is async; use create_asgi_app'.format(route_name)
+                )
+
+    def _is_async_view(self, view, async_dependencies):
+        return di.is_async_function(view.fn) or not async_dependencies.isdisjoint(
+            view.all_dependencies()
+        )
 
     def __call__(self, environ, start_response):
-        response = self._get_response(environ)
-        return response(environ, start_response)
+        if self._instrumentation is None:
+            response, injector = self._get_response(environ)
+            return self._send(response, injector, environ, start_response)
+
+        timer = self._instrumentation.start_request()
+        response, injector = self._get_response(environ, timer)
+        app_iter = self._send(response, injector, environ, start_response, timer)
+        timer.lap('response')
+        timer.finish()
+        return app_iter
 
-    def _get_response(self, environ):
-        injector = self._dependencies.build_injector(late_bound_values={
-            'environ': environ,
-        })
+    def close(self):
+        """ Tears down the singletons (see `di.InjectorPlan.close`). Call this when the
+        application shuts down; `serve` and ASGI servers (with lifespan events) do.
 
-        method = injector.get_dependency('method')
-        path = injector.get_dependency('path')
+        `serve` calls this in the master and in every worker, each tearing down its own
+        copy of the singletons built before forking (see `serving.PreforkServer`).
+        """
+        self._injector_plan.close()
 
-        route_name, segment_matches = self._routing.path_to_route(path, method)
+    def _send(self, response, injector, environ, start_response, timer=None):
+        """ Filters and starts the response, releasing the injector (if any) once the
+        response has been sent
+        """
+        try:
+            if self._response_filters:
+                response = self._filter_response(response, environ)
+                if timer:
+                    timer.lap('filters')
+            app_iter = response(environ, start_response)
+        except BaseException as e:
+            if injector is not None:
+                self._injector_pool.discard(injector, e)
+            raise
+        if injector is None:
+            return app_iter
+        if (getattr(response, 'is_streamed', False)
+                and not getattr(response, 'direct_passthrough', False)):
+            # The body may still use the request's values while it is sent. Bodies
+            # passed through as-is (like files) don't, and are handed to the server
+            # unwrapped so it can recognise its own wsgi.file_wrapper.
+            return self._responses.ClosingIterator(
+                app_iter, lambda: self._injector_pool.release(injector)
+            )
+        self._injector_pool.release(injector)
+        return app_iter
+
+    def _get_response(self, environ, timer=None):
+        """ Returns (response, the injector used to build it or None) """
+        # Dispatching before building the injector means a 404 never builds anything
+        view, path_params, error_response = self._find_view(environ)
+        if timer:
+            timer.lap('dispatch')
+        if view is None:
+            return error_response, None
+
+        injector = self._injector_pool.checkout(environ, path_params)
+        if timer:
+            timer.lap('build_injector')
+        try:
+            return self._respond(view, path_params, injector, environ, timer), injector
+        except BaseException as e:
+            self._injector_pool.discard(injector, e)
+            raise
+
+    def _respond(self, view, path_params, injector, environ, timer):
+        validator = None
+        if view.validator is not None:
+            # Only the validator's own dependencies are built to check it
+            validator = injector.get_dependency(view.validator)
+            if timer:
+                timer.lap('validator')
+            if validator is not None and self._responses.is_not_modified(environ, validator):
+                if timer:
+                    timer.route_name = view.route_name
+                return self._responses.not_modified(validator)
+
+        cache_key = None
+        if view.cache_vary is not None and self._response_cache is not None:
+            # Including the validator means a new version is never served from the cache
+            vary_values = [validator]
+            for name in view.cache_vary:
+                if name in path_params:
+                    vary_values.append(path_params[name])
+                else:
+                    vary_values.append(injector.get_dependency(name))
+            cache_key = self._response_cache.make_key(view.route_name, vary_values)
+            response = self._response_cache.get(cache_key)
+            if timer:
+                timer.lap('cache')
+            if response is not None:
+                if timer:
+                    timer.route_name = view.route_name
+                return response
+
+        result = injector.inject(view.fn, view.dependencies)
+        if timer:
+            timer.route_name = view.route_name
+            timer.lap('view')
+        response = self._responses.make_response(result, environ, self._json_serializer)
+        if validator is not None:
+            self._responses.set_validator(response, validator)
+        if cache_key is not None:
+            self._response_cache.put(cache_key, response, environ)
+        return response
+
+    def _filter_response(self, response, environ):
+        for response_filter in self._response_filters:
+            response = response_filter(response, environ)
+        return response
+
+    def _find_view(self, environ):
+        """ Returns (view, path params, None) if a view handles the request, or
+        (None, None, error response)
+        """
+        path = paths.get_path(environ)
+        # The host and content type are only read if some route needs them
+        host = paths.get_host(environ) if self._by_host else None
+        content_type = paths.get_content_type(environ) if self._by_content_type else None
+        route_name, path_params = self._routing.path_to_route(
+            path, paths.get_method(environ), host, content_type
+        )
         if route_name is None:
-            return self._404('Route not found')
+            allowed = self._routing.allowed_methods(path, host, content_type)
+            if allowed:
+                return None, None, self._405(allowed)
+            return None, None, self._404('Route not found')
 
         view = self._view_map.get_view(route_name)
         if view is None:
-            return self._404('No view found for route ' + route_name)
+            return None, None, self._404('No view found for route ' + route_name)
 
-        result = injector.inject(view.fn, view.dependencies)
-        if isinstance(result, Response):
-            return result
-        else: # Assume that the result is text
-            return Response(result, mimetype='text/plain')
+        return view, path_params or _NO_PATH_PARAMS, None
 
     def _404(self, message):
-        return Response(message, status=404)
+        return self._responses.Response(message, status=404)
+
+    def _405(self, allowed_methods):
+        return self._responses.Response(
+            'Method not allowed', status=405, headers={'Allow': ', '.join(allowed_methods)}
+        )
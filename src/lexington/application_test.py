@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+
+import gzip
+import io
+import unittest
+
+from werkzeug.test import Client, EnvironBuilder
+
+import lexington
+from lexington.util import compression
+from lexington.util import instrument
+from lexington.util import response_cache
+from lexington.util import route
+from lexington.util import view_map
+
+class ServerFileWrapper:
+    """ Stands in for a WSGI server's wsgi.file_wrapper """
+    def __init__(self, file, block_size=8192):
+        self.file = file
+        self.block_size = block_size
+
+    def __iter__(self):
+        return iter(lambda: self.file.read(self.block_size), b'')
+
+    def close(self):
+        self.file.close()
+
+def index_view(greeting):
+    return greeting
+
+class ApplicationTest(unittest.TestCase):
+    def setUp(self):
+        self.builder = lexington.app()
+        self.builder.add_value('greeting', 'Hello')
+        self.builder.add_route('index', 'GET', '/')
+        self.builder.add_view_fn('index', index_view, ['greeting'])
+        self.builder.add_route('no_view', 'GET', '/no-view')
+
+    def _client(self):
+        return Client(self.builder.create_app())
+
+    def test_calls_view(self):
+        response = self._client().get('/')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(b'Hello', response.get_data())
+
+    def test_missing_route(self):
+        self.assertEqual(404, self._client().get('/nope').status_code)
+
+    def test_wrong_method(self):
+        self.builder.add_route('index_delete', 'DELETE', '/')
+        response = self._client().post('/')
+        self.assertEqual(405, response.status_code)
+        self.assertEqual('DELETE, GET', response.headers['Allow'])
+
+    def test_rejected_value_is_not_a_wrong_method(self):
+        self.builder.add_converter('odd', r'\d+', self._odd)
+        self.builder.add_route('odd', 'GET', '/odd/{n:odd}')
+        self.builder.add_view_fn('odd', lambda n: repr(n), ['n'])
+        client = self._client()
+        self.assertEqual(b'3', client.get('/odd/3').get_data())
+        self.assertEqual(404, client.get('/odd/4').status_code)
+        self.assertEqual(405, client.post('/odd/3').status_code)
+
+    def _odd(self, text):
+        if int(text) % 2 == 0:
+            raise ValueError(text)
+        return int(text)
+
+    def test_routes_by_host_and_content_type(self):
+        self.builder.add_route('tenant', 'GET', '/', host='{tenant}.example.com')
+        self.builder.add_route('admin', 'GET', '/', host='admin.example.com')
+        self.builder.add_route(
+            'upload_json', 'POST', '/upload', content_type='application/json'
+        )
+        self.builder.add_route('upload', 'POST', '/upload')
+        self.builder.add_view_fn('tenant', lambda tenant: tenant, ['tenant'])
+        self.builder.add_view_fn('admin', lambda: 'admin')
+        self.builder.add_view_fn('upload_json', lambda: 'json')
+        self.builder.add_view_fn('upload', lambda: 'other')
+        client = self._client()
+        for host, expected in [
+            ('acme.example.com', b'acme'),
+            ('admin.example.com:8080', b'admin'),
+            ('example.org', b'Hello'),
+        ]:
+            self.assertEqual(expected, client.get('/', base_url='http://' + host).get_data())
+        self.assertEqual(b'json', client.post('/upload', json={}).get_data())
+        self.assertEqual(
+            b'other', client.post('/upload', data='x', content_type='text/plain').get_data()
+        )
+
+    def test_missing_view(self):
+        self.assertEqual(404, self._client().get('/no-view').status_code)
+
+    def test_injects_path_params(self):
+        self.builder.add_route('item', 'GET', '/items/{id:int}')
+        self.builder.add_route('item_name', 'GET', '/items/{id:int}/{name}')
+        self.builder.add_view_fn('item', lambda id: repr(id), ['id'])
+        self.builder.add_view_fn(
+            'item_name', lambda id, name: '{!r} {}'.format(id, name), ['id', 'name']
+        )
+        self.builder.add_view_fn('no_view', lambda name: repr(name), ['name'])
+        client = self._client()
+        self.assertEqual(b'12', client.get('/items/12').get_data())
+        self.assertEqual(b'12 x', client.get('/items/12/x').get_data())
+        self.assertEqual(b'None', client.get('/no-view').get_data())
+        self.assertEqual(404, client.get('/items/x').status_code)
+
+    def test_sends_json(self):
+        self.builder.add_route('items', 'GET', '/items')
+        self.builder.add_view_fn('items', lambda: {'items': [1, 2]})
+        self.builder.set_json_serializer(lambda value: repr(value).encode('utf-8'))
+        response = self._client().get('/items')
+        self.assertEqual('application/json', response.mimetype)
+        self.assertEqual(b"{'items': [1, 2]}", response.get_data())
+
+    def test_segments_named_like_dependencies(self):
+        self.builder.add_route('file', 'GET', '/files/{path:path}')
+        self.builder.add_route('tenant', 'GET', '/t/{host}')
+        self.builder.add_view_fn('file', lambda path_params: path_params['path'], ['path_params'])
+        self.builder.add_view_fn(
+            'tenant', lambda path_params: path_params['host'], ['path_params']
+        )
+        client = self._client()
+        self.assertEqual(b'a/b.txt', client.get('/files/a/b.txt').get_data())
+        self.assertEqual(b'acme', client.get('/t/acme').get_data())
+
+    def test_factories_can_be_added_after_segments(self):
+        self.builder.add_route('item', 'GET', '/items/{slug}')
+        self.builder.add_factory('slug', lambda: 'factory')
+        self.builder.add_view_fn('no_view', lambda slug: slug, ['slug'])
+        self.assertEqual(b'factory', self._client().get('/no-view').get_data())
+
+    def test_views_cannot_use_shadowed_segments(self):
+        self.builder.add_route('greet', 'GET', '/greet/{greeting}')
+        self.builder.add_view_fn('greet', index_view, ['greeting'])
+        with self.assertRaisesRegex(route.RoutingException, 'greeting.*greet'):
+            self.builder.create_app()
+
+class TeardownTest(unittest.TestCase):
+    def setUp(self):
+        self.events = []
+        self.builder = lexington.app()
+        self.builder.add_factory(
+            'connection', lambda: self.events.append('open') or 'connection',
+            teardown=lambda connection: self.events.append('close')
+        )
+        self.builder.add_route('index', 'GET', '/')
+        self.builder.add_route('stream', 'GET', '/stream')
+        self.builder.add_route('fail', 'GET', '/fail')
+        self.builder.add_view_fn('index', lambda connection: connection, ['connection'])
+        self.builder.add_view_fn('stream', self._stream, ['connection'])
+        self.builder.add_view_fn('fail', self._fail, ['connection'])
+
+    def _stream(self, connection):
+        def body():
+            self.events.append('send')
+            yield connection
+        return lexington.Response(body())
+
+    def _fail(self, connection):
+        raise ValueError()
+
+    def test_tears_down_after_response(self):
+        client = Client(self.builder.create_app())
+        self.assertEqual(b'connection', client.get('/').get_data())
+        self.assertEqual(b'connection', client.get('/').get_data())
+        self.assertEqual(['open', 'close', 'open', 'close'], self.events)
+
+    def test_tears_down_streamed_response_once_sent(self):
+        client = Client(self.builder.create_app())
+        response = client.get('/stream', buffered=False)
+        self.assertEqual(b'connection', response.get_data())
+        self.assertNotIn('close', self.events)
+        response.close()
+        self.assertEqual(['open', 'send', 'close'], self.events)
+
+    def test_checks_out_pooled_resources(self):
+        from lexington.util import pool
+        connections = pool.ResourcePool(lambda: 'db', maxsize=1, timeout=0)
+        self.builder.add_pool('db', connections)
+        self.builder.add_route('db', 'GET', '/db')
+        self.builder.add_view_fn('db', lambda db: db, ['db'])
+        app = self.builder.create_app()
+        client = Client(app)
+        for _ in range(3):
+            self.assertEqual(b'db', client.get('/db').get_data())
+        self.assertEqual((1, 1, 1), connections.info())
+        app.close()
+        self.assertEqual((0, 0, 1), connections.info())
+
+    def test_hands_files_to_the_server_file_wrapper(self):
+        self.builder.add_route('file', 'GET', '/file')
+        self.builder.add_view_fn(
+            'file', lambda connection: io.BytesIO(b'contents'), ['connection']
+        )
+        app = self.builder.create_app()
+        environ = EnvironBuilder('/file').get_environ()
+        environ['wsgi.file_wrapper'] = ServerFileWrapper
+        app_iter = app(environ, lambda status, headers: None)
+
+        self.assertIsInstance(app_iter, ServerFileWrapper)
+        # The file doesn't need the request's values, so they are already torn down
+        self.assertEqual(['open', 'close'], self.events)
+        self.assertEqual(b'contents', b''.join(app_iter))
+        app_iter.close()
+
+    def test_discards_pooled_resources_after_error(self):
+        from lexington.util import pool
+        disposed = []
+        connections = pool.ResourcePool(lambda: 'db', maxsize=1, dispose=disposed.append)
+        self.builder.add_pool('db', connections)
+        self.builder.add_route('db_fail', 'GET', '/db-fail')
+        self.builder.add_view_fn('db_fail', self._fail, ['db'])
+        client = Client(self.builder.create_app())
+        with self.assertRaises(ValueError):
+            client.get('/db-fail')
+        self.assertEqual(['db'], disposed)
+        self.assertEqual((0, 0, 1), connections.info())
+
+    def test_tears_down_after_error(self):
+        client = Client(self.builder.create_app())
+        with self.assertRaises(ValueError):
+            client.get('/fail')
+        self.assertEqual(['open', 'close'], self.events)
+
+class ResponseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        self.builder = lexington.app()
+        self.builder.set_response_cache(response_cache.ResponseCache())
+        self.builder.add_factory('expensive', self._expensive)
+        self.builder.add_route('item', 'GET', '/items/{id:int}')
+        self.builder.add_view_fn(
+            'item', self._item_view, ['id', 'query', 'expensive'], cache_vary=['id', 'query']
+        )
+        self.builder.add_route('uncached', 'GET', '/uncached')
+        self.builder.add_view_fn('uncached', self._item_view, ['query', 'query', 'expensive'])
+
+    def _expensive(self):
+        self.calls.append('expensive')
+        return len(self.calls)
+
+    def _item_view(self, id, query, expensive):
+        self.calls.append('view')
+        return '{} {} {}'.format(id, query.get('page'), expensive)
+
+    def test_hits_skip_view_and_dependencies(self):
+        client = Client(self.builder.create_app())
+        first = client.get('/items/1?page=2').get_data()
+        self.assertEqual(first, client.get('/items/1?page=2').get_data())
+        self.assertEqual(['expensive', 'view'], self.calls)
+
+    def test_varies_on_declared_values(self):
+        client = Client(self.builder.create_app())
+        client.get('/items/1?page=2')
+        client.get('/items/2?page=2')
+        client.get('/items/1?page=3')
+        self.assertEqual(3, self.calls.count('view'))
+
+    def test_only_caches_views_with_cache_vary(self):
+        client = Client(self.builder.create_app())
+        client.get('/uncached')
+        client.get('/uncached')
+        self.assertEqual(2, self.calls.count('view'))
+
+    def test_checks_vary_names(self):
+        self.builder.add_route('bad', 'GET', '/bad')
+        self.builder.add_view_fn('bad', lambda: 'bad', [], cache_vary=['nonexistant'])
+        with self.assertRaises(view_map.ViewMapException):
+            self.builder.create_app()
+
+class ConditionalGetTest(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        self.version = 1
+        self.builder = lexington.app()
+        self.builder.add_factory('version', self._get_version)
+        self.builder.add_factory('expensive', self._expensive)
+        self.builder.add_route('doc', 'GET', '/doc')
+        self.builder.add_view_fn(
+            'doc', lambda expensive: 'doc {}'.format(expensive), ['expensive'],
+            validator='version'
+        )
+
+    def _get_version(self):
+        self.calls.append('version')
+        return self.version
+
+    def _expensive(self):
+        self.calls.append('expensive')
+        return self.version
+
+    def test_adds_etag(self):
+        response = Client(self.builder.create_app()).get('/doc')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('"1"', response.headers['ETag'])
+
+    def test_not_modified_skips_view(self):
+        response = Client(self.builder.create_app()).get('/doc', headers={'If-None-Match': '"1"'})
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(b'', response.get_data())
+        self.assertEqual('"1"', response.headers['ETag'])
+        self.assertEqual(['version'], self.calls)
+
+    def test_new_version_is_sent(self):
+        client = Client(self.builder.create_app())
+        self.version = 2
+        response = client.get('/doc', headers={'If-None-Match': '"1"'})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(b'doc 2', response.get_data())
+
+    def test_cached_responses_follow_validator(self):
+        self.builder.set_response_cache(response_cache.ResponseCache())
+        self.builder.add_route('cached', 'GET', '/cached')
+        self.builder.add_view_fn(
+            'cached', lambda expensive: 'cached {}'.format(expensive), ['expensive'],
+            cache_vary=[], validator='version'
+        )
+        client = Client(self.builder.create_app())
+        self.assertEqual(b'cached 1', client.get('/cached').get_data())
+        self.assertEqual(b'cached 1', client.get('/cached').get_data())
+        self.version = 2
+        response = client.get('/cached')
+        self.assertEqual(b'cached 2', response.get_data())
+        self.assertEqual('"2"', response.headers['ETag'])
+        self.assertEqual(2, self.calls.count('expensive'))
+
+class ResponseFilterTest(unittest.TestCase):
+    def test_filters_all_responses(self):
+        builder = lexington.app()
+        builder.set_response_cache(response_cache.ResponseCache())
+        builder.add_route('text', 'GET', '/text')
+        builder.add_view_fn('text', lambda: 'text ' * 100, cache_vary=[])
+        builder.add_response_filter(compression.Compressor(min_size=10))
+        client = Client(builder.create_app())
+        for _ in range(2): # the second response comes from the cache
+            response = client.get('/text', headers={'Accept-Encoding': 'gzip'})
+            self.assertEqual('gzip', response.headers['Content-Encoding'])
+            self.assertEqual(b'text ' * 100, gzip.decompress(response.get_data()))
+        self.assertEqual(404, client.get('/nope').status_code)
+
+class InstrumentationTest(ApplicationTest):
+    def setUp(self):
+        super().setUp()
+        self.instrumentation = instrument.Instrumentation()
+        self.builder.set_instrumentation(self.instrumentation, stats_path='/_stats')
+
+    def test_records_timings(self):
+        client = self._client()
+        client.get('/')
+        client.get('/nope')
+
+        summary = self.instrumentation.summary()
+        self.assertEqual(
+            {'build_injector', 'dispatch', 'view', 'response'}, set(summary['phase'])
+        )
+        self.assertEqual(2, summary['phase']['dispatch']['count'])
+        self.assertEqual(1, summary['phase']['build_injector']['count'])
+        self.assertEqual(1, summary['phase']['view']['count'])
+        self.assertEqual(1, summary['route']['index']['count'])
+        self.assertEqual(1, summary['route']['(no route)']['count'])
+        self.assertIn('greeting', summary['dependency'])
+
+    def test_stats_route(self):
+        client = self._client()
+        client.get('/')
+        self.assertIn(b'index', client.get('/_stats').get_data())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,227 @@
+"""
+Running a Lexington application under an ASGI server
+"""
+
+import asyncio
+import io
+import sys
+
+from lexington import Application
+from lexington.exceptions import LexingtonException
+from lexington.util import di
+from lexington.util import responses
+from lexington.util.async_di import AsyncInjector, warm_async
+
+async def read_body(receive):
+    """ Reads the whole request body from the ASGI receive channel """
+    chunks = []
+    more_body = True
+    while more_body:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        more_body = message.get('more_body', False)
+    return b''.join(chunks)
+
+def _to_latin1(text):
+    """ WSGI strings hold the raw bytes as latin-1 characters """
+    return text.encode('utf-8').decode('latin1')
+
+def scope_to_environ(scope, body):
+    """ Builds a WSGI environ from an ASGI HTTP scope, so that the request dependencies
+    (request, query, ...) work the same as they do under WSGI.
+    """
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': _to_latin1(scope.get('root_path', '')),
+        'PATH_INFO': _to_latin1(scope['path']),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': False,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+        'asgi.scope': scope,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1').upper().replace('-', '_')
+        value = value.decode('latin1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        if name in environ:
+            value = environ[name] + ',' + value
+        environ[name] = value
+    return environ
+
+async def send_response(response, environ, send):
+    """ Sends a werkzeug response over the ASGI send channel """
+    app_iter, status, headers = response.get_wsgi_response(environ)
+    await send({
+        'type': 'http.response.start',
+        'status': int(status.split(' ', 1)[0]),
+        'headers': [
+            (name.lower().encode('latin1'), value.encode('latin1'))
+            for name, value in headers
+        ],
+    })
+    try:
+        for chunk in app_iter:
+            if chunk:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+    finally:
+        if hasattr(app_iter, 'close'):
+            app_iter.close()
+    await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+class AsgiApplication(Application):
+    """ An ASGI version of Application.
+
+    Views and factories may be `async def` functions. Async dependencies that don't
+    depend on each other are awaited concurrently.
+    """
+    def __init__(self, injector_plan, view_map, routing, injector_class=None,
+                 instrumentation=None, check_views=True, response_cache=None,
+                 response_filters=(), json_serializer=None):
+        if injector_class is not None:
+            # Async dependencies are always built by an AsyncInjector
+            raise LexingtonException(
+                "ASGI applications can't use an executor; independent async factories "
+                "are already awaited concurrently"
+            )
+        super().__init__(
+            injector_plan, view_map, routing, instrumentation=instrumentation,
+            response_cache=response_cache, response_filters=response_filters,
+            json_serializer=json_serializer
+        )
+        self._injector_pool = di.InjectorPool(
+            injector_plan, ('environ', 'path_params'), AsyncInjector
+        )
+        self._warmed = False
+        self._warm_lock = None
+
+    def _check_views(self):
+        pass # Any view can be awaited
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] == 'websocket':
+            # Closing before accepting rejects the connection (with a 403)
+            await receive()
+            await send({'type': 'websocket.close', 'code': 1000})
+            return
+        if scope['type'] != 'http':
+            return
+
+        await self._warm()
+        body = await read_body(receive)
+        environ = scope_to_environ(scope, body)
+        timer = None
+        if self._instrumentation is not None:
+            timer = self._instrumentation.start_request()
+        response, injector = await self._get_response_async(environ, timer)
+        try:
+            if self._response_filters:
+                response = self._filter_response(response, environ)
+                if timer:
+                    timer.lap('filters')
+            await send_response(response, environ, send)
+        except BaseException as e:
+            if injector is not None:
+                self._injector_pool.discard(injector, e)
+            raise
+        if injector is not None:
+            self._injector_pool.release(injector)
+        if timer:
+            timer.lap('response')
+            timer.finish()
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await self._warm()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _warm(self):
+        """ Builds the async singletons (servers that don't send lifespan events get
+        them built on the first request)
+        """
+        if self._warmed:
+            return
+        if self._warm_lock is None:
+            self._warm_lock = asyncio.Lock()
+        async with self._warm_lock:
+            if not self._warmed:
+                await warm_async(self._injector_plan)
+                self._warmed = True
+
+    async def _get_response_async(self, environ, timer=None):
+        """ Returns (response, the injector used to build it or None) """
+        view, path_params, error_response = self._find_view(environ)
+        if timer:
+            timer.lap('dispatch')
+        if view is None:
+            return error_response, None
+
+        injector = self._injector_pool.checkout(environ, path_params)
+        if timer:
+            timer.lap('build_injector')
+        try:
+            response = await self._respond_async(view, path_params, injector, environ, timer)
+            return response, injector
+        except BaseException as e:
+            # Tasks started for the injector might still be running, so it isn't reused
+            self._injector_pool.discard(injector, e)
+            raise
+
+    async def _respond_async(self, view, path_params, injector, environ, timer):
+        validator = None
+        if view.validator is not None:
+            validator = await injector.get_dependency(view.validator)
+            if timer:
+                timer.lap('validator')
+            if validator is not None and responses.is_not_modified(environ, validator):
+                if timer:
+                    timer.route_name = view.route_name
+                return responses.not_modified(validator)
+
+        cache_key = None
+        if view.cache_vary is not None and self._response_cache is not None:
+            vary_values = [validator] + [
+                path_params[name] if name in path_params else
+                await injector.get_dependency(name)
+                for name in view.cache_vary
+            ]
+            cache_key = self._response_cache.make_key(view.route_name, vary_values)
+            response = self._response_cache.get(cache_key)
+            if timer:
+                timer.lap('cache')
+            if response is not None:
+                if timer:
+                    timer.route_name = view.route_name
+                return response
+
+        result = await injector.inject(view.fn, view.dependencies)
+        if timer:
+            timer.route_name = view.route_name
+            timer.lap('view')
+        response = responses.make_response(result, environ, self._json_serializer)
+        if validator is not None:
+            responses.set_validator(response, validator)
+        if cache_key is not None:
+            self._response_cache.put(cache_key, response, environ)
+        return response
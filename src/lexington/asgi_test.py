@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+
+import asyncio
+import concurrent.futures
+import unittest
+
+import lexington
+from lexington.exceptions import LexingtonException
+from lexington.util import instrument
+from lexington.util.view_map import view
+
+async def get_greeting():
+    await asyncio.sleep(0)
+    return 'Hello'
+
+@view('hello', ['greeting', 'query'])
+async def hello_view(greeting, query):
+    return '{}, {}!'.format(greeting, query.get('name', 'world'))
+
+@view('echo', ['request'])
+def echo_view(request):
+    return request.get_data()
+
+def call_asgi(app, scope, body=b''):
+    """ Runs an ASGI app for one request, returning (status, headers, body) """
+    sent = []
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start = sent[0]
+    body = b''.join(message.get('body', b'') for message in sent[1:])
+    return start['status'], dict(start['headers']), body
+
+def http_scope(method, path, query_string=b'', headers=None):
+    return {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': method,
+        'path': path,
+        'query_string': query_string,
+        'headers': headers or [],
+    }
+
+class AsgiApplicationTest(unittest.TestCase):
+    def setUp(self):
+        self.builder = lexington.app()
+        self.builder.add_factory('greeting', get_greeting)
+        self.builder.add_route('hello', 'GET', '/hello')
+        self.builder.add_view(hello_view)
+        self.builder.add_route('echo', 'POST', '/echo')
+        self.builder.add_view(echo_view)
+
+    def test_calls_async_view(self):
+        app = self.builder.create_asgi_app()
+        status, headers, body = call_asgi(app, http_scope('GET', '/hello', b'name=Fry'))
+        self.assertEqual(200, status)
+        self.assertEqual(b'Hello, Fry!', body)
+        self.assertTrue(headers[b'content-type'].startswith(b'text/plain'))
+
+    def test_reads_request_body(self):
+        app = self.builder.create_asgi_app()
+        scope = http_scope('POST', '/echo', headers=[(b'content-length', b'4')])
+        self.assertEqual((200, b'data'), call_asgi(app, scope, b'data')[::2])
+
+    def test_missing_route(self):
+        app = self.builder.create_asgi_app()
+        self.assertEqual(404, call_asgi(app, http_scope('GET', '/nope'))[0])
+
+    def test_caches_responses(self):
+        from lexington.util import response_cache
+        calls = []
+        async def counted_view(query):
+            calls.append(query)
+            return 'counted'
+        self.builder.set_response_cache(response_cache.ResponseCache())
+        self.builder.add_route('counted', 'GET', '/counted')
+        self.builder.add_view_fn('counted', counted_view, ['query'], cache_vary=['query'])
+        app = self.builder.create_asgi_app()
+        for _ in range(2):
+            self.assertEqual(b'counted', call_asgi(app, http_scope('GET', '/counted', b'a=1'))[2])
+        self.assertEqual(1, len(calls))
+
+    def test_tears_down_after_response(self):
+        events = []
+        self.builder.add_factory(
+            'connection', lambda: 'connection', teardown=lambda value: events.append(value)
+        )
+        self.builder.add_route('connected', 'GET', '/connected')
+        self.builder.add_view_fn('connected', lambda connection: connection, ['connection'])
+        app = self.builder.create_asgi_app()
+        for _ in range(2):
+            self.assertEqual(b'connection', call_asgi(app, http_scope('GET', '/connected'))[2])
+        self.assertEqual(['connection', 'connection'], events)
+
+    def test_tears_down_after_failed_dependency(self):
+        events = []
+        def factory(name, seconds, error=None):
+            async def build():
+                await asyncio.sleep(seconds)
+                if error is not None:
+                    raise error
+                events.append('open ' + name)
+                return name
+            return build
+        teardown = lambda name: events.append('close ' + name)
+        self.builder.add_factory('fast', factory('fast', 0), teardown=teardown)
+        self.builder.add_factory('failing', factory('failing', 0.01, ValueError()))
+        self.builder.add_factory('slow', factory('slow', 0.05), teardown=teardown)
+        self.builder.add_route('failing', 'GET', '/failing')
+        self.builder.add_view_fn('failing', lambda *values: 'ok', ['fast', 'failing', 'slow'])
+        app = self.builder.create_asgi_app()
+
+        async def serve():
+            with self.assertRaises(ValueError):
+                await app(http_scope('GET', '/failing'), receive, send)
+            # Like a server, keep the event loop running after the request
+            await asyncio.sleep(0.1)
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            pass
+
+        asyncio.run(serve())
+        # The slow factory is cancelled rather than finishing after the teardowns ran
+        self.assertEqual(['open fast', 'close fast'], events)
+
+    def test_lifespan_shutdown_tears_down_singletons(self):
+        events = []
+        def client():
+            yield 'client'
+            events.append('closed')
+        self.builder.add_factory('client', client, scope=lexington.di.SINGLETON)
+        app = self.builder.create_asgi_app()
+        messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(app({'type': 'lifespan'}, receive, send))
+        self.assertEqual(['closed'], events)
+        self.assertEqual(
+            ['lifespan.startup.complete', 'lifespan.shutdown.complete'], sent
+        )
+
+    def test_rejects_websockets(self):
+        app = self.builder.create_asgi_app()
+        messages = [{'type': 'websocket.connect'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(app({'type': 'websocket', 'path': '/hello'}, receive, send))
+        self.assertEqual([{'type': 'websocket.close', 'code': 1000}], sent)
+        asyncio.run(app({'type': 'unknown'}, receive, send))
+        self.assertEqual(1, len(sent))
+
+    def test_wsgi_rejects_async_views(self):
+        with self.assertRaises(LexingtonException):
+            self.builder.create_app()
+
+    def test_rejects_executor(self):
+        with concurrent.futures.ThreadPoolExecutor(1) as executor:
+            self.builder.set_executor(executor)
+            with self.assertRaises(LexingtonException):
+                self.builder.create_asgi_app()
+
+    def test_records_timings(self):
+        instrumentation = instrument.Instrumentation()
+        self.builder.set_instrumentation(instrumentation)
+        app = self.builder.create_asgi_app()
+        call_asgi(app, http_scope('GET', '/hello'))
+        call_asgi(app, http_scope('GET', '/nope'))
+
+        summary = instrumentation.summary()
+        self.assertEqual(
+            {'build_injector', 'dispatch', 'view', 'response'}, set(summary['phase'])
+        )
+        self.assertEqual(2, summary['phase']['dispatch']['count'])
+        self.assertEqual(1, summary['route']['hello']['count'])
+        self.assertEqual(1, summary['route']['(no route)']['count'])
+        self.assertIn('greeting', summary['dependency'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+
+import os
+import subprocess
+import sys
+import unittest
+
+def modules_loaded_by(code):
+    """ Returns the names of the modules loaded after running the code in a fresh
+    interpreter
+    """
+    environment = dict(os.environ)
+    environment['PYTHONPATH'] = os.pathsep.join(sys.path)
+    output = subprocess.run(
+        [sys.executable, '-c', code + '\nimport sys\nprint(" ".join(sys.modules))'],
+        env=environment, check=True, capture_output=True, text=True
+    ).stdout
+    return set(output.split())
+
+class LazyImportTest(unittest.TestCase):
+    def test_di_does_not_load_werkzeug(self):
+        loaded = modules_loaded_by('import lexington.util.di')
+        self.assertNotIn('werkzeug', loaded)
+        self.assertNotIn('inspect', loaded)
+
+    def test_lexington_does_not_load_werkzeug(self):
+        loaded = modules_loaded_by('import lexington\nlexington.app()')
+        self.assertNotIn('werkzeug', loaded)
+
+    def test_creating_an_app_loads_werkzeug(self):
+        loaded = modules_loaded_by('import lexington\nlexington.app().create_app()')
+        self.assertIn('werkzeug', loaded)
+
+    def test_response_is_still_available(self):
+        import lexington
+        from werkzeug.wrappers import Response
+        self.assertIs(Response, lexington.Response)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+"""
+Running an application on several pre-forked worker processes
+"""
+
+import gc
+import logging
+import os
+import signal
+import threading
+import time
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+from lexington.exceptions import LexingtonException
+
+log = logging.getLogger(__name__)
+
+class _RequestHandler(WSGIRequestHandler):
+    # Each worker handles one connection at a time, so don't let a keep-alive
+    # connection hold on to a worker
+    protocol_version = 'HTTP/1.0'
+
+class _WorkerServer(BaseWSGIServer):
+    multiprocess = True
+
+class PreforkServer:
+    """ Serves a WSGI application from several worker processes.
+
+    The master process binds the listening socket and then forks the workers, which
+    all accept connections from that socket. Anything built before forking (such as the
+    application's singletons) is shared copy-on-write by the workers.
+
+    Each process closes the application when it exits, so the teardown of a singleton
+    built before forking runs in the master and again in every worker, on that
+    process's copy. Singletons with teardowns must be fork-safe: create connections,
+    threads and the like lazily in each process (as `pool.ResourcePool` does), rather
+    than in the factory.
+
+    A worker that exits is replaced, unless the server is stopping. If a worker exits
+    soon after starting, the replacement is delayed so that a crashing application
+    doesn't fork in a tight loop.
+    """
+    MIN_WORKER_LIFETIME = 1.0
+
+    def __init__(self, application, host='localhost', port=5050, workers=None):
+        if not hasattr(os, 'fork'):
+            raise LexingtonException('PreforkServer requires os.fork')
+        self._application = application
+        self._host = host
+        self._port = port
+        self._num_workers = workers or os.cpu_count() or 1
+        self._server = None
+        self._workers = {} # pid -> start time
+        self._stopping = False
+
+    @property
+    def port(self):
+        """ The port being listened on (useful when created with port=0) """
+        return self._server.port if self._server else self._port
+
+    def get_worker_pids(self):
+        return list(self._workers)
+
+    def start(self):
+        """ Binds the socket and forks the workers """
+        self._server = _WorkerServer(
+            self._host, self._port, self._application, handler=_RequestHandler
+        )
+        # Workers race to accept each connection; the losers get an error (which the
+        # server ignores) instead of blocking
+        self._server.socket.setblocking(False)
+        if hasattr(gc, 'freeze'):
+            # Keep the collector from touching (and so copying) the shared objects
+            gc.freeze()
+        for _ in range(self._num_workers):
+            self._spawn_worker()
+
+    def run(self):
+        """ Starts the server and supervises the workers until SIGINT or SIGTERM """
+        signal.signal(signal.SIGTERM, self._handle_stop_signal)
+        signal.signal(signal.SIGINT, self._handle_stop_signal)
+        self.start()
+        log.info('Serving on http://%s:%d with %d workers', self._host, self.port,
+                 self._num_workers)
+        try:
+            while not self._stopping:
+                try:
+                    pid, status = os.wait()
+                except ChildProcessError:
+                    break
+                self._worker_exited(pid, status)
+        finally:
+            self.stop()
+            self._close_application()
+
+    def stop(self):
+        """ Asks the workers to finish their current requests and exit, and waits """
+        self._stopping = True
+        for pid in self._workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in list(self._workers):
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+            del self._workers[pid]
+        if self._server is not None:
+            self._server.server_close()
+
+    def _handle_stop_signal(self, signum, frame):
+        self._stopping = True
+        for pid in self._workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _worker_exited(self, pid, status):
+        started = self._workers.pop(pid, None)
+        if started is None or self._stopping:
+            return
+        log.warning('Worker %d exited with status %d, restarting it', pid,
+                    os.waitstatus_to_exitcode(status))
+        lifetime = time.monotonic() - started
+        if lifetime < self.MIN_WORKER_LIFETIME:
+            time.sleep(self.MIN_WORKER_LIFETIME - lifetime)
+        self._spawn_worker()
+
+    def _spawn_worker(self):
+        pid = os.fork()
+        if pid:
+            self._workers[pid] = time.monotonic()
+            return
+
+        # In the worker: never return into the master's code
+        exit_code = 1
+        try:
+            self._run_worker()
+            exit_code = 0
+        except BaseException:
+            log.exception('Worker %d failed', os.getpid())
+        finally:
+            os._exit(exit_code)
+
+    def _run_worker(self):
+        self._workers = {}
+        # Ctrl-C reaches every process in the group; let the master decide what to do
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, self._handle_worker_stop_signal)
+        try:
+            self._server.serve_forever()
+        finally:
+            self._close_application()
+
+    def _close_application(self):
+        """ Tears down the application's singletons (this process's copies of them) """
+        close = getattr(self._application, 'close', None)
+        if close is not None:
+            close()
+
+    def _handle_worker_stop_signal(self, signum, frame):
+        # shutdown() waits for serve_forever to return, so it can't be called from the
+        # thread running it
+        threading.Thread(target=self._server.shutdown).start()
+
+def serve(app_factory, host='localhost', port=5050, workers=None):
+    """ Builds the application (warming its singletons) and serves it from `workers`
+    processes (defaulting to the number of CPUs) until interrupted.
+
+    The singletons are built before the workers are forked, so their teardowns run in
+    every process (see `PreforkServer`).
+    """
+    application = app_factory.create_app()
+    PreforkServer(application, host, port, workers).run()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+import os
+import signal
+import unittest
+import urllib.request
+
+import lexington
+from lexington import serving
+
+def pid_view():
+    return str(os.getpid())
+
+@unittest.skipUnless(hasattr(os, 'fork'), 'requires os.fork')
+class PreforkServerTest(unittest.TestCase):
+    def setUp(self):
+        builder = lexington.app()
+        builder.add_route('pid', 'GET', '/pid')
+        builder.add_view_fn('pid', pid_view)
+        self.server = serving.PreforkServer(builder.create_app(), port=0, workers=2)
+        self.server.MIN_WORKER_LIFETIME = 0
+        self.server.start()
+        self.addCleanup(self.server.stop)
+
+    def _get(self, path):
+        url = 'http://localhost:{}{}'.format(self.server.port, path)
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.read().decode()
+
+    def test_workers_serve_requests(self):
+        workers = self.server.get_worker_pids()
+        self.assertEqual(2, len(workers))
+        for _ in range(5):
+            self.assertIn(int(self._get('/pid')), workers)
+
+    def test_restarts_crashed_worker(self):
+        crashed = self.server.get_worker_pids()[0]
+        os.kill(crashed, signal.SIGKILL)
+        self.server._worker_exited(*os.waitpid(crashed, 0))
+
+        workers = self.server.get_worker_pids()
+        self.assertEqual(2, len(workers))
+        self.assertNotIn(crashed, workers)
+        self.assertIn(int(self._get('/pid')), workers)
+
+    def test_stop_waits_for_workers(self):
+        workers = self.server.get_worker_pids()
+        self.server.stop()
+        self.assertEqual([], self.server.get_worker_pids())
+        for pid in workers:
+            with self.assertRaises(ChildProcessError):
+                os.waitpid(pid, os.WNOHANG)
+
+if __name__ == '__main__':
+    unittest.main()
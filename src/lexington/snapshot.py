@@ -0,0 +1,71 @@
+"""
+Saving the result of validating an application, so that later startups with the same
+registrations can skip the validation
+"""
+
+import collections
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+# Change this whenever the contents of a snapshot (or what they mean) change
+SNAPSHOT_VERSION = 2
+
+# key              - the registration key the snapshot was made for
+# dependency_order - the dependency names in a checked topological order
+Snapshot = collections.namedtuple('Snapshot', 'key dependency_order')
+
+def registration_key(application_class, routes, routing_options, dependencies, views):
+    """ Returns a hash of everything the validation depends on.
+
+    Functions are represented by whether they are `async def` rather than by their
+    code, since that is all the checks look at.
+    """
+    description = (
+        SNAPSHOT_VERSION,
+        application_class.__module__ + '.' + application_class.__qualname__,
+        routes.registrations(),
+        tuple(sorted(routing_options.items())),
+        dependencies.registrations(),
+        views.registrations(),
+    )
+    # Pickling is several times faster than repr() for large applications
+    return hashlib.sha256(pickle.dumps(description, protocol=4)).hexdigest()
+
+def load(path, key):
+    """ Returns the snapshot saved at the path if it was made for the key, or None """
+    try:
+        with open(path, 'rb') as f:
+            saved = json.load(f)
+        version = saved['version']
+        snapshot = Snapshot(saved['key'], saved['dependency_order'])
+    except Exception:
+        # A missing or unreadable snapshot just means validating again
+        return None
+    if version != SNAPSHOT_VERSION or snapshot.key != key:
+        return None
+    if not (isinstance(snapshot.dependency_order, list)
+            and all(isinstance(name, str) for name in snapshot.dependency_order)):
+        return None
+    return snapshot
+
+def save(path, snapshot):
+    """ Writes the snapshot (as JSON, since it only holds strings) so that a concurrent
+    `load` never sees a partial file
+    """
+    contents = {
+        'version': SNAPSHOT_VERSION,
+        'key': snapshot.key,
+        'dependency_order': list(snapshot.dependency_order),
+    }
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.snapshot-')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(contents, f)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
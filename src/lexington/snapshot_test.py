@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import pickle
+import tempfile
+import unittest
+from unittest import mock
+
+from werkzeug.test import Client
+
+import lexington
+from lexington import snapshot
+from lexington.util import di
+from lexington.util import view_map
+
+def item_view(id, greeting):
+    return '{} {}'.format(greeting, id)
+
+def make_builder(snapshot_path, view_dependencies=('id', 'greeting')):
+    builder = lexington.app()
+    builder.use_snapshot(snapshot_path)
+    builder.add_value('greeting', 'Hello')
+    builder.add_factory('shout', lambda greeting: greeting.upper(), ['greeting'])
+    builder.add_route('item', 'GET', '/items/{id:int}')
+    builder.add_view_fn('item', item_view, list(view_dependencies))
+    return builder
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'app.snapshot')
+
+    def test_saves_snapshot(self):
+        make_builder(self.path).create_app()
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_loading_snapshot_skips_checks(self):
+        make_builder(self.path).create_app()
+        with mock.patch.object(di, 'check_graph') as check_graph, \
+                mock.patch.object(view_map.ViewMapFactory, '_check_views') as check_views:
+            app = make_builder(self.path).create_app()
+        check_graph.assert_not_called()
+        check_views.assert_not_called()
+        self.assertEqual(b'Hello 3', Client(app).get('/items/3').get_data())
+
+    def test_changed_registrations_are_checked(self):
+        make_builder(self.path).create_app()
+        with self.assertRaises(view_map.ViewMapException):
+            make_builder(self.path, ['id', 'nonexistant']).create_app()
+
+    def test_key_depends_on_application_class(self):
+        make_builder(self.path).create_app()
+        saved = snapshot.load(self.path, self._key(lexington.Application))
+        self.assertIsNotNone(saved)
+        from lexington.asgi import AsgiApplication
+        self.assertIsNone(snapshot.load(self.path, self._key(AsgiApplication)))
+
+    def test_ignores_bad_snapshots(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not a snapshot')
+        app = make_builder(self.path).create_app()
+        self.assertEqual(b'Hello 3', Client(app).get('/items/3').get_data())
+        self.assertIsNotNone(snapshot.load(self.path, self._key(lexington.Application)))
+
+    def test_saves_json(self):
+        make_builder(self.path).create_app()
+        with open(self.path) as f:
+            saved = json.load(f)
+        self.assertEqual(self._key(lexington.Application), saved['key'])
+        self.assertIn('greeting', saved['dependency_order'])
+
+    def test_ignores_pickled_snapshots(self):
+        key = self._key(lexington.Application)
+        with open(self.path, 'wb') as f:
+            pickle.dump((snapshot.SNAPSHOT_VERSION, snapshot.Snapshot(key, [])), f)
+        self.assertIsNone(snapshot.load(self.path, key))
+
+    def _key(self, application_class):
+        return make_builder(self.path)._registration_key(application_class)
+
+if __name__ == '__main__':
+    unittest.main()
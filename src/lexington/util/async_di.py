@@ -0,0 +1,121 @@
+"""
+Injecting dependencies built by `async def` factories
+"""
+
+import asyncio
+import inspect
+
+from lexington.util.di import (
+    Injector,
+    MissingDependencyException,
+    SINGLETON,
+    TRANSIENT,
+    _MISSING,
+)
+
+class AsyncInjector(Injector):
+    """ An Injector that can await `async def` factories and views.
+
+    Dependencies that don't involve any async factories are built just like they are by
+    Injector. The rest are built in tasks, and the dependencies of each one are gathered
+    together, so independent async factories run concurrently.
+
+    Build one with `plan.build_injector(values, injector_class=AsyncInjector)`.
+    """
+    __slots__ = ('_needs_await', '_tasks')
+
+    def __init__(self, plan, slots):
+        super().__init__(plan, slots)
+        self._needs_await = plan._needs_await
+        self._tasks = {}
+
+    def reset(self):
+        super().reset()
+        self._tasks.clear()
+
+    async def get_dependency(self, name):
+        """ Get the value of a dependency (awaiting it if needed). """
+        return (await self._get_all([self._index_of(name)]))[0]
+
+    async def inject(self, fn, dependencies):
+        """ Calls the function with the value of the listed dependencies, and awaits the
+        result if it is awaitable.
+        """
+        args = await self._get_all([self._index_of(name) for name in dependencies or []])
+        result = fn(*args)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    def _index_of(self, name):
+        index = self._indexes.get(name)
+        if index is None:
+            raise MissingDependencyException("Missing dependency name: {}".format(name))
+        return index
+
+    async def _get_all(self, indexes):
+        """ Gets the values at the indexes, awaiting the async ones concurrently. """
+        values = [None] * len(indexes)
+        pending_positions = []
+        for position, index in enumerate(indexes):
+            if self._needs_await[index] and self._slots[index] is _MISSING:
+                pending_positions.append(position)
+            else:
+                values[position] = self._get_by_index(index)
+
+        if pending_positions:
+            tasks = [self._get_task(indexes[position]) for position in pending_positions]
+            try:
+                results = await asyncio.gather(*tasks)
+            except BaseException:
+                # Stop the others before the injector is closed, or values they build
+                # afterwards would never be torn down
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+            for position, result in zip(pending_positions, results):
+                values[position] = result
+        return values
+
+    def _get_task(self, index):
+        """ Returns the task building the value at the index, starting it if needed.
+
+        Sharing the task means the factory is only called once, even when several
+        dependants are waiting for it at the same time.
+        """
+        task = self._tasks.get(index)
+        if task is None:
+            task = asyncio.ensure_future(self._build(index))
+            if self._factories[index].scope != TRANSIENT:
+                self._tasks[index] = task
+        return task
+
+    async def _build(self, index):
+        fn, dependencies, scope = self._factories[index]
+        value = fn(*await self._get_all(dependencies))
+        if inspect.isawaitable(value):
+            value = await value
+        if self._teardowns is not None:
+            if scope == SINGLETON:
+                value = self._plan._built_singleton(index, value)
+            else:
+                value = self._built(index, value)
+        if scope == SINGLETON:
+            value = self._plan._set_singleton(index, value)
+        if scope != TRANSIENT:
+            self._slots[index] = value
+        return value
+
+async def warm_async(plan):
+    """ Builds all of the plan's singletons, including those with async factories.
+
+    Without this, async singletons are built on first use, and requests that start at
+    the same time might each call the factory (only the first value is kept).
+    """
+    plan.warm()
+    injector = AsyncInjector(plan, list(plan._initial_slots))
+    await injector._get_all([
+        index for index, factory in enumerate(plan._factories)
+        if factory is not None and factory.scope == SINGLETON
+    ])
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+import asyncio
+import time
+import unittest
+
+from lexington.util import di
+from lexington.util import async_di
+
+def _sleeper(result, seconds=0.1):
+    async def sleep(*args):
+        await asyncio.sleep(seconds)
+        return result
+    return sleep
+
+class AsyncInjectorTest(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        self.dependencies = di.Dependencies()
+        self.dependencies.register_late_bound_value('request')
+        self.dependencies.register_factory('sync', lambda request: request + 1, ['request'])
+
+    def _injector(self):
+        plan = self.dependencies.compile()
+        return plan.build_injector({'request': 1}, injector_class=async_di.AsyncInjector)
+
+    def _count_calls(self, name, fn):
+        async def counting(*args):
+            self.calls.append(name)
+            return await fn(*args)
+        return counting
+
+    def test_plan_knows_what_is_async(self):
+        self.dependencies.register_factory('slow', _sleeper(1), ['sync'])
+        self.dependencies.register_factory('after_slow', lambda slow: slow, ['slow'])
+        plan = self.dependencies.compile()
+        self.assertFalse(plan.is_async('sync'))
+        self.assertTrue(plan.is_async('slow'))
+        self.assertTrue(plan.is_async('after_slow'))
+
+    def test_gets_sync_and_async_values(self):
+        self.dependencies.register_factory('slow', _sleeper('done', 0), ['sync'])
+        injector = self._injector()
+        self.assertEqual(2, asyncio.run(injector.get_dependency('sync')))
+        self.assertEqual('done', asyncio.run(injector.get_dependency('slow')))
+
+    def test_resolves_independent_factories_concurrently(self):
+        for name in ['a', 'b', 'c']:
+            self.dependencies.register_factory(name, _sleeper(name), ['sync'])
+        injector = self._injector()
+
+        async def view(a, b, c):
+            return a + b + c
+
+        start = time.monotonic()
+        result = asyncio.run(injector.inject(view, ['a', 'b', 'c']))
+        self.assertEqual('abc', result)
+        self.assertLess(time.monotonic() - start, 0.25)
+
+    def test_builds_shared_dependency_once(self):
+        self.dependencies.register_factory(
+            'shared', self._count_calls('shared', _sleeper(1, 0.01))
+        )
+        self.dependencies.register_factory('a', lambda shared: shared, ['shared'])
+        self.dependencies.register_factory('b', _sleeper(2, 0), ['shared'])
+        injector = self._injector()
+
+        result = asyncio.run(injector.inject(lambda a, b, shared: (a, b), ['a', 'b', 'shared']))
+        self.assertEqual((1, 2), result)
+        self.assertEqual(['shared'], self.calls)
+
+    def test_warms_async_singletons(self):
+        self.dependencies.register_factory(
+            'pool', self._count_calls('pool', _sleeper('pool', 0)), scope=di.SINGLETON
+        )
+        plan = self.dependencies.compile()
+        plan.warm()
+        self.assertEqual([], self.calls)
+
+        asyncio.run(async_di.warm_async(plan))
+        injector = plan.build_injector({'request': 1}, injector_class=async_di.AsyncInjector)
+        self.assertEqual('pool', asyncio.run(injector.get_dependency('pool')))
+        self.assertEqual(['pool'], self.calls)
+
+    def test_missing_dependency(self):
+        with self.assertRaises(di.MissingDependencyException):
+            asyncio.run(self._injector().get_dependency('nope'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+"""
+A small thread-safe LRU cache
+"""
+
+import collections
+import threading
+import time
+
+CacheInfo = collections.namedtuple('CacheInfo', 'hits misses maxsize currsize')
+
+class LRUCache:
+    def __init__(self, maxsize, ttl=None, clock=time.monotonic):
+        """ Create an LRUCache.
+
+        maxsize - the most entries to keep; the least recently used entry is dropped
+                  when a new one would go over the limit
+        ttl     - if given, entries expire this many seconds after they are put
+        clock   - returns the current time in seconds (for testing)
+        """
+        if maxsize <= 0:
+            raise ValueError('maxsize must be positive')
+        if ttl is not None and ttl <= 0:
+            raise ValueError('ttl must be positive')
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._clock = clock
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key, default=None):
+        """ Returns the value for the key (marking it as recently used), or the default
+        if the key isn't cached.
+        """
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self._misses += 1
+                return default
+            if self._ttl is not None:
+                value, expires = value
+                if expires <= self._clock():
+                    del self._entries[key]
+                    self._misses += 1
+                    return default
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key, value):
+        if self._ttl is not None:
+            value = (value, self._clock() + self._ttl)
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def info(self):
+        """ Returns the hit and miss counts and the size of the cache """
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._maxsize, len(self._entries))
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+import threading
+import unittest
+
+from lexington.util import cache
+
+class LRUCacheTest(unittest.TestCase):
+    def setUp(self):
+        self._cache = cache.LRUCache(2)
+
+    def test_requires_positive_size(self):
+        with self.assertRaises(ValueError):
+            cache.LRUCache(0)
+
+    def test_get_and_put(self):
+        self.assertEqual(None, self._cache.get('a'))
+        self.assertEqual('default', self._cache.get('a', 'default'))
+        self._cache.put('a', 1)
+        self.assertEqual(1, self._cache.get('a'))
+
+    def test_drops_least_recently_used(self):
+        self._cache.put('a', 1)
+        self._cache.put('b', 2)
+        self._cache.get('a')
+        self._cache.put('c', 3)
+        self.assertEqual(1, self._cache.get('a'))
+        self.assertEqual(None, self._cache.get('b'))
+        self.assertEqual(3, self._cache.get('c'))
+        self.assertEqual(2, len(self._cache))
+
+    def test_counts_hits_and_misses(self):
+        self._cache.put('a', 1)
+        self._cache.get('a')
+        self._cache.get('a')
+        self._cache.get('b')
+        self.assertEqual(cache.CacheInfo(2, 1, 2, 1), self._cache.info())
+
+    def test_clear(self):
+        self._cache.put('a', 1)
+        self._cache.get('a')
+        self._cache.clear()
+        self.assertEqual(cache.CacheInfo(0, 0, 2, 0), self._cache.info())
+
+    def test_is_thread_safe(self):
+        lru = cache.LRUCache(10)
+        def worker(n):
+            for i in range(1000):
+                lru.put((n, i % 20), i)
+                lru.get((n, (i + 1) % 20))
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        info = lru.info()
+        self.assertEqual(4000, info.hits + info.misses)
+        self.assertEqual(10, info.currsize)
+
+class TTLTest(unittest.TestCase):
+    def setUp(self):
+        self._now = 100.0
+        self._cache = cache.LRUCache(2, ttl=10, clock=lambda: self._now)
+
+    def test_requires_positive_ttl(self):
+        with self.assertRaises(ValueError):
+            cache.LRUCache(2, ttl=0)
+
+    def test_entries_expire(self):
+        self._cache.put('a', 1)
+        self._now += 9
+        self.assertEqual(1, self._cache.get('a'))
+        self._now += 1
+        self.assertEqual(None, self._cache.get('a'))
+        self.assertEqual(0, len(self._cache))
+        self.assertEqual(cache.CacheInfo(1, 1, 2, 0), self._cache.info())
+
+    def test_put_restarts_ttl(self):
+        self._cache.put('a', 1)
+        self._now += 9
+        self._cache.put('a', 2)
+        self._now += 9
+        self.assertEqual(2, self._cache.get('a'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+"""
+Compressing response bodies for clients that accept gzip or deflate
+"""
+
+import functools
+import zlib
+
+from werkzeug.http import parse_accept_header
+
+from lexington.util.cache import LRUCache
+from lexington.util.response_cache import CachedResponse
+
+# The zlib wbits for each encoding (deflate in HTTP means the zlib format)
+ENCODINGS = {
+    'gzip': 16 + zlib.MAX_WBITS,
+    'deflate': zlib.MAX_WBITS,
+}
+
+COMPRESSIBLE_PREFIXES = (
+    'text/', 'application/json', 'application/javascript', 'application/xml',
+    'image/svg+xml',
+)
+COMPRESSIBLE_SUFFIXES = ('+json', '+xml')
+
+def is_compressible(content_type):
+    mimetype = content_type.split(';', 1)[0].strip().lower()
+    return mimetype.startswith(COMPRESSIBLE_PREFIXES) or mimetype.endswith(COMPRESSIBLE_SUFFIXES)
+
+@functools.lru_cache(maxsize=64)
+def choose_encoding(accept_encoding):
+    """ Returns the best encoding the Accept-Encoding header allows, or None.
+
+    There are only ever a few distinct headers, so the answers are cached.
+    """
+    if not accept_encoding:
+        return None
+    return parse_accept_header(accept_encoding).best_match(ENCODINGS)
+
+def _weak_etag(etag):
+    # The compressed body is a different representation of the same content, so the
+    # ETag is weakened (If-None-Match uses weak comparison, so it still matches)
+    return etag if etag.startswith('W/') else 'W/' + etag
+
+class Compressor:
+    """ A response filter (see `ApplicationFactory.add_response_filter`) that
+    compresses responses for clients that send Accept-Encoding.
+
+    Only successful responses with a compressible content type are compressed, and
+    only when the body is at least `min_size` bytes long. Streamed responses are
+    compressed one chunk at a time (each chunk is flushed, so the client still gets
+    it as soon as the view produces it). Responses that pass a file straight to the
+    server are left alone, so the server can still use something like sendfile.
+
+    Compressed bodies of repeatable responses (those with an ETag or Last-Modified
+    header, and those served from a ResponseCache) are cached, so the same bytes
+    aren't compressed again.
+    """
+    def __init__(self, min_size=1024, level=6, cache_size=256):
+        self._min_size = min_size
+        self._level = level
+        self._cache = LRUCache(cache_size) if cache_size else None
+
+    def __call__(self, response, environ):
+        if isinstance(response, CachedResponse):
+            return self._filter_cached(response, environ)
+        return self._filter_response(response, environ)
+
+    def compress(self, body, encoding):
+        compressor = zlib.compressobj(self._level, zlib.DEFLATED, ENCODINGS[encoding])
+        return compressor.compress(body) + compressor.flush()
+
+    def compress_chunks(self, chunks, encoding):
+        """ Yields the compressed chunks, closing `chunks` afterwards """
+        compressor = zlib.compressobj(self._level, zlib.DEFLATED, ENCODINGS[encoding])
+        try:
+            for chunk in chunks:
+                if chunk:
+                    yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            yield compressor.flush()
+        finally:
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                close()
+
+    def _cached(self, key, build):
+        if self._cache is None:
+            return build()
+        value = self._cache.get(key)
+        if value is None:
+            value = build()
+            self._cache.put(key, value)
+        return value
+
+    def _filter_response(self, response, environ):
+        if response.status_code != 200 or response.direct_passthrough:
+            return response
+        if 'Content-Encoding' in response.headers:
+            return response
+        if not is_compressible(response.headers.get('Content-Type', '')):
+            return response
+        streamed = response.is_streamed
+        if not streamed and response.calculate_content_length() < self._min_size:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(environ.get('HTTP_ACCEPT_ENCODING'))
+        if encoding is None:
+            return response
+
+        if streamed:
+            response.response = self.compress_chunks(response.iter_encoded(), encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            body = response.get_data()
+            if 'ETag' in response.headers or 'Last-Modified' in response.headers:
+                compressed = self._cached((encoding, body), lambda: self.compress(body, encoding))
+            else:
+                compressed = self.compress(body, encoding)
+            response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        if 'ETag' in response.headers:
+            response.headers['ETag'] = _weak_etag(response.headers['ETag'])
+        return response
+
+    def _filter_cached(self, response, environ):
+        if not response.status.startswith('200'):
+            return response
+        if len(response.body) < self._min_size:
+            return response
+        content_type = ''
+        for name, value in response.headers:
+            name = name.lower()
+            if name == 'content-encoding':
+                return response
+            if name == 'content-type':
+                content_type = value
+        if not is_compressible(content_type):
+            return response
+
+        encoding = choose_encoding(environ.get('HTTP_ACCEPT_ENCODING'))
+        # The whole entry is the key, so each cached response is only compressed once
+        return self._cached(
+            (encoding, response), lambda: self._encode_cached(response, encoding)
+        )
+
+    def _encode_cached(self, response, encoding):
+        body = response.body
+        headers = []
+        vary = []
+        for name, value in response.headers:
+            lower_name = name.lower()
+            if lower_name == 'vary':
+                vary.append(value)
+            elif encoding is not None and lower_name == 'etag':
+                headers.append((name, _weak_etag(value)))
+            elif encoding is None or lower_name != 'content-length':
+                headers.append((name, value))
+        vary.append('Accept-Encoding')
+        headers.append(('Vary', ', '.join(vary)))
+        if encoding is not None:
+            body = self.compress(body, encoding)
+            headers.append(('Content-Encoding', encoding))
+            headers.append(('Content-Length', str(len(body))))
+        return CachedResponse(response.status, tuple(headers), body)
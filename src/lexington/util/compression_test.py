@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+import gzip
+import unittest
+import zlib
+
+from werkzeug.test import EnvironBuilder
+from werkzeug.wrappers import Response
+
+from lexington.util import compression
+from lexington.util.response_cache import CachedResponse
+
+BODY = 'hello world ' * 200
+
+def environ(accept_encoding=None, method='GET'):
+    headers = {'Accept-Encoding': accept_encoding} if accept_encoding else {}
+    return EnvironBuilder(method=method, headers=headers).get_environ()
+
+class ChooseEncodingTest(unittest.TestCase):
+    def test_negotiates(self):
+        self.assertEqual('gzip', compression.choose_encoding('gzip, deflate'))
+        self.assertEqual('deflate', compression.choose_encoding('gzip;q=0.5, deflate'))
+        self.assertEqual('gzip', compression.choose_encoding('*'))
+        self.assertEqual(None, compression.choose_encoding('br'))
+        self.assertEqual(None, compression.choose_encoding('gzip;q=0'))
+        self.assertEqual(None, compression.choose_encoding(None))
+
+class CompressorTest(unittest.TestCase):
+    def setUp(self):
+        self.compressor = compression.Compressor(min_size=100)
+
+    def test_compresses_with_gzip(self):
+        response = self.compressor(Response(BODY), environ('gzip'))
+        self.assertEqual('gzip', response.headers['Content-Encoding'])
+        self.assertEqual('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(BODY.encode(), gzip.decompress(response.get_data()))
+        self.assertEqual(str(len(response.get_data())), response.headers['Content-Length'])
+
+    def test_compresses_with_deflate(self):
+        response = self.compressor(Response(BODY), environ('deflate'))
+        self.assertEqual(BODY.encode(), zlib.decompress(response.get_data()))
+
+    def test_leaves_other_responses_alone(self):
+        cases = [
+            (Response(BODY), environ()),
+            (Response('small'), environ('gzip')),
+            (Response(BODY, mimetype='image/png'), environ('gzip')),
+            (Response(BODY, status=404), environ('gzip')),
+            (Response(BODY, headers={'Content-Encoding': 'br'}), environ('gzip')),
+        ]
+        for response, env in cases:
+            data = response.get_data()
+            self.assertEqual(data, self.compressor(response, env).get_data())
+        self.assertEqual('br', cases[-1][0].headers['Content-Encoding'])
+
+    def test_compresses_streams_chunk_by_chunk(self):
+        closed = []
+        def chunks():
+            try:
+                yield 'a' * 500
+                yield 'b' * 500
+            finally:
+                closed.append(True)
+        response = self.compressor(Response(chunks()), environ('gzip'))
+        self.assertNotIn('Content-Length', response.headers)
+        compressed = list(response.response)
+        self.assertEqual(3, len(compressed))
+        self.assertEqual(b'a' * 500 + b'b' * 500, gzip.decompress(b''.join(compressed)))
+        self.assertEqual([True], closed)
+
+    def test_weakens_etags(self):
+        response = Response(BODY)
+        response.set_etag('v1')
+        self.assertEqual('W/"v1"', self.compressor(response, environ('gzip')).headers['ETag'])
+
+    def test_caches_repeatable_responses(self):
+        calls = []
+        compress = self.compressor.compress
+        self.compressor.compress = lambda body, encoding: calls.append(1) or compress(body, encoding)
+        for _ in range(2):
+            response = Response(BODY)
+            response.set_etag('v1')
+            self.compressor(response, environ('gzip'))
+            self.compressor(Response(BODY), environ('gzip'))
+        self.assertEqual(3, len(calls))
+
+    def test_compresses_cached_responses_once(self):
+        cached = CachedResponse('200 OK', (
+            ('Content-Type', 'text/plain'), ('Content-Length', str(len(BODY))), ('ETag', '"v1"')
+        ), BODY.encode())
+        first = self.compressor(cached, environ('gzip'))
+        self.assertIs(first, self.compressor(cached, environ('gzip')))
+        headers = dict(first.headers)
+        self.assertEqual('gzip', headers['Content-Encoding'])
+        self.assertEqual('W/"v1"', headers['ETag'])
+        self.assertEqual(str(len(first.body)), headers['Content-Length'])
+        self.assertEqual(BODY.encode(), gzip.decompress(first.body))
+
+        plain = self.compressor(cached, environ())
+        self.assertEqual(BODY.encode(), plain.body)
+        self.assertEqual('Accept-Encoding', dict(plain.headers)['Vary'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+"""
+Building independent blocking dependencies in parallel on a thread pool
+"""
+
+import concurrent.futures
+import functools
+import threading
+
+from lexington.util.di import (
+    Injector,
+    MissingDependencyException,
+    SINGLETON,
+    TRANSIENT,
+    _MISSING,
+)
+
+class ConcurrentInjector(Injector):
+    """ An Injector that builds independent dependencies at the same time.
+
+    Before calling a function, it works out which of the dependencies still need to be
+    built. Whenever more than one of them has all of its own dependencies ready, all but
+    one are submitted to the executor and the last is built on the calling thread, so a
+    chain of dependencies never leaves the calling thread.
+
+    Each value is built once, even if several threads ask for it at the same time.
+
+    Use `ConcurrentInjector.using(executor)` as the `injector_class` for
+    `InjectorPlan.build_injector`.
+    """
+    __slots__ = ('_executor', '_futures', '_lock')
+
+    def __init__(self, plan, slots, executor):
+        super().__init__(plan, slots)
+        self._executor = executor
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def using(cls, executor):
+        """ Returns an injector class that uses the given executor """
+        return functools.partial(cls, executor=executor)
+
+    def reset(self):
+        super().reset()
+        self._futures.clear()
+
+    def _add_finalizer(self, finalizer):
+        # Values are built on the executor's threads, so two could finish at once
+        with self._lock:
+            super()._add_finalizer(finalizer)
+
+    def get_dependency(self, name):
+        index = self._indexes.get(name)
+        if index is None:
+            raise MissingDependencyException("Missing dependency name: {}".format(name))
+        self._build_all([index])
+        return self._get_by_index(index)
+
+    def inject(self, fn, dependencies):
+        indexes = []
+        for name in dependencies or []:
+            index = self._indexes.get(name)
+            if index is None:
+                raise MissingDependencyException("Missing dependency name: {}".format(name))
+            indexes.append(index)
+        self._build_all(indexes)
+        return fn(*[self._get_by_index(index) for index in indexes])
+
+    def _get_by_index(self, index):
+        value = self._slots[index]
+        if value is _MISSING:
+            future = self._futures.get(index)
+            if future is not None:
+                return future.result()
+            return super()._get_by_index(index)
+        return value
+
+    def _find_needed(self, indexes):
+        """ Returns the request-scoped values that have to be built for the indexes.
+
+        Singletons are built by the plan, and transient values are built whenever they
+        are used, so only their dependencies are included.
+        """
+        needed = set()
+        stack = list(indexes)
+        while stack:
+            index = stack.pop()
+            if index in needed or self._slots[index] is not _MISSING:
+                continue
+            fn, dependencies, scope = self._factories[index]
+            if scope == SINGLETON:
+                continue
+            if scope != TRANSIENT:
+                needed.add(index)
+            stack.extend(dependencies)
+        return needed
+
+    def _is_done(self, index):
+        if self._slots[index] is not _MISSING:
+            return True
+        fn, dependencies, scope = self._factories[index]
+        if scope == SINGLETON:
+            return True
+        if scope == TRANSIENT:
+            return all(self._is_done(dependency) for dependency in dependencies)
+        return self._futures[index].done()
+
+    def _unfinished_futures(self, index):
+        if self._slots[index] is not _MISSING:
+            return []
+        fn, dependencies, scope = self._factories[index]
+        if scope == SINGLETON:
+            return []
+        if scope == TRANSIENT:
+            return [
+                future
+                for dependency in dependencies
+                for future in self._unfinished_futures(dependency)
+            ]
+        future = self._futures[index]
+        return [] if future.done() else [future]
+
+    def _build_all(self, indexes):
+        """ Builds everything needed for the indexes, returning once all are built """
+        needed = self._find_needed(indexes)
+        if not needed:
+            return
+
+        # Claim the values no other thread is building yet
+        with self._lock:
+            remaining = []
+            for index in sorted(needed):
+                if index not in self._futures:
+                    self._futures[index] = concurrent.futures.Future()
+                    remaining.append(index)
+
+        while remaining:
+            ready = [
+                index for index in remaining
+                if all(self._is_done(dependency) for dependency in self._factories[index].dependencies)
+            ]
+            if not ready:
+                unfinished = {
+                    future
+                    for index in remaining
+                    for dependency in self._factories[index].dependencies
+                    for future in self._unfinished_futures(dependency)
+                }
+                concurrent.futures.wait(unfinished, return_when=concurrent.futures.FIRST_COMPLETED)
+                continue
+
+            for index in ready:
+                remaining.remove(index)
+            for index in ready[:-1]:
+                self._executor.submit(self._build, index)
+            self._build(ready[-1])
+
+        # Wait for values being built by the executor or by other threads
+        for index in needed:
+            concurrent.futures.wait([self._futures[index]])
+
+    def _build(self, index):
+        future = self._futures[index]
+        try:
+            fn, dependencies, _ = self._factories[index]
+            value = fn(*[self._get_by_index(dependency) for dependency in dependencies])
+            if self._teardowns is not None:
+                value = self._built(index, value)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            self._slots[index] = value
+            future.set_result(value)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+import concurrent.futures
+import threading
+import time
+import unittest
+
+from lexington.util import di
+from lexington.util import concurrent_di
+
+class ConcurrentInjectorTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.executor = concurrent.futures.ThreadPoolExecutor(4)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.executor.shutdown()
+
+    def setUp(self):
+        self.calls = []
+        self.lock = threading.Lock()
+        self.dependencies = di.Dependencies()
+        self.dependencies.register_late_bound_value('request')
+
+    def _slow(self, name, result, seconds=0.1):
+        def slow(*args):
+            with self.lock:
+                self.calls.append(name)
+            time.sleep(seconds)
+            return result
+        return slow
+
+    def _injector(self):
+        plan = self.dependencies.compile()
+        injector_class = concurrent_di.ConcurrentInjector.using(self.executor)
+        return plan.build_injector({'request': 1}, injector_class=injector_class)
+
+    def test_runs_independent_factories_in_parallel(self):
+        for name in ['a', 'b', 'c']:
+            self.dependencies.register_factory(name, self._slow(name, name), ['request'])
+
+        start = time.monotonic()
+        result = self._injector().inject(lambda a, b, c: a + b + c, ['a', 'b', 'c'])
+        self.assertEqual('abc', result)
+        self.assertLess(time.monotonic() - start, 0.25)
+
+    def test_builds_shared_values_once(self):
+        self.dependencies.register_factory('shared', self._slow('shared', 1, 0.01))
+        self.dependencies.register_factory('a', self._slow('a', 2, 0.01), ['shared'])
+        self.dependencies.register_factory('b', self._slow('b', 3, 0.01), ['shared'])
+        injector = self._injector()
+
+        threads = [
+            threading.Thread(target=injector.inject, args=(lambda a, b: None, ['a', 'b']))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(['shared', 'a', 'b'], sorted(self.calls, key=['shared', 'a', 'b'].index))
+        self.assertEqual(3, injector.get_dependency('b'))
+
+    def test_tears_down_values_built_at_once(self):
+        names = ['a', 'b', 'c', 'd']
+        # Every factory returns at the same time, on a different thread
+        barrier = threading.Barrier(len(names))
+        torn_down = []
+        def factory(name):
+            def build(request):
+                barrier.wait()
+                return name
+            return build
+        for name in names:
+            self.dependencies.register_factory(
+                name, factory(name), ['request'], teardown=torn_down.append
+            )
+        injector = self._injector()
+        injector.inject(lambda *values: None, names)
+        injector.close()
+        self.assertEqual(names, sorted(torn_down))
+
+    def test_handles_singletons_and_transients(self):
+        counter = iter(range(100))
+        self.dependencies.register_factory('one', lambda: 1, scope=di.SINGLETON)
+        self.dependencies.register_factory('next', lambda: next(counter), scope=di.TRANSIENT)
+        self.dependencies.register_factory('pair', lambda a, b: (a, b), ['next', 'one'])
+        injector = self._injector()
+        self.assertEqual(1, injector.get_dependency('one'))
+        self.assertEqual((0, 1), injector.get_dependency('pair'))
+        self.assertEqual((0, 1), injector.get_dependency('pair'))
+        self.assertEqual(1, injector.get_dependency('next'))
+
+    def test_raises_factory_errors(self):
+        def fail(request):
+            raise ValueError('broken')
+        self.dependencies.register_factory('broken', fail, ['request'])
+        self.dependencies.register_factory('other', self._slow('other', 1, 0), ['request'])
+        self.dependencies.register_factory('uses_broken', lambda broken: broken, ['broken'])
+        injector = self._injector()
+        with self.assertRaises(ValueError):
+            injector.inject(lambda a, b: None, ['uses_broken', 'other'])
+        with self.assertRaises(ValueError):
+            injector.get_dependency('broken')
+
+    def test_missing_dependency(self):
+        with self.assertRaises(di.MissingDependencyException):
+            self._injector().get_dependency('nope')
+
+if __name__ == '__main__':
+    unittest.main()
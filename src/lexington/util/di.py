@@ -1,5 +1,6 @@
 import collections
 import itertools
+import threading
 
 class InjectorException(Exception):
     pass
@@ -19,9 +20,27 @@ class CircularDependencyException(InjectorException):
 class UnexpectedBindingException(InjectorException):
     pass
 
-Factory = collections.namedtuple('Factory', 'fn dependencies')
+class BadScopeException(InjectorException):
+    pass
+
+class ScopeMismatchException(InjectorException):
+    pass
+
+# Scopes control how often a factory is called:
+# - SINGLETON factories are called once per application, and the value is shared
+#   between requests
+# - REQUEST factories are called at most once per request (per Injector)
+# - TRANSIENT factories are called every time the value is injected
+SINGLETON = 'singleton'
+REQUEST = 'request'
+TRANSIENT = 'transient'
+SCOPES = (SINGLETON, REQUEST, TRANSIENT)
+
+Factory = collections.namedtuple('Factory', 'fn dependencies scope', defaults=(REQUEST,))
 
 class Dependant(collections.namedtuple('Dependant', 'fn dependencies')):
+    __slots__ = ()
+
     def __call__(self, *args, **kwargs):
         return self.fn(*args, **kwargs)
 
@@ -30,9 +49,119 @@ def depends_on(dependencies):
         return Dependant(fn, dependencies)
     return dependant_wrapper
 
+def is_async_function(fn):
+    """ Returns True for `async def` functions.
+
+    Same as inspect.iscoroutinefunction, but only imports inspect (which is slow to
+    import) the first time it is needed.
+    """
+    import inspect
+    return inspect.iscoroutinefunction(fn)
+
+def is_generator_function(fn):
+    """ Returns True for generator functions (like is_async_function, imports inspect
+    lazily)
+    """
+    import inspect
+    return inspect.isgeneratorfunction(fn)
+
+# Stands in for the teardown of generator factories, which is resuming the generator
+_GENERATOR = object()
+
+def _finish_generator(generator, error=None):
+    """ Runs the rest of a generator factory (the code after its yield). If the request
+    failed, the error is raised inside the generator at its yield instead, so it can
+    clean up differently (the same as contextlib.contextmanager).
+    """
+    try:
+        if error is None:
+            next(generator)
+        else:
+            generator.throw(error)
+    except StopIteration:
+        return
+    except BaseException as e:
+        if e is error:
+            # The generator didn't handle it, and it is already being raised
+            return
+        raise
+    generator.close()
+    raise InjectorException('Generator factories must only yield once')
+
+def run_finalizers(finalizers, error=None):
+    """ Calls each `teardown(value)` in a list of (teardown, value), the last first.
+
+    error - the exception that the work using the values failed with, if any, which
+            is raised inside generator factories
+
+    Every teardown runs even if an earlier one fails; the first exception is raised
+    once they have all run.
+    """
+    first_error = None
+    while finalizers:
+        teardown, value = finalizers.pop()
+        try:
+            if teardown is _finish_generator:
+                _finish_generator(value, error)
+            else:
+                teardown(value)
+        except Exception as e:
+            if first_error is None:
+                first_error = e
+    if first_error is not None:
+        raise first_error
+
 def merge_dictionaries(a, b):
     return dict(itertools.chain(a.items(), b.items()))
 
+def check_late_bound_values(expected_names, provided_names):
+    """ Checks that exactly the expected late-bound values were provided. """
+    missing_values = expected_names - provided_names
+    if missing_values:
+        raise MissingDependencyException(
+            'Missing late-bound values: {}'
+            .format(' '.join(missing_values))
+        )
+
+    extra_values = provided_names - expected_names
+    if extra_values:
+        raise UnexpectedBindingException(
+            'Provided late-bound values were not previously registered: {}'
+            .format(' '.join(extra_values))
+        )
+
+def make_dependency_graph(factories, late_bound_names):
+    graph = {
+        name: Factory(*factory).dependencies or []
+        for name, factory in factories.items()
+    }
+    for name in late_bound_names:
+        graph[name] = []
+    return DependencyGraph(graph)
+
+def check_graph(dependency_graph):
+    """ Raises an exception if the graph has missing or circular dependencies. """
+    if dependency_graph.has_missing_dependencies():
+        raise MissingDependencyException()
+    if dependency_graph.has_circular_dependencies():
+        raise CircularDependencyException()
+
+def check_scopes(factories):
+    """ Raises an exception if a singleton depends on something that isn't a singleton.
+
+    A singleton outlives any single request, so it can't hold on to request values
+    (including late-bound values, which are supplied per request).
+    """
+    for name, factory in factories.items():
+        fn, dependencies, scope = Factory(*factory)
+        if scope != SINGLETON:
+            continue
+        for dependency in dependencies or []:
+            if dependency not in factories or Factory(*factories[dependency]).scope != SINGLETON:
+                raise ScopeMismatchException(
+                    'Singleton {} depends on non-singleton {}'.format(name, dependency)
+                )
+
 class DependencyGraph:
     def __init__(self, graph):
         self._graph = graph
@@ -57,6 +186,16 @@ class DependencyGraph:
 
         Returns True if there is a cycle.
         """
+        return len(self.topological_order()) < len(self._graph)
+
+    def topological_order(self):
+        """ Orders the names in the graph so that each name comes after all of its
+        dependencies.
+
+        Names that are part of a cycle (or depend on one) are left out.
+
+        Returns a list of names.
+        """
         dep_counts = {
             name: len(dependencies)
             for name, dependencies in self._graph.items()
@@ -72,41 +211,68 @@ class DependencyGraph:
             if len(dependencies) == 0
         )
 
-        num_removed = 0
+        order = []
         while deps_met:
-            num_removed += 1
             done = deps_met.pop()
+            order.append(done)
             for name in depends_on[done]:
                 dep_counts[name] -= 1
                 if dep_counts[name] == 0:
                     deps_met.append(name)
 
-        return num_removed < len(self._graph)
+        return order
 
 class Dependencies:
     """ A factory for setting up and building an Injector instance.  """
     def __init__(self):
         self._factories = dict()
         self._late_bound_dependencies = set()
+        self._teardowns = dict()
 
     def _add_item(self, kind, name, value, dependencies):
         self._names_used.add(name)
 
     def register_value(self, name, value):
         """ Bind a value to a name. The Injector will always return the value as-is.  """
-        self.register_factory(name, lambda: value)
+        self.register_factory(name, lambda: value, scope=SINGLETON)
 
-    def register_dependant(self, name, dependant):
-        self.register_factory(name, dependant.fn, dependencies=dependant.dependencies)
+    def register_dependant(self, name, dependant, scope=REQUEST):
+        self.register_factory(
+            name, dependant.fn, dependencies=dependant.dependencies, scope=scope
+        )
 
-    def register_factory(self, name, factory, dependencies=None):
+    def register_factory(self, name, factory, dependencies=None, scope=REQUEST,
+                         teardown=None):
         """ Binds a factory to a name. The injector will call the factory function once
         (if the name is ever used), and always return the value that the factory returns.
 
         The factory will be called with the dependencies (if any listed) as arguments.
+        If it is a generator function, it must yield the value exactly once; the rest of
+        the generator runs as the value's teardown (if the request failed, its exception
+        is raised at the yield).
+
+        scope    - how long the value lives: SINGLETON (shared by all requests), REQUEST
+                   (the default, built once per request), or TRANSIENT (built every time
+                   it is injected)
+        teardown - if given, called with each value the factory built. Request and
+                   transient values are torn down when the injector that built them is
+                   closed (see `Injector.close`), singletons when the plan is (see
+                   `InjectorPlan.close`). A plan copied into forked processes is
+                   closed in each of them, so the teardown of a singleton built before
+                   forking runs once per process.
         """
         self._check_name(name)
-        self._factories[name] = Factory(factory, dependencies)
+        if scope not in SCOPES:
+            raise BadScopeException("Bad scope: {!r}".format(scope))
+        if is_generator_function(factory):
+            if teardown is not None:
+                raise InjectorException(
+                    "Generator factory {} can't have a separate teardown".format(name)
+                )
+            teardown = _GENERATOR
+        self._factories[name] = Factory(factory, dependencies, scope)
+        if teardown is not None:
+            self._teardowns[name] = teardown
 
     def register_late_bound_value(self, name):
         self._check_name(name)
@@ -118,77 +284,299 @@ class Dependencies:
         if name in self._factories or name in self._late_bound_dependencies:
             raise DuplicateNameException("Duplicate name: {}".format(name))
 
-    def _make_dependency_graph(self, late_bound_value_names):
-        graph = {
-            name: dependencies or []
-            for name, (_, dependencies) in self._factories.items()
-        }
-        for name in late_bound_value_names:
-            graph[name] = []
-        return DependencyGraph(graph)
-
-    def _check_late_bound_values(self, provided_values_set):
-        missing_values = self._late_bound_dependencies - provided_values_set
-        if missing_values:
-            raise MissingDependencyException(
-                'Missing late-bound values: {}'
-                .format(' '.join(missing_values))
-            )
-
-        extra_values = provided_values_set - self._late_bound_dependencies
-        if extra_values:
-            raise UnexpectedBindingException(
-                'Provided late-bound values were not previously registered: {}'
-                .format(' '.join(extra_values))
-            )
+    def check_dependencies(self):
+        """ Checks if the injector will build successfully, assuming all late-bound values
+        are supplied.
+        """
+        check_graph(make_dependency_graph(self._factories, self._late_bound_dependencies))
+        check_scopes(self._factories)
 
-    def _check_injector_state(self, late_bound_value_names):
-        self._check_late_bound_values(late_bound_value_names)
+    def compile(self, order=None):
+        """ Checks the dependencies and compiles them into an InjectorPlan.
 
-        dependency_graph = self._make_dependency_graph(late_bound_value_names)
-        if dependency_graph.has_missing_dependencies():
-            raise MissingDependencyException()
-        if dependency_graph.has_circular_dependencies():
-            raise CircularDependencyException()
+        This does all of the validation up front, so the plan can build an injector for
+        each request without checking the dependency graph again.
 
-    def _get_factories(self, late_bound_values):
-        return merge_dictionaries(
-            self._factories,
-            {name: Factory(lambda: value, []) for name, value in late_bound_values.items()}
+        order - see `InjectorPlan.from_factories`
+        """
+        return InjectorPlan.from_factories(
+            self._factories, self._late_bound_dependencies, order, self._teardowns
         )
 
-    def check_dependencies(self):
-        """ Checks if the injector will build successfully, assuming all late-bound values
-        are supplied.
+    def registrations(self):
+        """ Returns a description of everything registered (except the functions
+        themselves), which only changes when the dependency graph might have.
         """
-        self._check_injector_state(self._late_bound_dependencies)
+        return (
+            tuple(sorted(
+                (name, tuple(dependencies or ()), scope, is_async_function(fn))
+                for name, (fn, dependencies, scope) in self._factories.items()
+            )),
+            tuple(sorted(self._late_bound_dependencies)),
+        )
 
     def build_injector(self, late_bound_values=None):
         """ Builds an injector instance that can be used to inject dependencies.
 
         Also checks for common errors (missing dependencies and circular dependencies).
+        When building many injectors, prefer compiling the dependencies once with
+        `compile()` and using `InjectorPlan.build_injector()`.
         """
-        if late_bound_values is None:
-            late_bound_values = {}
-        self._check_injector_state(late_bound_values.keys())
-        return Injector(self._get_factories(late_bound_values))
+        return self.compile().build_injector(late_bound_values)
 
     def provided_dependencies(self):
         """ Returns a set of names of dependencies the Injector will supply once built """
         return self._factories.keys() | self._late_bound_dependencies
 
+_MISSING = object()
+
+class InjectorPlan:
+    """ A validated, immutable table describing how to build each dependency.
+
+    Dependencies are stored in topological order (each one after everything it depends
+    on) and refer to each other by index rather than by name.
+    """
+    def __init__(self, names, factories, late_bound_names, teardowns=None):
+        """ Create an InjectorPlan.
+
+        The prefered way to create an InjectorPlan is with `Dependencies.compile()`.
+
+        names            - dependency names, in topological order
+        factories        - a Factory for each name whose dependencies are indexes, or None
+                           for late-bound values
+        late_bound_names - names of the values that must be supplied to each injector
+        teardowns        - a map from name to teardown function (see
+                           `Dependencies.register_factory`)
+        """
+        self._names = tuple(names)
+        self._factories = tuple(factories)
+        self._indexes = {name: index for index, name in enumerate(self._names)}
+        self._late_bound_indexes = {name: self._indexes[name] for name in late_bound_names}
+        self._teardown_map = dict(teardowns or {})
+        # The teardown for each index, or None when nothing needs one (so injectors can
+        # skip looking)
+        self._teardowns = tuple(
+            self._teardown_map.get(name) for name in self._names
+        ) if self._teardown_map else None
+        # Holds the singleton values once they are built; copied into each injector
+        self._initial_slots = [_MISSING] * len(self._names)
+        self._singleton_lock = threading.RLock()
+        # (teardown, value) for each singleton built so far that has a teardown
+        self._singleton_finalizers = []
+
+        # Whether building each dependency involves awaiting an `async def` factory.
+        # Relies on dependencies coming before the things that depend on them.
+        needs_await = []
+        for factory in self._factories:
+            needs_await.append(factory is not None and (
+                is_async_function(factory.fn) or
+                any(needs_await[dependency] for dependency in factory.dependencies)
+            ))
+        self._needs_await = tuple(needs_await)
+
+    @classmethod
+    def from_factories(cls, factories, late_bound_names=(), order=None, teardowns=None):
+        """ Checks and compiles a plan.
+
+        factories        - a map from name to Factory, where dependencies are names
+        late_bound_names - names of values that will be supplied to each injector
+        order            - the topological order from an earlier plan for exactly the
+                           same factories. The factories are trusted, so the checks
+                           are skipped.
+        teardowns        - a map from name to teardown function
+        """
+        if order is None:
+            dependency_graph = make_dependency_graph(factories, late_bound_names)
+            check_graph(dependency_graph)
+            check_scopes(factories)
+            order = dependency_graph.topological_order()
+
+        names = order
+        indexes = {name: index for index, name in enumerate(names)}
+        compiled_factories = []
+        for name in names:
+            if name in factories:
+                fn, dependencies, scope = Factory(*factories[name])
+                compiled_factories.append(Factory(
+                    fn,
+                    tuple(indexes[dependency] for dependency in dependencies or []),
+                    scope
+                ))
+            else:
+                compiled_factories.append(None)
+        return cls(names, compiled_factories, late_bound_names, teardowns)
+
+    def has_dependency(self, name):
+        return name in self._indexes
+
+    def wrap_factories(self, wrap):
+        """ Returns a new plan where each factory is replaced by `wrap(name, fn)`.
+
+        Singletons that were already built are not built again.
+        """
+        plan = InjectorPlan(
+            self._names,
+            [
+                None if factory is None else
+                Factory(wrap(name, factory.fn), factory.dependencies, factory.scope)
+                for name, factory in zip(self._names, self._factories)
+            ],
+            self._late_bound_indexes.keys(),
+            self._teardown_map
+        )
+        plan._initial_slots = list(self._initial_slots)
+        plan._singleton_finalizers = list(self._singleton_finalizers)
+        return plan
+
+    def provided_dependencies(self):
+        """ Returns a set of names of dependencies the injectors will supply """
+        return self._indexes.keys()
+
+    def get_order(self):
+        """ Returns the names of the dependencies in topological order """
+        return self._names
+
+    def is_async(self, name):
+        """ Returns True if building the dependency involves an `async def` factory, in
+        which case it can only be used by an AsyncInjector.
+        """
+        return self._needs_await[self._indexes[name]]
+
+    def async_dependencies(self):
+        """ Returns the set of names for which `is_async` is True """
+        return {
+            name for name, needs_await in zip(self._names, self._needs_await) if needs_await
+        }
+
+    def warm(self):
+        """ Builds all singletons now, rather than on the first request that uses them.
+
+        Singletons that involve `async def` factories are skipped (see
+        `async_di.warm_async`).
+        """
+        for index, factory in enumerate(self._factories):
+            if factory is not None and factory.scope == SINGLETON:
+                if not self._needs_await[index]:
+                    self._get_singleton(index)
+
+    def _set_singleton(self, index, value):
+        """ Stores a singleton built outside the plan, unless one was stored first.
+
+        Returns the stored value.
+        """
+        with self._singleton_lock:
+            if self._initial_slots[index] is _MISSING:
+                self._initial_slots[index] = value
+            return self._initial_slots[index]
+
+    def _get_singleton(self, index):
+        value = self._initial_slots[index]
+        if value is _MISSING:
+            with self._singleton_lock:
+                value = self._initial_slots[index]
+                if value is _MISSING:
+                    fn, dependencies, _ = self._factories[index]
+                    value = fn(*[self._get_singleton(dependency) for dependency in dependencies])
+                    if self._teardowns is not None:
+                        value = self._built_singleton(index, value)
+                    self._initial_slots[index] = value
+        return value
+
+    def _built_singleton(self, index, value):
+        """ Remembers to tear down a singleton (when the plan is closed), if it needs it.
+
+        Returns the value to use, which for generator factories is the yielded value.
+        """
+        value, finalizer = _start_teardown(self._teardowns[index], value)
+        if finalizer is not None:
+            with self._singleton_lock:
+                self._singleton_finalizers.append(finalizer)
+        return value
+
+    def close(self):
+        """ Tears down the singletons that were built, the most recently built first
+        (see `run_finalizers`). Call this when the application shuts down.
+        """
+        with self._singleton_lock:
+            finalizers = self._singleton_finalizers
+            self._singleton_finalizers = []
+        run_finalizers(finalizers)
+
+    def build_injector(self, late_bound_values=None, injector_class=None):
+        """ Builds an injector with the given late-bound values.
+
+        Only checks that the late-bound values match the ones that were registered.
+
+        injector_class - the type of injector to build (defaults to Injector)
+        """
+        if late_bound_values is None:
+            late_bound_values = {}
+        if late_bound_values.keys() != self._late_bound_indexes.keys():
+            check_late_bound_values(
+                self._late_bound_indexes.keys(), set(late_bound_values.keys())
+            )
+
+        slots = list(self._initial_slots)
+        for name, value in late_bound_values.items():
+            slots[self._late_bound_indexes[name]] = value
+        return (injector_class or Injector)(self, slots)
+
+    def injector_builder(self, late_bound_names, injector_class=None):
+        """ Returns a function that builds injectors like `build_injector`, but takes the
+        late-bound values as arguments in the order of `late_bound_names`.
+
+        The names are checked once here, so building each injector only copies the
+        slots and fills in the values, without building or checking a dict of values.
+        """
+        check_late_bound_values(self._late_bound_indexes.keys(), set(late_bound_names))
+        indexes = tuple(self._late_bound_indexes[name] for name in late_bound_names)
+        injector_class = injector_class or Injector
+
+        def build(*values):
+            slots = self._initial_slots.copy()
+            for index, value in zip(indexes, values):
+                slots[index] = value
+            return injector_class(self, slots)
+        return build
+
+def _start_teardown(teardown, value):
+    """ Returns (the value, its (teardown, value) finalizer or None) for a value that
+    was just built. A generator factory's value is what it yields.
+    """
+    if teardown is None:
+        return value, None
+    if teardown is _GENERATOR:
+        generator = value
+        try:
+            value = next(generator)
+        except StopIteration:
+            raise InjectorException('Generator factory finished without yielding') from None
+        return value, (_finish_generator, generator)
+    return value, (teardown, value)
+
 class Injector:
-    def __init__(self, factories):
+    # One of these is built for every request, so it has no __dict__
+    __slots__ = ('_plan', '_factories', '_indexes', '_slots', '_teardowns', '_finalizers')
+
+    def __init__(self, plan, slots):
         """ Create an Injector.
 
-        The prefered way to create an Injector is with `Dependencies.build_injector()`.
+        The prefered way to create an Injector is with `InjectorPlan.build_injector()`.
+
+        plan  - the InjectorPlan describing the dependencies
+        slots - a list with a value (or _MISSING) for each dependency in the plan
         """
-        self._factories = factories
-        self._value_cache = {}
+        self._plan = plan
+        self._factories = plan._factories
+        self._indexes = plan._indexes
+        self._slots = slots
+        self._teardowns = plan._teardowns
+        # (teardown, value) for each value built so far that has a teardown
+        self._finalizers = None
 
     def has_dependency(self, name):
         """ Check if the Injector has a dependency """
-        return name in self._factories
+        return name in self._indexes
 
     def get_dependency(self, name):
         """ Get the value of a dependency.
@@ -197,11 +585,60 @@ class Injector:
 
         Returns the value of the dependency
         """
-        if not self.has_dependency(name):
+        index = self._indexes.get(name)
+        if index is None:
             raise MissingDependencyException("Missing dependency name: {}".format(name))
-        if name not in self._value_cache:
-            self._value_cache[name] = self.inject(*self._factories[name])
-        return self._value_cache[name]
+        return self._get_by_index(index)
+
+    def _get_by_index(self, index):
+        value = self._slots[index]
+        if value is _MISSING:
+            fn, dependencies, scope = self._factories[index]
+            if scope == SINGLETON:
+                value = self._plan._get_singleton(index)
+            else:
+                value = fn(*[self._get_by_index(dependency) for dependency in dependencies])
+                if self._teardowns is not None:
+                    value = self._built(index, value)
+                if scope == TRANSIENT:
+                    return value
+            self._slots[index] = value
+        return value
+
+    def _built(self, index, value):
+        """ Remembers to tear down a (request or transient) value, if it needs it.
+
+        Returns the value to use, which for generator factories is the yielded value.
+        """
+        value, finalizer = _start_teardown(self._teardowns[index], value)
+        if finalizer is not None:
+            self._add_finalizer(finalizer)
+        return value
+
+    def _add_finalizer(self, finalizer):
+        if self._finalizers is None:
+            self._finalizers = []
+        self._finalizers.append(finalizer)
+
+    def close(self, error=None):
+        """ Runs the teardowns for the values this injector built, the most recently
+        built first (see `run_finalizers`).
+
+        error - the exception the request failed with, if it did
+
+        Closing again does nothing (until more values are built).
+        """
+        finalizers = self._finalizers
+        self._finalizers = None
+        if finalizers:
+            run_finalizers(finalizers, error)
+
+    def reset(self):
+        """ Forgets every value the injector built (and the late-bound values), so it
+        can be used again. Call `close` first.
+        """
+        self._slots[:] = self._plan._initial_slots
+        self._finalizers = None
 
     def inject(self, fn, dependencies):
         """ Calls the function with the value of the listed dependencies
@@ -213,3 +650,63 @@ class Injector:
         """
         args = map(self.get_dependency, dependencies) if dependencies else []
         return fn(*args)
+
+class InjectorPool:
+    """ Reuses injectors between requests, rather than building a new one for each.
+
+    Every injector from a plan has the same shape, so a released injector only has to
+    be reset (which copies the plan's slots over its own) before it is checked out
+    again. Checking out and releasing are safe from multiple threads: each injector is
+    only ever handed to one caller at a time.
+
+    An injector that is never released (or is discarded) is simply not reused.
+    """
+    def __init__(self, plan, late_bound_names, injector_class=None, maxsize=64):
+        """ plan             - the InjectorPlan to build injectors from
+        late_bound_names - the names of the late-bound values, in the order they are
+                           passed to `checkout`
+        maxsize          - the most released injectors to keep for reuse
+        """
+        self._build = plan.injector_builder(late_bound_names, injector_class)
+        self._late_bound_indexes = tuple(
+            plan._late_bound_indexes[name] for name in late_bound_names
+        )
+        self._maxsize = maxsize
+        # deque's append and pop are atomic, so no lock is needed
+        self._free = collections.deque()
+
+    def checkout(self, *late_bound_values):
+        """ Returns an injector with the given late-bound values """
+        try:
+            injector = self._free.pop()
+        except IndexError:
+            return self._build(*late_bound_values)
+        slots = injector._slots
+        for index, value in zip(self._late_bound_indexes, late_bound_values):
+            slots[index] = value
+        return injector
+
+    def release(self, injector):
+        """ Closes the injector (running its teardowns) and keeps it for reuse.
+
+        Raises the first exception a teardown raised, after the injector is reset.
+        """
+        try:
+            injector.close()
+        finally:
+            injector.reset()
+            if len(self._free) < self._maxsize:
+                self._free.append(injector)
+
+    def discard(self, injector, error=None):
+        """ Closes the injector without reusing it, for example after an error (when
+        something might still be using its values)
+
+        error - the exception the request failed with, which is raised inside
+                generator factories (see `Injector.close`)
+        """
+        injector.close(error)
+
+    def size(self):
+        """ Returns the number of injectors waiting to be reused """
+        return len(self._free)
@@ -55,6 +55,25 @@ class CircularDependenciesTest(unittest.TestCase):
             'd': ['b'],
         }
 )
+
+class TopologicalOrderTest(unittest.TestCase):
+    def test_orders_dependencies_first(self):
+        dependency_graph = di.DependencyGraph({
+            'a': ['b', 'c'],
+            'b': ['c'],
+            'c': [],
+            'd': ['a'],
+        })
+        self.assertEqual(['c', 'b', 'a', 'd'], dependency_graph.topological_order())
+
+    def test_leaves_out_cycles(self):
+        dependency_graph = di.DependencyGraph({
+            'a': [],
+            'b': ['c'],
+            'c': ['b'],
+        })
+        self.assertEqual(['a'], dependency_graph.topological_order())
+
 class DependenciesTest(unittest.TestCase):
     def setUp(self):
         self.dependencies = di.Dependencies()
@@ -143,14 +162,134 @@ class DependenciesTest(unittest.TestCase):
                 'val': 1,
             })
 
+class InjectorPlanTest(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        dependencies = di.Dependencies()
+        dependencies.register_late_bound_value('request')
+        dependencies.register_factory(
+            'args', self._record('args', lambda request: request['args']), ['request']
+        )
+        dependencies.register_factory(
+            'doubled', self._record('doubled', lambda args: args * 2), ['args']
+        )
+        self.plan = dependencies.compile()
+
+    def _record(self, name, fn):
+        def recording_fn(*args):
+            self.calls.append(name)
+            return fn(*args)
+        return recording_fn
+
+    def test_provided_dependencies(self):
+        self.assertEqual({'request', 'args', 'doubled'}, set(self.plan.provided_dependencies()))
+
+    def test_compile_catches_errors(self):
+        dependencies = di.Dependencies()
+        dependencies.register_factory('f1', lambda f2: 1, dependencies=['f2'])
+        with self.assertRaises(di.MissingDependencyException):
+            dependencies.compile()
+
+        dependencies.register_factory('f2', lambda f1: 2, dependencies=['f1'])
+        with self.assertRaises(di.CircularDependencyException):
+            dependencies.compile()
+
+    def test_builds_independent_injectors(self):
+        injector1 = self.plan.build_injector({'request': {'args': 1}})
+        injector2 = self.plan.build_injector({'request': {'args': 10}})
+        self.assertEqual(2, injector1.get_dependency('doubled'))
+        self.assertEqual(20, injector2.get_dependency('doubled'))
+
+    def test_calls_factories_once_per_injector(self):
+        injector = self.plan.build_injector({'request': {'args': 1}})
+        injector.get_dependency('doubled')
+        injector.get_dependency('doubled')
+        injector.get_dependency('args')
+        self.assertEqual(['args', 'doubled'], self.calls)
+
+    def test_checks_late_bound_values(self):
+        with self.assertRaises(di.MissingDependencyException):
+            self.plan.build_injector()
+        with self.assertRaises(di.UnexpectedBindingException):
+            self.plan.build_injector({'request': {}, 'other': 1})
+
+    def test_injector_builder(self):
+        build = self.plan.injector_builder(['request'])
+        self.assertEqual(2, build({'args': 1}).get_dependency('doubled'))
+        self.assertEqual(20, build({'args': 10}).get_dependency('doubled'))
+        with self.assertRaises(di.MissingDependencyException):
+            self.plan.injector_builder([])
+        with self.assertRaises(di.UnexpectedBindingException):
+            self.plan.injector_builder(['request', 'other'])
+
+class ScopeTest(unittest.TestCase):
+    def setUp(self):
+        self.dependencies = di.Dependencies()
+        self.dependencies.register_late_bound_value('request')
+        self.counter = 0
+
+    def _count(self, *args):
+        self.counter += 1
+        return self.counter
+
+    def test_rejects_unknown_scope(self):
+        with self.assertRaises(di.BadScopeException):
+            self.dependencies.register_factory('x', self._count, scope='forever')
+
+    def test_singleton_is_shared_between_injectors(self):
+        self.dependencies.register_factory('x', self._count, scope=di.SINGLETON)
+        plan = self.dependencies.compile()
+        self.assertEqual(1, plan.build_injector({'request': 1}).get_dependency('x'))
+        self.assertEqual(1, plan.build_injector({'request': 2}).get_dependency('x'))
+
+    def test_warm_builds_singletons(self):
+        self.dependencies.register_factory('x', self._count, scope=di.SINGLETON)
+        plan = self.dependencies.compile()
+        plan.warm()
+        self.assertEqual(1, self.counter)
+        self.assertEqual(1, plan.build_injector({'request': 1}).get_dependency('x'))
+        self.assertEqual(1, self.counter)
+
+    def test_request_value_is_built_per_injector(self):
+        self.dependencies.register_factory('x', self._count)
+        plan = self.dependencies.compile()
+        injector = plan.build_injector({'request': 1})
+        self.assertEqual(1, injector.get_dependency('x'))
+        self.assertEqual(1, injector.get_dependency('x'))
+        self.assertEqual(2, plan.build_injector({'request': 1}).get_dependency('x'))
+
+    def test_transient_value_is_built_every_time(self):
+        self.dependencies.register_factory('x', self._count, scope=di.TRANSIENT)
+        injector = self.dependencies.compile().build_injector({'request': 1})
+        self.assertEqual(1, injector.get_dependency('x'))
+        self.assertEqual(2, injector.get_dependency('x'))
+
+    def test_values_are_singletons(self):
+        self.dependencies.register_value('x', 1)
+        self.dependencies.register_factory('y', lambda x: x + 1, ['x'], scope=di.SINGLETON)
+        self.dependencies.check_dependencies()
+
+    def test_rejects_singleton_depending_on_request_value(self):
+        self.dependencies.register_factory('x', self._count, ['request'], scope=di.SINGLETON)
+        with self.assertRaises(di.ScopeMismatchException):
+            self.dependencies.check_dependencies()
+        with self.assertRaises(di.ScopeMismatchException):
+            self.dependencies.compile()
+
+    def test_rejects_singleton_depending_on_transient_value(self):
+        self.dependencies.register_factory('x', self._count, scope=di.TRANSIENT)
+        self.dependencies.register_factory('y', self._count, ['x'], scope=di.SINGLETON)
+        with self.assertRaises(di.ScopeMismatchException):
+            self.dependencies.check_dependencies()
+
 class InjectorTest(unittest.TestCase):
     def setUp(self):
-        self.injector = di.Injector({
+        self.injector = di.InjectorPlan.from_factories({
             'value1': (lambda: 1, None),
             'value2': (lambda: 'some string', None),
             'factory1': (lambda: 'factory 1 result', None),
             'factory2': (lambda val1: 'value1 is {}'.format(val1), ['value1']),
-        })
+        }).build_injector()
 
     def test_has_dependency(self):
         self.assertTrue(self.injector.has_dependency('value1'))
@@ -172,5 +311,150 @@ class InjectorTest(unittest.TestCase):
         result = self.injector.inject(test_fn, ['value1', 'value2'])
         self.assertEqual('1 some string', result)
 
+class TeardownTest(unittest.TestCase):
+    def setUp(self):
+        self.closed = []
+        self.dependencies = di.Dependencies()
+        self.dependencies.register_late_bound_value('request')
+        self.dependencies.register_factory(
+            'connection', lambda request: 'connection ' + request, ['request'],
+            teardown=self.closed.append
+        )
+        self.dependencies.register_factory(
+            'cursor', lambda connection: 'cursor', ['connection'], scope=di.TRANSIENT,
+            teardown=self.closed.append
+        )
+
+    def test_tears_down_built_values_in_reverse(self):
+        injector = self.dependencies.compile().build_injector({'request': 'a'})
+        injector.inject(lambda cursor1, cursor2: None, ['cursor', 'cursor'])
+        self.assertEqual([], self.closed)
+        injector.close()
+        self.assertEqual(['cursor', 'cursor', 'connection a'], self.closed)
+        injector.close()
+        self.assertEqual(3, len(self.closed))
+
+    def test_skips_values_never_built(self):
+        injector = self.dependencies.compile().build_injector({'request': 'a'})
+        injector.close()
+        self.assertEqual([], self.closed)
+
+    def test_runs_every_teardown_despite_errors(self):
+        def fail(value):
+            raise ValueError(value)
+        self.dependencies.register_factory('other', lambda: 'other', teardown=fail)
+        injector = self.dependencies.compile().build_injector({'request': 'a'})
+        injector.inject(lambda connection, other: None, ['connection', 'other'])
+        with self.assertRaises(ValueError):
+            injector.close()
+        self.assertEqual(['connection a'], self.closed)
+
+    def test_tears_down_singletons_when_plan_closes(self):
+        self.dependencies.register_factory(
+            'pool', lambda: 'pool', scope=di.SINGLETON, teardown=self.closed.append
+        )
+        plan = self.dependencies.compile()
+        plan.warm()
+        injector = plan.build_injector({'request': 'a'})
+        injector.get_dependency('pool')
+        injector.close()
+        self.assertEqual([], self.closed)
+        plan.close()
+        self.assertEqual(['pool'], self.closed)
+
+    def test_generator_factories(self):
+        events = []
+        def connect(request):
+            events.append('open')
+            yield 'connection ' + request
+            events.append('close')
+        def pool():
+            yield 'pool'
+            events.append('close pool')
+        self.dependencies.register_factory('connection2', connect, ['request'])
+        self.dependencies.register_factory('pool', pool, scope=di.SINGLETON)
+        plan = self.dependencies.compile()
+        injector = plan.build_injector({'request': 'a'})
+        values = injector.inject(lambda *args: list(args), ['connection2', 'pool'])
+        self.assertEqual(['connection a', 'pool'], values)
+        self.assertEqual(['open'], events)
+        injector.close()
+        self.assertEqual(['open', 'close'], events)
+        plan.close()
+        self.assertEqual(['open', 'close', 'close pool'], events)
+
+    def test_generator_factories_see_errors(self):
+        events = []
+        def connect():
+            try:
+                yield 'connection'
+            except ValueError:
+                events.append('rollback')
+                raise
+            events.append('commit')
+        def unhandled():
+            yield 'unhandled'
+            events.append('not reached')
+        self.dependencies.register_factory('connection2', connect)
+        self.dependencies.register_factory('unhandled', unhandled)
+        pool = di.InjectorPool(self.dependencies.compile(), ['request'])
+        injector = pool.checkout('a')
+        injector.inject(lambda *args: None, ['connection2', 'unhandled'])
+        pool.discard(injector, ValueError())
+        self.assertEqual(['rollback'], events)
+
+        injector = pool.checkout('b')
+        injector.get_dependency('connection2')
+        pool.release(injector)
+        self.assertEqual(['rollback', 'commit'], events)
+
+    def test_generator_factories_yield_once(self):
+        def twice():
+            yield 1
+            yield 2
+        self.dependencies.register_factory('twice', twice)
+        self.dependencies.register_factory('never', lambda: (yield from ()))
+        injector = self.dependencies.compile().build_injector({'request': 'a'})
+        with self.assertRaises(di.InjectorException):
+            injector.get_dependency('never')
+        injector.get_dependency('twice')
+        with self.assertRaises(di.InjectorException):
+            injector.close()
+
+class InjectorPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.closed = []
+        dependencies = di.Dependencies()
+        dependencies.register_late_bound_value('request')
+        dependencies.register_factory(
+            'connection', lambda request: 'connection ' + request, ['request'],
+            teardown=self.closed.append
+        )
+        self.pool = di.InjectorPool(dependencies.compile(), ['request'], maxsize=1)
+
+    def test_reuses_injectors(self):
+        injector = self.pool.checkout('a')
+        self.assertEqual('connection a', injector.get_dependency('connection'))
+        self.pool.release(injector)
+        self.assertEqual(['connection a'], self.closed)
+
+        reused = self.pool.checkout('b')
+        self.assertIs(injector, reused)
+        self.assertEqual('connection b', reused.get_dependency('connection'))
+
+    def test_keeps_at_most_maxsize(self):
+        injectors = [self.pool.checkout('a'), self.pool.checkout('b')]
+        self.assertIsNot(injectors[0], injectors[1])
+        for injector in injectors:
+            self.pool.release(injector)
+        self.assertEqual(1, self.pool.size())
+
+    def test_discard_tears_down_without_reuse(self):
+        injector = self.pool.checkout('a')
+        injector.get_dependency('connection')
+        self.pool.discard(injector)
+        self.assertEqual(['connection a'], self.closed)
+        self.assertEqual(0, self.pool.size())
+
 if __name__ == '__main__':
     unittest.main()
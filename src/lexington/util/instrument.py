@@ -0,0 +1,146 @@
+"""
+Recording how long each part of handling a request takes
+"""
+
+import collections
+import functools
+import inspect
+import math
+import threading
+import time
+
+class Histogram:
+    """ Counts durations in buckets that grow by BUCKET_GROWTH, so percentiles are
+    accurate to within a few percent without keeping every sample.
+    """
+    BUCKET_GROWTH = 1.05
+    SMALLEST = 1e-9
+
+    def __init__(self):
+        self._buckets = collections.Counter()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        bucket = int(math.log(max(seconds, self.SMALLEST) / self.SMALLEST, self.BUCKET_GROWTH))
+        self._buckets[bucket] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, fraction):
+        """ Returns the approximate duration that `fraction` of the samples are below """
+        if self.count == 0:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for bucket in sorted(self._buckets):
+            seen += self._buckets[bucket]
+            if seen >= target:
+                upper_bound = self.SMALLEST * self.BUCKET_GROWTH ** (bucket + 1)
+                return min(upper_bound, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.percentile(0.50),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'max': self.max,
+        }
+
+class RequestTimer:
+    """ Times the phases of one request. Create with `Instrumentation.start_request()` """
+    __slots__ = ('_instrumentation', '_start', '_last', 'route_name')
+
+    def __init__(self, instrumentation):
+        self._instrumentation = instrumentation
+        self._start = self._last = time.perf_counter()
+        self.route_name = None
+
+    def lap(self, phase):
+        """ Records the time since the last lap (or the start) as the given phase """
+        now = time.perf_counter()
+        self._instrumentation.record('phase', phase, now - self._last)
+        self._last = now
+
+    def finish(self):
+        """ Records the time for the whole request against the route """
+        route_name = self.route_name or '(no route)'
+        self._instrumentation.record('route', route_name, time.perf_counter() - self._start)
+
+class Instrumentation:
+    """ Collects timings into histograms, grouped by category and name.
+
+    The categories recorded by Application are:
+    - 'phase': dispatch, validator (for views with one), cache (for views with
+      cache_vary), build_injector, view, filters (if any) and response
+    - 'dependency': each factory, not counting the time to build its dependencies
+    - 'route': the whole request, for each route
+    """
+    def __init__(self):
+        self._histograms = collections.defaultdict(Histogram)
+        self._lock = threading.Lock()
+
+    def record(self, category, name, seconds):
+        with self._lock:
+            self._histograms[(category, name)].add(seconds)
+
+    def start_request(self):
+        return RequestTimer(self)
+
+    def timed(self, category, name, fn):
+        """ Wraps fn so that each call is recorded (async functions stay async) """
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def timed_coroutine(*args):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args)
+                finally:
+                    self.record(category, name, time.perf_counter() - start)
+            return timed_coroutine
+
+        @functools.wraps(fn)
+        def timed_fn(*args):
+            start = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                self.record(category, name, time.perf_counter() - start)
+        return timed_fn
+
+    def time_factories(self, injector_plan):
+        """ Returns a copy of the plan whose factories record their timings """
+        return injector_plan.wrap_factories(
+            lambda name, fn: self.timed('dependency', name, fn)
+        )
+
+    def summary(self):
+        """ Returns {category: {name: {'count': ..., 'p50': ..., ...}}} (in seconds) """
+        with self._lock:
+            result = collections.defaultdict(dict)
+            for (category, name), histogram in sorted(self._histograms.items()):
+                result[category][name] = histogram.summary()
+            return dict(result)
+
+    def dump(self):
+        """ Returns the summary as a text table (in milliseconds) """
+        lines = ['{:<12} {:<30} {:>8} {:>9} {:>9} {:>9} {:>9}'.format(
+            'category', 'name', 'count', 'p50 ms', 'p95 ms', 'p99 ms', 'max ms'
+        )]
+        for category, names in self.summary().items():
+            for name, stats in names.items():
+                lines.append('{:<12} {:<30} {:>8} {:>9.3f} {:>9.3f} {:>9.3f} {:>9.3f}'.format(
+                    category, name, stats['count'],
+                    stats['p50'] * 1000, stats['p95'] * 1000, stats['p99'] * 1000,
+                    stats['max'] * 1000
+                ))
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
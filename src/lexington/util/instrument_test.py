@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+import asyncio
+import unittest
+
+from lexington.util import di
+from lexington.util import instrument
+
+class HistogramTest(unittest.TestCase):
+    def test_empty(self):
+        histogram = instrument.Histogram()
+        self.assertEqual(0.0, histogram.percentile(0.5))
+        self.assertEqual(0, histogram.summary()['count'])
+
+    def test_percentiles(self):
+        histogram = instrument.Histogram()
+        for i in range(1, 101):
+            histogram.add(i / 1000)
+        self.assertEqual(100, histogram.count)
+        self.assertAlmostEqual(0.050, histogram.percentile(0.50), delta=0.003)
+        self.assertAlmostEqual(0.095, histogram.percentile(0.95), delta=0.005)
+        self.assertAlmostEqual(0.099, histogram.percentile(0.99), delta=0.005)
+        self.assertEqual(0.1, histogram.percentile(1.0))
+        self.assertAlmostEqual(0.0505, histogram.summary()['mean'])
+
+    def test_handles_zero(self):
+        histogram = instrument.Histogram()
+        histogram.add(0.0)
+        self.assertLessEqual(histogram.percentile(0.5), 1e-9)
+
+class InstrumentationTest(unittest.TestCase):
+    def setUp(self):
+        self.instrumentation = instrument.Instrumentation()
+
+    def test_records_timed_calls(self):
+        timed = self.instrumentation.timed('test', 'add', lambda a, b: a + b)
+        self.assertEqual(3, timed(1, 2))
+        self.assertEqual(1, self.instrumentation.summary()['test']['add']['count'])
+
+    def test_records_timed_coroutines(self):
+        async def add(a, b):
+            return a + b
+        timed = self.instrumentation.timed('test', 'add', add)
+        self.assertEqual(3, asyncio.run(timed(1, 2)))
+        self.assertEqual(1, self.instrumentation.summary()['test']['add']['count'])
+
+    def test_times_factories(self):
+        dependencies = di.Dependencies()
+        dependencies.register_late_bound_value('request')
+        dependencies.register_factory('a', lambda request: request, ['request'])
+        dependencies.register_factory('b', lambda a: a * 2, ['a'])
+        plan = self.instrumentation.time_factories(dependencies.compile())
+
+        for request in range(3):
+            self.assertEqual(request * 2, plan.build_injector({'request': request}).get_dependency('b'))
+        summary = self.instrumentation.summary()['dependency']
+        self.assertEqual({'a', 'b'}, set(summary))
+        self.assertEqual(3, summary['b']['count'])
+
+    def test_request_timer(self):
+        timer = self.instrumentation.start_request()
+        timer.lap('dispatch')
+        timer.route_name = 'index'
+        timer.finish()
+        summary = self.instrumentation.summary()
+        self.assertEqual(1, summary['phase']['dispatch']['count'])
+        self.assertEqual(1, summary['route']['index']['count'])
+
+    def test_dump_and_reset(self):
+        self.instrumentation.record('route', 'index', 0.002)
+        self.assertIn('index', self.instrumentation.dump())
+        self.instrumentation.reset()
+        self.assertEqual({}, self.instrumentation.summary())
+
+if __name__ == '__main__':
+    unittest.main()
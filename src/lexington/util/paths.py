@@ -1,18 +1,41 @@
-from werkzeug.wrappers import Request
-
 from lexington.util.di import depends_on
 
 @depends_on(['environ'])
 def get_request(environ):
+    # Imported here so that werkzeug is only loaded once something needs a request
+    from werkzeug.wrappers import Request
     return Request(environ)
 
-@depends_on(['request'])
-def get_method(request):
-    return request.method
+# The method and path are read straight from the environ (rather than from the
+# request) so that routing doesn't have to construct a Request object.
 
-@depends_on(['request'])
-def get_path(request):
-    return request.path
+@depends_on(['environ'])
+def get_method(environ):
+    return environ.get('REQUEST_METHOD', 'GET').upper()
+
+@depends_on(['environ'])
+def get_path(environ):
+    # Decoded the same way as werkzeug's Request.path
+    path_info = environ.get('PATH_INFO') or ''
+    return '/' + path_info.encode('latin1').decode('utf-8', 'replace').lstrip('/')
+
+@depends_on(['environ'])
+def get_host(environ):
+    """ Returns the lower-cased host name the request was sent to, without the port """
+    host = environ.get('HTTP_HOST') or environ.get('SERVER_NAME') or ''
+    if host.endswith(']'):
+        return host.lower() # An IPv6 address without a port
+    return host.rpartition(':')[0].lower() if ':' in host else host.lower()
+
+@depends_on(['environ'])
+def get_content_type(environ):
+    """ Returns the lower-cased mimetype of the request body (without parameters like
+    the charset), or None
+    """
+    content_type = environ.get('CONTENT_TYPE')
+    if not content_type:
+        return None
+    return content_type.split(';', 1)[0].strip().lower()
 
 @depends_on(['request'])
 def get_query_string(request):
@@ -27,6 +50,8 @@ def register_all(dependencies):
         'request': get_request,
         'method': get_method,
         'path': get_path,
+        'host': get_host,
+        'content_type': get_content_type,
         'query_string': get_query_string,
         'query': get_query,
     }
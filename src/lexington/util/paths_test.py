@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from werkzeug.test import EnvironBuilder
+from werkzeug.wrappers import Request
+
+from lexington.util import di
+from lexington.util import paths
+
+class PathsTest(unittest.TestCase):
+    def setUp(self):
+        dependencies = di.Dependencies()
+        dependencies.register_late_bound_value('environ')
+        paths.register_all(dependencies)
+        self._plan = dependencies.compile()
+
+    def _injector(self, environ):
+        return self._plan.build_injector({'environ': environ})
+
+    def test_matches_werkzeug_request(self):
+        test_cases = [
+            ('GET', '/'),
+            ('post', '/users/1234/'),
+            ('GET', '//double/slash'),
+            ('GET', '/café/☃'),
+            ('GET', '/bad/%ff'),
+            ('GET', ''),
+        ]
+        for method, path in test_cases:
+            environ = EnvironBuilder(path=path, method=method).get_environ()
+            request = Request(environ.copy())
+            injector = self._injector(environ)
+            self.assertEqual(request.method, injector.get_dependency('method'))
+            self.assertEqual(request.path, injector.get_dependency('path'))
+
+    def test_routing_does_not_build_request(self):
+        environ = EnvironBuilder(path='/x', query_string='a=1').get_environ()
+        injector = self._injector(environ)
+        injector.get_dependency('method')
+        injector.get_dependency('path')
+        self.assertNotIn('werkzeug.request', environ)
+
+        self.assertEqual('1', injector.get_dependency('query')['a'])
+        self.assertIn('werkzeug.request', environ)
+
+    def test_host_and_content_type(self):
+        test_cases = [
+            ('http://Example.COM:8080/', 'text/html; charset=UTF-8', 'example.com',
+             'text/html'),
+            ('http://[::1]:5050/', None, '[::1]', None),
+            ('http://[::1]/', '', '[::1]', None),
+        ]
+        for url, content_type, host, mimetype in test_cases:
+            environ = EnvironBuilder(base_url=url, content_type=content_type).get_environ()
+            injector = self._injector(environ)
+            self.assertEqual(host, injector.get_dependency('host'))
+            self.assertEqual(mimetype, injector.get_dependency('content_type'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+"""
+A bounded pool of reusable resources (like database connections) shared by requests
+"""
+
+import collections
+import threading
+import time
+
+from lexington.util import di
+
+class PoolException(Exception):
+    pass
+
+class PoolTimeoutException(PoolException):
+    pass
+
+PoolInfo = collections.namedtuple('PoolInfo', 'size idle maxsize')
+
+class ResourcePool:
+    """ Creates resources as they are needed, up to `maxsize` at once, and keeps the
+    released ones for reuse (the most recently released is reused first).
+
+    Resources are only created when they are acquired, so a pool built before the
+    server forks its workers doesn't share any of them between processes.
+    """
+    def __init__(self, create, maxsize=10, timeout=None, dispose=None):
+        """ Create a ResourcePool.
+
+        create  - called with no arguments to create a resource
+        maxsize - the most resources that can exist at once
+        timeout - how many seconds `acquire` waits for a resource to be released when
+                  all of them are in use (by default, it waits until one is)
+        dispose - called with a resource that is no longer needed (when the pool is
+                  closed, or the resource is discarded)
+        """
+        if maxsize <= 0:
+            raise ValueError('maxsize must be positive')
+        self._create = create
+        self._maxsize = maxsize
+        self._timeout = timeout
+        self._dispose = dispose
+        self._idle = collections.deque()
+        # The number of resources that exist, idle or in use
+        self._size = 0
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def acquire(self):
+        """ Returns an idle resource, or a new one if there are none.
+
+        Raises PoolTimeoutException if all of the resources stay in use for longer than
+        the timeout, or PoolException if the pool is closed.
+        """
+        deadline = None if self._timeout is None else time.monotonic() + self._timeout
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise PoolException('The pool is closed')
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self._maxsize:
+                    self._size += 1
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise PoolTimeoutException(
+                        'All {} resources are in use'.format(self._maxsize)
+                    )
+                self._condition.wait(remaining)
+
+        try:
+            return self._create()
+        except BaseException:
+            self._forget()
+            raise
+
+    def release(self, resource):
+        """ Returns a resource to the pool, so it can be acquired again """
+        with self._condition:
+            if not self._closed:
+                self._idle.append(resource)
+                self._condition.notify()
+                return
+        self.discard(resource)
+
+    def discard(self, resource):
+        """ Disposes of an acquired resource instead of releasing it (for example, if
+        it is broken), making room for a new one
+        """
+        self._forget()
+        if self._dispose is not None:
+            self._dispose(resource)
+
+    def checkout(self):
+        """ Yields a resource, releasing it afterwards, or discarding it if an exception
+        is raised at the yield (it might be broken, or in the middle of a transaction).
+        As a generator factory, this checks a resource out for the request (see
+        `register_pool`), and requests that fail discard theirs.
+        """
+        resource = self.acquire()
+        try:
+            yield resource
+        except BaseException:
+            self.discard(resource)
+            raise
+        self.release(resource)
+
+    def close(self):
+        """ Disposes of the idle resources. Resources still in use are disposed of when
+        they are released, and nothing can be acquired afterwards.
+        """
+        with self._condition:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._condition.notify_all()
+        if self._dispose is not None:
+            di.run_finalizers([(self._dispose, resource) for resource in idle])
+
+    def info(self):
+        """ Returns the number of resources that exist and are idle, and the maxsize """
+        with self._condition:
+            return PoolInfo(self._size, len(self._idle), self._maxsize)
+
+    def _forget(self):
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+def register_pool(dependencies, name, pool):
+    """ Registers `name` as a resource checked out of the pool for each request that
+    uses it, and released once the request is done.
+
+    The pool itself is registered as the singleton `<name>_pool`, and is closed when
+    the application is.
+    """
+    pool_name = name + '_pool'
+    dependencies.register_factory(
+        pool_name, lambda: pool, scope=di.SINGLETON, teardown=ResourcePool.close
+    )
+    dependencies.register_factory(name, ResourcePool.checkout, [pool_name])
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+import itertools
+import threading
+import unittest
+
+from lexington.util import di
+from lexington.util import pool
+
+class ResourcePoolTest(unittest.TestCase):
+    def setUp(self):
+        self.counter = itertools.count()
+        self.disposed = []
+        self.pool = pool.ResourcePool(
+            lambda: next(self.counter), maxsize=2, timeout=0.01, dispose=self.disposed.append
+        )
+
+    def test_reuses_released_resources(self):
+        first = self.pool.acquire()
+        self.pool.release(first)
+        self.assertEqual(first, self.pool.acquire())
+        self.assertEqual((1, 0, 2), self.pool.info())
+
+    def test_times_out(self):
+        self.pool.acquire()
+        self.pool.acquire()
+        with self.assertRaises(pool.PoolTimeoutException):
+            self.pool.acquire()
+
+    def test_waits_for_a_release(self):
+        waiting = pool.ResourcePool(lambda: next(self.counter), maxsize=1, timeout=5)
+        first = waiting.acquire()
+        timer = threading.Timer(0.001, waiting.release, [first])
+        timer.start()
+        self.assertEqual(first, waiting.acquire())
+        timer.join()
+
+    def test_discard_makes_room(self):
+        self.pool.acquire()
+        second = self.pool.acquire()
+        self.pool.discard(second)
+        self.assertEqual([second], self.disposed)
+        self.assertEqual(2, self.pool.acquire())
+
+    def test_failed_create_makes_room(self):
+        failing = pool.ResourcePool(lambda: 1 / 0, maxsize=1, timeout=0)
+        for _ in range(2):
+            with self.assertRaises(ZeroDivisionError):
+                failing.acquire()
+        self.assertEqual(0, failing.info().size)
+
+    def test_close(self):
+        idle = self.pool.acquire()
+        in_use = self.pool.acquire()
+        self.pool.release(idle)
+        self.pool.close()
+        self.assertEqual([idle], self.disposed)
+        with self.assertRaises(pool.PoolException):
+            self.pool.acquire()
+        self.pool.release(in_use)
+        self.assertEqual([idle, in_use], self.disposed)
+        self.assertEqual(0, self.pool.info().size)
+
+    def test_register_pool(self):
+        dependencies = di.Dependencies()
+        pool.register_pool(dependencies, 'db', self.pool)
+        plan = dependencies.compile()
+        plan.warm()
+
+        injector = plan.build_injector()
+        self.assertEqual(0, injector.get_dependency('db'))
+        self.assertEqual(0, self.pool.info().idle)
+        injector.close()
+        self.assertEqual(1, self.pool.info().idle)
+
+        plan.close()
+        self.assertEqual([0], self.disposed)
+
+    def test_register_pool_discards_after_errors(self):
+        dependencies = di.Dependencies()
+        pool.register_pool(dependencies, 'db', self.pool)
+        injector = dependencies.compile().build_injector()
+        self.assertEqual(0, injector.get_dependency('db'))
+        injector.close(ValueError())
+        self.assertEqual([0], self.disposed)
+        self.assertEqual((0, 0, 2), self.pool.info())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+"""
+Caching the responses of views that only depend on a few (declared) values
+"""
+
+import abc
+import collections
+
+from lexington.util.cache import LRUCache
+
+class CachedResponse(collections.namedtuple('CachedResponse', 'status headers body')):
+    """ What gets stored for each response: the status line, a tuple of (name, value)
+    headers ready to send, and the body as bytes.
+
+    It is served as-is (it is a WSGI application), so a cache hit doesn't build a
+    werkzeug Response. Backends that store entries outside of the process can pickle
+    these.
+    """
+    __slots__ = ()
+
+    def __call__(self, environ, start_response):
+        app_iter, status, headers = self.get_wsgi_response(environ)
+        start_response(status, headers)
+        return app_iter
+
+    def get_wsgi_response(self, environ):
+        body = [] if environ.get('REQUEST_METHOD') == 'HEAD' else [self.body]
+        return body, self.status, list(self.headers)
+
+class CacheBackend(abc.ABC):
+    """ Where a ResponseCache keeps its entries.
+
+    Implement `get` and `put` to share entries another way (for example, between the
+    worker processes of a server). Keys are tuples of strings, numbers and other tuples.
+    """
+    @abc.abstractmethod
+    def get(self, key):
+        """ Returns the CachedResponse for the key, or None """
+
+    @abc.abstractmethod
+    def put(self, key, entry):
+        """ Stores the CachedResponse for the key """
+
+class MemoryBackend(CacheBackend):
+    """ Keeps entries in an in-process LRU cache with a TTL """
+    def __init__(self, maxsize=1024, ttl=60):
+        self._cache = LRUCache(maxsize, ttl)
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def put(self, key, entry):
+        self._cache.put(key, entry)
+
+    def info(self):
+        return self._cache.info()
+
+def freeze(value):
+    """ Converts a value into something hashable, so it can be part of a cache key.
+
+    Mappings (including werkzeug MultiDicts) become sorted tuples of items, and lists
+    and sets become tuples.
+    """
+    if hasattr(value, 'items'):
+        try:
+            items = value.items(multi=True)
+        except TypeError:
+            items = value.items()
+        return tuple(sorted((key, freeze(item)) for key, item in items))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(freeze(item) for item in value))
+    return value
+
+class ResponseCache:
+    """ Caches responses for views that declare `cache_vary`: the names of the
+    dependencies that their response depends on.
+
+    A response is cached for the route and the values of those dependencies. On a hit,
+    the view and its other dependencies are never built.
+
+    Only complete 200 responses are cached; streamed responses and responses that set
+    cookies or say `Cache-Control: no-store` or `private` are not.
+    """
+    def __init__(self, backend=None):
+        self._backend = backend if backend is not None else MemoryBackend()
+
+    def make_key(self, route_name, values):
+        return (route_name,) + tuple(freeze(value) for value in values)
+
+    def get(self, key):
+        """ Returns the CachedResponse for the key, or None """
+        return self._backend.get(key)
+
+    def put(self, key, response, environ):
+        """ Caches the response (a werkzeug Response), if it can be cached """
+        if self.is_cacheable(response):
+            self._backend.put(key, CachedResponse(
+                response.status,
+                tuple(response.get_wsgi_headers(environ).to_wsgi_list()),
+                response.get_data()
+            ))
+
+    def is_cacheable(self, response):
+        if response.status_code != 200:
+            return False
+        if response.is_streamed or response.direct_passthrough:
+            return False
+        if 'Set-Cookie' in response.headers:
+            return False
+        cache_control = response.cache_control
+        return not (cache_control.no_store or cache_control.private)
+
+    def info(self):
+        """ Returns the backend's hit and miss counts, if it keeps them """
+        info = getattr(self._backend, 'info', None)
+        return info() if info else None
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from werkzeug.datastructures import MultiDict
+from werkzeug.test import Client, EnvironBuilder
+from werkzeug.wrappers import Response
+
+from lexington.util import response_cache
+
+class FreezeTest(unittest.TestCase):
+    def test_freezes_containers(self):
+        self.assertEqual((('a', 1), ('b', (1, 2))), response_cache.freeze({'b': [1, 2], 'a': 1}))
+        self.assertEqual((1, 2), response_cache.freeze({2, 1}))
+        self.assertEqual('x', response_cache.freeze('x'))
+
+    def test_keeps_all_values_of_multidicts(self):
+        query = MultiDict([('a', '1'), ('a', '2')])
+        self.assertEqual((('a', '1'), ('a', '2')), response_cache.freeze(query))
+
+class ResponseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self._cache = response_cache.ResponseCache()
+        self._key = self._cache.make_key('index', [{'page': '1'}])
+
+    def test_round_trips_responses(self):
+        self.assertIsNone(self._cache.get(self._key))
+        response = Response('hi', mimetype='text/html', headers={'X-A': 'b'})
+        self._cache.put(self._key, response, self._environ())
+        cached = Client(self._cache.get(self._key)).get('/')
+        self.assertEqual(b'hi', cached.get_data())
+        self.assertEqual('text/html', cached.mimetype)
+        self.assertEqual('b', cached.headers['X-A'])
+        self.assertEqual('2', cached.headers['Content-Length'])
+
+    def test_head_requests_get_no_body(self):
+        self._cache.put(self._key, Response('hi'), self._environ())
+        self.assertEqual(b'', Client(self._cache.get(self._key)).head('/').get_data())
+
+    def _environ(self):
+        return EnvironBuilder().get_environ()
+
+    def test_only_caches_cacheable_responses(self):
+        uncacheable = [
+            Response('nope', status=404),
+            Response(iter([b'streamed'])),
+            Response('private', headers={'Cache-Control': 'private'}),
+            Response('no', headers={'Cache-Control': 'no-store'}),
+            Response('cookie', headers={'Set-Cookie': 'a=b'}),
+        ]
+        for response in uncacheable:
+            self._cache.put(self._key, response, self._environ())
+            self.assertIsNone(self._cache.get(self._key))
+
+    def test_custom_backend(self):
+        class DictBackend(response_cache.CacheBackend):
+            def __init__(self):
+                self.entries = {}
+            def get(self, key):
+                return self.entries.get(key)
+            def put(self, key, entry):
+                self.entries[key] = entry
+        backend = DictBackend()
+        cache = response_cache.ResponseCache(backend)
+        cache.put(self._key, Response('hi'), self._environ())
+        self.assertEqual(b'hi', backend.entries[self._key].body)
+        self.assertIsNone(cache.info())
+
+    def test_incomplete_backend(self):
+        class GetOnlyBackend(response_cache.CacheBackend):
+            def get(self, key):
+                return None
+        with self.assertRaises(TypeError):
+            GetOnlyBackend()
+
+if __name__ == '__main__':
+    unittest.main()
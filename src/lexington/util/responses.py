@@ -0,0 +1,187 @@
+"""
+Turning the values returned by views into responses
+"""
+
+import collections
+import datetime
+import functools
+import json
+import os
+
+from werkzeug.http import is_resource_modified
+from werkzeug.wrappers import Response
+from werkzeug.wsgi import wrap_file
+
+class FileResponse(Response):
+    """ A response that streams a file.
+
+    The body is handed to the WSGI server as-is, so if the server supplied a
+    `wsgi.file_wrapper` it can recognise its own wrapper and send the file with
+    something like sendfile.
+    """
+    def __call__(self, environ, start_response):
+        app_iter, status, headers = self.get_wsgi_response(environ)
+        start_response(status, headers)
+        return app_iter
+
+class ClosingIterator:
+    """ Wraps a WSGI app_iter so that `on_close` is called (once) after the app_iter is
+    closed, which the server does when it is done sending the response, even if it
+    stopped early.
+    """
+    __slots__ = ('_app_iter', '_iterator', '_on_close')
+
+    def __init__(self, app_iter, on_close):
+        self._app_iter = app_iter
+        self._iterator = iter(app_iter)
+        self._on_close = on_close
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._iterator)
+
+    def close(self):
+        on_close = self._on_close
+        if on_close is None:
+            return
+        self._on_close = None
+        try:
+            close = getattr(self._app_iter, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            on_close()
+
+def _remaining_size(file):
+    try:
+        return os.fstat(file.fileno()).st_size - file.tell()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+def file_response(file, environ, mimetype='application/octet-stream'):
+    """ Builds a response that streams the file (which will be closed afterwards) """
+    response = FileResponse(
+        wrap_file(environ, file), mimetype=mimetype, direct_passthrough=True
+    )
+    size = _remaining_size(file)
+    if size is not None:
+        response.content_length = size
+    return response
+
+def _split_validator(validator):
+    """ Returns (etag, last modified) for the value of a view's validator.
+
+    Datetimes are last-modified times, and so are floats (as timestamps, like those
+    from os.path.getmtime). Anything else (such as a version number or hash) is turned
+    into an ETag.
+    """
+    if isinstance(validator, float):
+        validator = datetime.datetime.fromtimestamp(validator, datetime.timezone.utc)
+    if isinstance(validator, datetime.datetime):
+        return None, validator
+    return str(validator), None
+
+def is_not_modified(environ, validator):
+    """ Returns True if the request's If-None-Match or If-Modified-Since header shows
+    that the client already has the current version of the response
+    """
+    if environ.get('REQUEST_METHOD') not in ('GET', 'HEAD'):
+        return False
+    etag, last_modified = _split_validator(validator)
+    return not is_resource_modified(
+        environ, etag=etag and '"{}"'.format(etag), last_modified=last_modified
+    )
+
+def not_modified(validator):
+    """ Builds a 304 response for the validator """
+    return set_validator(Response(status=304), validator)
+
+def set_validator(response, validator):
+    """ Adds an ETag or Last-Modified header for the validator, unless the response is
+    an error or the view already set one
+    """
+    if response.status_code not in (200, 304):
+        return response
+    etag, last_modified = _split_validator(validator)
+    if etag is not None and 'ETag' not in response.headers:
+        response.set_etag(etag)
+    if last_modified is not None and 'Last-Modified' not in response.headers:
+        response.last_modified = last_modified
+    return response
+
+# Return JSON(value) from a view to send any value (not just a dict or list) as JSON,
+# or to send it with a different status
+JSON = collections.namedtuple('JSON', 'value status', defaults=[200])
+
+def stdlib_serializer():
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    return lambda value: encode(value).encode('utf-8')
+
+def _with_fallback(serialize, errors):
+    """ Falls back to the json module for values the serializer rejects (like integers
+    wider than 64 bits), so every serializer accepts the same values
+    """
+    fallback = stdlib_serializer()
+    def serialize_or_fall_back(value):
+        try:
+            return serialize(value)
+        except errors:
+            return fallback(value)
+    return serialize_or_fall_back
+
+def orjson_serializer():
+    import orjson
+    return _with_fallback(
+        functools.partial(orjson.dumps, option=orjson.OPT_NON_STR_KEYS), TypeError
+    )
+
+def ujson_serializer():
+    import ujson
+    return _with_fallback(
+        lambda value: ujson.dumps(value, ensure_ascii=False).encode('utf-8'),
+        (TypeError, OverflowError)
+    )
+
+def find_json_serializer():
+    """ Returns the fastest available function for turning a value into JSON bytes:
+    orjson or ujson if installed, or else the json module
+    """
+    for serializer in (orjson_serializer, ujson_serializer):
+        try:
+            return serializer()
+        except ImportError:
+            pass
+    return stdlib_serializer()
+
+@functools.lru_cache(maxsize=None)
+def default_json_serializer():
+    return find_json_serializer()
+
+def json_response(value, status=200, serializer=None):
+    """ Builds a response with the value serialized as JSON (by `serializer`, or by
+    the one `find_json_serializer` picks)
+    """
+    if serializer is None:
+        serializer = default_json_serializer()
+    return Response(serializer(value), status=status, mimetype='application/json')
+
+def make_response(result, environ, json_serializer=None):
+    """ Converts the result of a view into a response.
+
+    - Responses are returned as-is
+    - Dicts, lists and JSON(...) values are sent as application/json
+    - Text and bytes are sent as text/plain
+    - File-like objects (anything with a `read` method) are streamed
+    - Other iterables (like generators) are streamed as text/plain, one chunk at a time
+    """
+    if isinstance(result, Response):
+        return result
+    if isinstance(result, (dict, list)):
+        return json_response(result, serializer=json_serializer)
+    if isinstance(result, JSON):
+        return json_response(result.value, result.status, json_serializer)
+    if hasattr(result, 'read'):
+        return file_response(result, environ)
+    return Response(result, mimetype='text/plain')
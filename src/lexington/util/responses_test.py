@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+
+import datetime
+import io
+import json
+import tempfile
+import unittest
+
+from werkzeug.test import EnvironBuilder
+from werkzeug.wrappers import Response
+
+from lexington.util import responses
+
+class ServerFileWrapper:
+    """ Stands in for a WSGI server's wsgi.file_wrapper """
+    def __init__(self, file, block_size=8192):
+        self.file = file
+        self.block_size = block_size
+
+    def __iter__(self):
+        return iter(lambda: self.file.read(self.block_size), b'')
+
+    def close(self):
+        self.file.close()
+
+def call(response, environ):
+    """ Calls a response as a WSGI app, returning (status, headers, app_iter) """
+    started = []
+    def start_response(status, headers):
+        started.append((status, dict(headers)))
+    app_iter = response(environ, start_response)
+    return started[0][0], started[0][1], app_iter
+
+class MakeResponseTest(unittest.TestCase):
+    def setUp(self):
+        self.environ = EnvironBuilder().get_environ()
+
+    def test_passes_responses_through(self):
+        response = Response('hi')
+        self.assertIs(response, responses.make_response(response, self.environ))
+
+    def test_text(self):
+        response = responses.make_response('hello', self.environ)
+        self.assertEqual(b'hello', response.get_data())
+        self.assertEqual('text/plain', response.mimetype)
+
+    def test_json(self):
+        for result, expected in [
+            ({'a': [1, 'é']}, {'a': [1, 'é']}),
+            ([1, 2], [1, 2]),
+            (responses.JSON('text'), 'text'),
+        ]:
+            response = responses.make_response(result, self.environ)
+            self.assertEqual('application/json', response.headers['Content-Type'])
+            self.assertEqual(expected, json.loads(response.get_data()))
+
+    def test_json_status_and_serializer(self):
+        response = responses.make_response(
+            responses.JSON({'error': 'nope'}, 400), self.environ, lambda value: b'custom'
+        )
+        self.assertEqual(400, response.status_code)
+        self.assertEqual(b'custom', response.get_data())
+
+    def test_json_serializers_agree(self):
+        values = [
+            {'text': 'é "quoted"', 'numbers': [1, 2.5, None, True]},
+            {1: 'a', 2: ['b']},
+            {'big': 2 ** 70, 'negative': -2 ** 70},
+        ]
+        serializers = []
+        for make_serializer in [
+            responses.stdlib_serializer, responses.orjson_serializer,
+            responses.ujson_serializer, responses.find_json_serializer,
+        ]:
+            try:
+                serializers.append(make_serializer())
+            except ImportError:
+                pass
+        for value in values:
+            expected = json.loads(responses.stdlib_serializer()(value))
+            for serializer in serializers:
+                self.assertEqual(expected, json.loads(serializer(value)), value)
+
+    def test_streams_generators(self):
+        produced = []
+        def generate():
+            for chunk in [b'a', b'b', b'c']:
+                produced.append(chunk)
+                yield chunk
+
+        response = responses.make_response(generate(), self.environ)
+        status, headers, app_iter = call(response, self.environ)
+        self.assertEqual([], produced)
+        self.assertEqual(b'a', next(iter(app_iter)))
+        self.assertEqual([b'a'], produced)
+        self.assertNotIn('Content-Length', headers)
+
+    def test_uses_server_file_wrapper(self):
+        self.environ['wsgi.file_wrapper'] = ServerFileWrapper
+        file = io.BytesIO(b'file contents')
+        response = responses.make_response(file, self.environ)
+        status, headers, app_iter = call(response, self.environ)
+
+        self.assertIsInstance(app_iter, ServerFileWrapper)
+        self.assertEqual(b'file contents', b''.join(app_iter))
+        self.assertEqual('application/octet-stream', headers['Content-Type'])
+        app_iter.close()
+        self.assertTrue(file.closed)
+
+    def test_streams_files_without_file_wrapper(self):
+        with tempfile.TemporaryFile() as file:
+            file.write(b'0123456789')
+            file.seek(4)
+            response = responses.make_response(file, self.environ)
+            status, headers, app_iter = call(response, self.environ)
+            self.assertEqual('6', headers['Content-Length'])
+            self.assertEqual(b'456789', b''.join(app_iter))
+
+class ConditionalTest(unittest.TestCase):
+    MODIFIED = datetime.datetime(2020, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc)
+
+    def _environ(self, method='GET', **headers):
+        return EnvironBuilder(method=method, headers=headers).get_environ()
+
+    def test_etags(self):
+        self.assertFalse(responses.is_not_modified(self._environ(), 'v1'))
+        self.assertTrue(responses.is_not_modified(self._environ(If_None_Match='"v1"'), 'v1'))
+        self.assertTrue(responses.is_not_modified(self._environ(If_None_Match='W/"v1"'), 'v1'))
+        self.assertTrue(responses.is_not_modified(self._environ(If_None_Match='"7"'), 7))
+        self.assertFalse(responses.is_not_modified(self._environ(If_None_Match='"v1"'), 'v2'))
+
+    def test_last_modified(self):
+        same = self._environ(If_Modified_Since='Thu, 02 Jan 2020 03:04:05 GMT')
+        earlier = self._environ(If_Modified_Since='Thu, 02 Jan 2020 03:04:04 GMT')
+        self.assertTrue(responses.is_not_modified(same, self.MODIFIED))
+        self.assertTrue(responses.is_not_modified(same, self.MODIFIED.timestamp() + 0.5))
+        self.assertFalse(responses.is_not_modified(earlier, self.MODIFIED))
+
+    def test_only_for_get_and_head(self):
+        self.assertTrue(responses.is_not_modified(self._environ('HEAD', If_None_Match='"a"'), 'a'))
+        self.assertFalse(responses.is_not_modified(self._environ('POST', If_None_Match='"a"'), 'a'))
+
+    def test_not_modified(self):
+        response = responses.not_modified('v1')
+        self.assertEqual(304, response.status_code)
+        self.assertEqual('"v1"', response.headers['ETag'])
+
+    def test_set_validator(self):
+        response = responses.set_validator(Response('hi'), self.MODIFIED)
+        self.assertEqual('Thu, 02 Jan 2020 03:04:05 GMT', response.headers['Last-Modified'])
+        self.assertNotIn('ETag', responses.set_validator(Response('no', status=404), 'v').headers)
+        own = Response('hi', headers={'ETag': '"mine"'})
+        self.assertEqual('"mine"', responses.set_validator(own, 'v').headers['ETag'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,58 @@
 import re
+import sys
 import collections
 
+from lexington.util.cache import LRUCache
+
+class RoutingException(Exception):
+    pass
+
+class MissingValueException(RoutingException):
+    pass
+
+class BadValueException(RoutingException):
+    pass
+
 NO_SLASH_PATTERN = re.compile(r'[^/]+')
+# A ^ or \A at the start of a segment's regex (after any inline flags)
+LEADING_ANCHOR_RE = re.compile(r'^(\(\?[aiLmsux]+\))?(?:\^|\\A)+')
+
+# host         - if not None, the host the route is for: a host name, or {name}.rest to
+#                match any one label (a subdomain) in front of rest, which becomes the
+#                value of a named segment
+# content_type - if not None, the only request Content-Type (mimetype) the route is for
+Route = collections.namedtuple(
+    'Route', 'name path method host content_type', defaults=[None, None]
+)
+
+HOST_WILDCARD_RE = re.compile(r'^\{(\w+)\}\.([^{}]+)$')
+
+def parse_host(description):
+    """ Parses a route's host, returning (segment name, host) for {name}.host, or
+    (None, host) for a plain host name. Hosts are lower-cased.
+    """
+    match = HOST_WILDCARD_RE.match(description)
+    if match:
+        return match.group(1), match.group(2).lower()
+    if '{' in description or '}' in description:
+        raise RoutingException('Bad host: {}'.format(description))
+    return None, description.lower()
 
-Route = collections.namedtuple('Route', 'name path method')
+# A converter gives a named segment its pattern, and converts values between the
+# text in the path and python values
+Converter = collections.namedtuple('Converter', 'pattern to_python to_url')
+
+CONVERTERS = {
+    'str': Converter(NO_SLASH_PATTERN, str, str),
+    'int': Converter(re.compile(r'\d+'), int, str),
+    'path': Converter(re.compile(r'.+'), str, str),
+}
+
+# The classes below are built for every route (and segment), so they have no __dict__
 
 class PathSegment:
+    __slots__ = ('_path',)
+
     def __init__(self, path):
         self._path = path
 
@@ -21,28 +68,43 @@ class PathSegment:
         return None
 
 class NamedPathSegment(PathSegment):
-    def __init__(self, name, pattern):
+    __slots__ = ('_name', '_pattern', '_converter')
+
+    def __init__(self, name, pattern, converter=None):
         self._name = name
         self._pattern = pattern
+        self._converter = converter
 
     @classmethod
     def no_pattern(cls, name):
         return cls(name, NO_SLASH_PATTERN)
 
     @classmethod
-    def from_description(cls, description):
-        name, _, regex = description.partition(':')
-        if regex:
-            return cls(name, re.compile(regex))
+    def from_description(cls, description, converters=CONVERTERS):
+        """ Parses the text between the braces of a path description.
+
+        The text can be just a name ({slug}), a name and the name of a converter
+        ({id:int}), or a name and a regex ({id:\\d+}).
+        """
+        name, _, spec = description.partition(':')
+        if spec in converters:
+            converter = converters[spec]
+            return cls(name, converter.pattern, converter)
+        elif spec:
+            # Segments always match from where they start, but the trie and regex
+            # dispatchers match in the middle of the path, where ^ would never match
+            return cls(name, re.compile(LEADING_ANCHOR_RE.sub(r'\1', spec)))
         else:
             return cls.no_pattern(name)
 
     def build_path(self, values):
         if self._name not in values:
-            pass # TODO: throw an exception
-        value = str(values[self._name])
-        if self.get_match(value) is None:
-            pass # TODO: throw an exception
+            raise MissingValueException('Missing value for {}'.format(self._name))
+        value = self.get_to_url()(values[self._name])
+        if self.get_match(value) != value:
+            raise BadValueException(
+                'Value for {} does not match the pattern: {!r}'.format(self._name, value)
+            )
         return value
 
     def get_match(self, text):
@@ -54,14 +116,30 @@ class NamedPathSegment(PathSegment):
     def get_name(self):
         return self._name
 
+    def get_pattern(self):
+        return self._pattern
+
+    def get_converter(self):
+        return self._converter
+
+    def get_to_url(self):
+        return self._converter.to_url if self._converter else str
+
 SEGMENT_RE = re.compile(r'^([^{}]+|\{[^{}]+\})')
 
 class Path:
+    __slots__ = ('_segments', '_to_python')
+
     def __init__(self, segments):
         self._segments = segments
+        self._to_python = [
+            (segment.get_name(), segment.get_converter().to_python)
+            for segment in segments
+            if segment.get_name() is not None and segment.get_converter() is not None
+        ]
 
     @classmethod
-    def from_description(cls, description):
+    def from_description(cls, description, converters=CONVERTERS):
         # TODO: for now, assuming that pattern has no braces
         segments = []
         while description:
@@ -72,7 +150,7 @@ class Path:
             description = description[len(segment_text):]
 
             if segment_text.startswith('{'):
-                segment = NamedPathSegment.from_description(segment_text[1:-1])
+                segment = NamedPathSegment.from_description(segment_text[1:-1], converters)
             else:
                 segment = PathSegment(segment_text)
             segments.append(segment)
@@ -81,6 +159,24 @@ class Path:
     def build_path(self, values):
         return ''.join(segment.build_path(values) for segment in self._segments)
 
+    def get_segments(self):
+        return self._segments
+
+    def get_names(self):
+        return [segment.get_name() for segment in self._segments if segment.get_name()]
+
+    def has_converters(self):
+        return bool(self._to_python)
+
+    def convert(self, values):
+        """ Converts matched text (in place) using the segments' converters.
+
+        May raise ValueError if a converter rejects the text.
+        """
+        for name, to_python in self._to_python:
+            values[name] = to_python(values[name])
+        return values
+
     def matches(self, path):
         matched_values = {}
         path_tail = path
@@ -96,41 +192,591 @@ class Path:
             return (False, {})
         return (True, matched_values)
 
+class PathBuilder:
+    """ Builds paths for a single route.
+
+    The literal parts of the path are compiled into a format string up front, so
+    building a path is one format call after checking the values.
+    """
+    __slots__ = ('_segments', '_format', '_static_path')
+
+    def __init__(self, path):
+        template_parts = []
+        self._segments = []
+        for segment in path.get_segments():
+            if segment.get_name() is None:
+                text = segment.build_path({})
+                template_parts.append(text.replace('{', '{{').replace('}', '}}'))
+            else:
+                template_parts.append('{}')
+                self._segments.append(
+                    (segment.get_name(), segment.get_pattern(), segment.get_to_url())
+                )
+        self._format = ''.join(template_parts).format
+        self._static_path = None if self._segments else self._format()
+
+    def build(self, values):
+        """ Builds the path, raising MissingValueException or BadValueException if the
+        values don't fit the route.
+
+        A value fits if dispatching would capture exactly that value from the path.
+        """
+        if self._static_path is not None:
+            return self._static_path
+
+        strings = []
+        for name, pattern, to_url in self._segments:
+            try:
+                string = to_url(values[name])
+            except KeyError:
+                raise MissingValueException('Missing value for {}'.format(name)) from None
+            match = pattern.match(string)
+            if match is None or match.end() != len(string) or not string:
+                raise BadValueException(
+                    'Value for {} does not match the pattern: {!r}'.format(name, string)
+                )
+            strings.append(string)
+        return self._format(*strings)
+
+    def build_many(self, values_list):
+        """ Builds a path for each set of values """
+        build = self.build
+        return [build(values) for values in values_list]
+
 class Routes:
     def __init__(self):
         self._routes = []
         self._names = set()
+        self._converters = dict(CONVERTERS)
+        self._registrations = []
+
+    def add_converter(self, name, pattern, to_python, to_url=str):
+        """ Lets routes added afterwards use {segment_name:name}.
 
-    def add_route(self, name, method, path_description):
+        The pattern should only match text that to_python accepts.
+        """
+        self._converters[name] = Converter(re.compile(pattern), to_python, to_url)
+        self._registrations.append(('converter', name, pattern))
+
+    def add_route(self, name, method, path_description, host=None, content_type=None):
+        """ Adds a route, and returns it.
+
+        host         - only match requests for this host (see `Route`)
+        content_type - only match requests with this Content-Type
+        """
         if name in self._names:
             raise Exception('duplicate route name: {}'.format(name)) # TODO: clean up name
         # TODO: raise an exception if name, path, or method is not valid
-        path = Path.from_description(path_description)
-        self._routes.append(Route(name, path, method))
+        path = Path.from_description(path_description, self._converters)
+        if host is not None:
+            parse_host(host)
+        if content_type is not None:
+            content_type = content_type.lower()
+        route = Route(name, path, method, host, content_type)
+        self._routes.append(route)
         self._names.add(name)
+        self._registrations.append(
+            ('route', name, method, path_description, host, content_type)
+        )
+        return route
 
-    def get_routing(self):
-        return Routing([route for route in self._routes])
+    def registrations(self):
+        """ Returns the converters and routes added, in order """
+        return tuple(self._registrations)
+
+    def get_routing(self, engine='trie', cache_size=0, cache_named_routes=False):
+        """ Builds the Routing for the routes added so far.
+
+        engine             - the name of the dispatcher to use (one of the keys of
+                             DISPATCHERS)
+        cache_size         - if positive, cache this many dispatch results (see
+                             CachingDispatcher)
+        cache_named_routes - also cache paths that match routes with named segments
+        """
+        if engine not in DISPATCHERS:
+            raise RoutingException('Unknown dispatch engine: {}'.format(engine))
+        routes = [route for route in self._routes]
+        dispatcher = PartitionedDispatcher(routes, DISPATCHERS[engine])
+        if cache_size > 0:
+            dispatcher = CachingDispatcher(dispatcher, cache_size, cache_named_routes)
+        return Routing(routes, dispatcher)
+
+# Splits literal text into pieces that each end with a slash (except maybe the last)
+LITERAL_PIECE_RE = re.compile(r'[^/]*/|[^/]+')
+
+class LinearDispatcher:
+    """ Finds routes by trying each one in order. """
+    def __init__(self, routes):
+        self._routes = routes
+
+    def dispatch(self, path_string, method):
+        for route in self._routes:
+            if method == route.method:
+                matches, values = route.path.matches(path_string)
+                if matches:
+                    return route.name, values
+        return None, None
+
+class _TrieEdge:
+    """ An edge to a node that is found by matching at a position, rather than by
+    looking up the next piece of the path in a dict.
+    """
+    __slots__ = ('name', 'pattern', 'text', 'node')
+
+    def __init__(self, name, pattern, text, node):
+        self.name = name
+        self.pattern = pattern
+        self.text = text
+        self.node = node
+
+    def match(self, path_string, pos):
+        """ Returns the position after the match, or -1 if it doesn't match """
+        if self.pattern is None:
+            if path_string.startswith(self.text, pos):
+                return pos + len(self.text)
+            return -1
+        match = self.pattern.match(path_string, pos)
+        # An empty match doesn't count as a match (the same as Path.matches)
+        if match and match.end() > pos:
+            return match.end()
+        return -1
+
+class _TrieNode:
+    __slots__ = ('min_index', 'route', 'static', 'dynamic', '_dynamic_by_key')
+
+    def __init__(self, min_index):
+        # The smallest index of any route that goes through this node
+        self.min_index = min_index
+        # (index, name) of the first route that ends at this node
+        self.route = None
+        # Literal pieces ending in a slash (or at the end of the path) -> node
+        self.static = {}
+        # Named segments and other literal text, tried in order
+        self.dynamic = []
+        self._dynamic_by_key = {}
+
+    def add_static(self, text, index):
+        if text not in self.static:
+            self.static[text] = _TrieNode(index)
+        return self.static[text]
+
+    def add_dynamic(self, key, name, pattern, text, index):
+        if key not in self._dynamic_by_key:
+            edge = _TrieEdge(name, pattern, text, _TrieNode(index))
+            self._dynamic_by_key[key] = edge
+            self.dynamic.append(edge)
+        return self._dynamic_by_key[key].node
+
+    def find(self, path_string, pos, limit):
+        """ Finds the route with the smallest index (below limit) that matches the
+        rest of the path.
+
+        Returns (index, name, values), or None if no route matches.
+        """
+        best = None
+        if self.route is not None and pos == len(path_string) and self.route[0] < limit:
+            best = (self.route[0], self.route[1], {})
+            limit = self.route[0]
+
+        if self.static:
+            slash = path_string.find('/', pos)
+            piece = path_string[pos:] if slash < 0 else path_string[pos:slash + 1]
+            child = self.static.get(piece)
+            if child is not None and child.min_index < limit:
+                found = child.find(path_string, pos + len(piece), limit)
+                if found is not None:
+                    best = found
+                    limit = found[0]
+
+        # The edges were added in route order, so later ones can't beat the limit
+        for edge in self.dynamic:
+            if edge.node.min_index >= limit:
+                break
+            end = edge.match(path_string, pos)
+            if end < 0:
+                continue
+            found = edge.node.find(path_string, end, limit)
+            if found is not None:
+                if edge.name is not None:
+                    found[2].setdefault(edge.name, path_string[pos:end])
+                best = found
+                limit = found[0]
+
+        return best
+
+class TrieDispatcher:
+    """ Finds routes using a tree of path segments for each method.
+
+    Literal text is split into pieces ending in a slash, which are looked up in a dict.
+    Named segments (and literal text that runs into a named segment) are tried in order.
+    This returns the same route that LinearDispatcher would: the first one added.
+    """
+    def __init__(self, routes):
+        self._roots = {}
+        self._num_routes = len(routes)
+        for index, (name, path, method, _, _) in enumerate(routes):
+            if method not in self._roots:
+                self._roots[method] = _TrieNode(index)
+            self._add_route(self._roots[method], index, name, path)
+
+    @staticmethod
+    def _add_route(node, index, name, path):
+        segments = path.get_segments()
+        for i, segment in enumerate(segments):
+            is_last_segment = i == len(segments) - 1
+            if segment.get_name() is not None:
+                pattern = segment.get_pattern()
+                key = ('named', segment.get_name(), pattern.pattern, pattern.flags)
+                node = node.add_dynamic(key, segment.get_name(), pattern, None, index)
+                continue
+
+            pieces = LITERAL_PIECE_RE.findall(segment.build_path({}))
+            for j, piece in enumerate(pieces):
+                is_last_piece = is_last_segment and j == len(pieces) - 1
+                if piece.endswith('/') or is_last_piece:
+                    node = node.add_static(piece, index)
+                else:
+                    node = node.add_dynamic(('literal', piece), None, None, piece, index)
+
+        if node.route is None:
+            node.route = (index, name)
+
+    def dispatch(self, path_string, method):
+        root = self._roots.get(method)
+        if root is None:
+            return None, None
+        found = root.find(path_string, 0, self._num_routes)
+        if found is None:
+            return None, None
+        return found[1], found[2]
+
+# Atomic groups (Python 3.11+) stop the regex from backtracking into a named segment,
+# which matches how Path.matches takes the first match for each segment
+ATOMIC_GROUPS = sys.version_info >= (3, 11)
+INLINE_FLAGS_RE = re.compile(r'^\(\?[aiLmsux]+\)')
+REGEX_FLAGS = [(re.IGNORECASE, 'i'), (re.MULTILINE, 'm'), (re.DOTALL, 's'), (re.VERBOSE, 'x')]
+
+def _inline_pattern(pattern, group_name):
+    """ Turns a named segment's compiled pattern into a named group that can be
+    embedded in a larger regex.
+    """
+    source = INLINE_FLAGS_RE.sub('', pattern.pattern)
+    flags = ''.join(letter for flag, letter in REGEX_FLAGS if pattern.flags & flag)
+    if flags:
+        source = '(?{}:{})'.format(flags, source)
+    group = '(?P<{}>{})'.format(group_name, source)
+    if ATOMIC_GROUPS:
+        group = '(?>{})'.format(group)
+    return group
+
+class RegexDispatcher:
+    """ Finds routes by compiling the routes for each method into alternation regexes.
+
+    Each route becomes a named group in an alternation, so the regex engine tries the
+    routes in order and `lastgroup` says which one matched. Named segment patterns are
+    inlined, so they can't use numbered backreferences or their own group names.
+
+    The regex engine saves every group's position for each alternative it tries, which
+    makes one huge alternation slow, so the routes are split into chunks of CHUNK_SIZE.
+
+    A named segment that matches the empty string doesn't count as a match (see
+    `Path.matches`), which a regex can't express. When a route matches that way, the
+    path is dispatched by a TrieDispatcher instead (built the first time it's needed).
+    """
+    CHUNK_SIZE = 20
 
-class Routing:
     def __init__(self, routes):
         self._routes = routes
+        self._fallback = None
+        alternatives = collections.defaultdict(list)
+        # route group name -> (route name, [(segment group name, segment name)])
+        self._route_groups = {}
+        for index, (name, path, method, _, _) in enumerate(routes):
+            route_group = 'r{}'.format(index)
+            parts = []
+            segment_groups = []
+            for segment_index, segment in enumerate(path.get_segments()):
+                if segment.get_name() is None:
+                    parts.append(re.escape(segment.build_path({})))
+                else:
+                    segment_group = 'r{}_{}'.format(index, segment_index)
+                    parts.append(_inline_pattern(segment.get_pattern(), segment_group))
+                    segment_groups.append((segment_group, segment.get_name()))
+            alternatives[method].append(r'(?P<{}>{})\Z'.format(route_group, ''.join(parts)))
+            self._route_groups[route_group] = (name, segment_groups)
+
+        self._regexes = {
+            method: [
+                re.compile('|'.join(method_alternatives[i:i + self.CHUNK_SIZE]))
+                for i in range(0, len(method_alternatives), self.CHUNK_SIZE)
+            ]
+            for method, method_alternatives in alternatives.items()
+        }
+
+    def dispatch(self, path_string, method):
+        for regex in self._regexes.get(method, ()):
+            match = regex.match(path_string)
+            if match is not None:
+                name, values = self._get_route(match)
+                if name is None:
+                    return self._dispatch_fallback(path_string, method)
+                return name, values
+        return None, None
+
+    def _get_route(self, match):
+        """ Returns (route name, values), or (None, None) if a segment matched the
+        empty string
+        """
+        name, segment_groups = self._route_groups[match.lastgroup]
+        values = {}
+        for segment_group, segment_name in segment_groups:
+            value = match.group(segment_group)
+            if not value:
+                return None, None
+            values[segment_name] = value
+        return name, values
+
+    def _dispatch_fallback(self, path_string, method):
+        if self._fallback is None:
+            self._fallback = TrieDispatcher(self._routes)
+        return self._fallback.dispatch(path_string, method)
+
+class PartitionedDispatcher:
+    """ Splits the routes into partitions by method, host and content type, and builds
+    a dispatcher (of the given class) for each one.
+
+    Dispatching looks up the partitions for the request in dicts before matching the
+    path, so the cost doesn't grow with the number of methods or hosts. A route for a
+    particular host or content type takes precedence over one for any: partitions are
+    tried from the most specific (exact host, then {subdomain} host, then any host;
+    the request's content type, then any) and the first route that matches wins.
+    Within a partition, the first route added wins, as usual.
+    """
+    def __init__(self, routes, dispatcher_class):
+        partitions = collections.defaultdict(list)
+        # (host key, content type) -> the methods that have routes
+        self._methods = collections.defaultdict(list)
+        # route name -> the segment name for the subdomain of its host
+        self._subdomain_names = {}
+        for route in routes:
+            host_key = None
+            if route.host is not None:
+                segment_name, host = parse_host(route.host)
+                host_key = ('*' if segment_name else '=', host)
+                if segment_name:
+                    self._subdomain_names[route.name] = segment_name
+            partitions[(host_key, route.content_type, route.method)].append(route)
+            methods = self._methods[(host_key, route.content_type)]
+            if route.method not in methods:
+                methods.append(route.method)
+
+        self._partitions = dict(partitions)
+        self._dispatchers = {
+            key: dispatcher_class(partition) for key, partition in partitions.items()
+        }
+        self._by_host = any(route.host is not None for route in routes)
+        self._by_content_type = any(route.content_type is not None for route in routes)
+
+    def dispatch(self, path_string, method, host=None, content_type=None):
+        if not (self._by_host or self._by_content_type):
+            # Only partitioned by method
+            dispatcher = self._dispatchers.get((None, None, method))
+            if dispatcher is None:
+                return None, None
+            return dispatcher.dispatch(path_string, method)
+
+        for host_key, subdomain in self._host_keys(host):
+            for content_key in self._content_keys(content_type):
+                dispatcher = self._dispatchers.get((host_key, content_key, method))
+                if dispatcher is None:
+                    continue
+                name, values = dispatcher.dispatch(path_string, method)
+                if name is not None:
+                    segment_name = self._subdomain_names.get(name)
+                    if segment_name is not None:
+                        values = dict(values or {})
+                        values[segment_name] = subdomain
+                    return name, values
+        return None, None
+
+    def matching_routes(self, path_string, method, host=None, content_type=None):
+        """ Yields (route name, values) for every route that matches, in the order
+        `dispatch` tries them. Each route's path is matched on its own, so this is much
+        slower than dispatching.
+        """
+        for host_key, subdomain in self._host_keys(host):
+            for content_key in self._content_keys(content_type):
+                for route in self._partitions.get((host_key, content_key, method), ()):
+                    matches, values = route.path.matches(path_string)
+                    if matches:
+                        segment_name = self._subdomain_names.get(route.name)
+                        if segment_name is not None:
+                            values[segment_name] = subdomain
+                        yield route.name, values
+
+    def allowed_methods(self, path_string, host=None, content_type=None):
+        """ Returns the sorted methods that have a route for the path """
+        allowed = set()
+        for host_key, _ in self._host_keys(host):
+            for content_key in self._content_keys(content_type):
+                for method in self._methods.get((host_key, content_key), ()):
+                    if method in allowed:
+                        continue
+                    dispatcher = self._dispatchers[(host_key, content_key, method)]
+                    if dispatcher.dispatch(path_string, method)[0] is not None:
+                        allowed.add(method)
+        return sorted(allowed)
+
+    def _host_keys(self, host):
+        """ Returns the (host key, subdomain) of the partitions for the host, most
+        specific first
+        """
+        if not (self._by_host and host):
+            return [(None, None)]
+        subdomain, _, parent = host.partition('.')
+        return [(('=', host), None), (('*', parent), subdomain), (None, None)]
+
+    def _content_keys(self, content_type):
+        if not (self._by_content_type and content_type):
+            return [None]
+        return [content_type, None]
+
+class CachingDispatcher:
+    """ Remembers the results of another dispatcher in an LRU cache.
+
+    Misses (paths with no route) are cached too. By default, paths that match a route
+    with named segments are not cached, since something like /user/{id} could fill the
+    cache with paths that are each only requested once.
+    """
+    def __init__(self, dispatcher, maxsize, cache_named_routes=False):
+        self._dispatcher = dispatcher
+        self._cache = LRUCache(maxsize)
+        self._cache_named_routes = cache_named_routes
+
+    def dispatch(self, path_string, method, host=None, content_type=None):
+        key = (method, path_string, host, content_type)
+        result = self._cache.get(key)
+        if result is None:
+            result = self._dispatcher.dispatch(path_string, method, host, content_type)
+            name, values = result
+            if name is None or not values or self._cache_named_routes:
+                self._cache.put(key, result)
+        name, values = result
+        if values is not None:
+            # Don't let callers change the cached values
+            values = dict(values)
+        return name, values
+
+    def matching_routes(self, path_string, method, host=None, content_type=None):
+        return self._dispatcher.matching_routes(path_string, method, host, content_type)
+
+    def allowed_methods(self, path_string, host=None, content_type=None):
+        return self._dispatcher.allowed_methods(path_string, host, content_type)
+
+    def cache_info(self):
+        return self._cache.info()
+
+DISPATCHERS = {
+    'linear': LinearDispatcher,
+    'trie': TrieDispatcher,
+    'regex': RegexDispatcher,
+}
+
+class Routing:
+    def __init__(self, routes, dispatcher):
+        self._routes = routes
+        self._dispatcher = dispatcher
         self._routes_by_name = {
             route.name: route
             for route in self._routes
         }
+        # Compiled the first time each route is built, since many routes never are
+        self._path_builders = {}
+        self._converting_paths = {
+            route.name: route.path
+            for route in self._routes
+            if route.path.has_converters()
+        }
 
     def get_names(self):
         return self._routes_by_name.keys()
 
-    def path_to_route(self, path_string, method):
-        for (name, path, route_method) in self._routes:
-            if method == route_method:
-                matches, values = path.matches(path_string)
-                if matches:
-                    return name, values
+    def path_to_route(self, path_string, method, host=None, content_type=None):
+        """ Finds the route for the path and method (and the host and content type, for
+        routes that are limited to them).
+
+        Returns (route name, values of the named segments), or (None, None) if no route
+        matches. Values are converted by the segments' converters (if any). If a
+        converter rejects a value, the next route that matches is tried.
+        """
+        name, values = self._dispatcher.dispatch(path_string, method, host, content_type)
+        if values:
+            path = self._converting_paths.get(name)
+            if path is not None:
+                try:
+                    path.convert(values)
+                except ValueError:
+                    return self._next_converted_match(
+                        name, path_string, method, host, content_type
+                    )
+        return name, values
+
+    def _next_converted_match(self, rejected_name, path_string, method, host,
+                              content_type):
+        """ Finds the first route after the rejected one whose converters accept the
+        values, for the (rare) paths that a converter rejects
+        """
+        routes = self._dispatcher.matching_routes(path_string, method, host, content_type)
+        for name, values in routes:
+            if name == rejected_name:
+                break
+        for name, values in routes:
+            path = self._converting_paths.get(name)
+            if path is None:
+                return name, values
+            try:
+                return name, path.convert(values)
+            except ValueError:
+                continue
         return None, None
 
+    def allowed_methods(self, path_string, host=None, content_type=None):
+        """ Returns the (sorted) methods that have a route for the path, for the Allow
+        header of a 405 response. Like `path_to_route`, a route whose converters reject
+        the path's values doesn't count.
+        """
+        return [
+            method
+            for method in self._dispatcher.allowed_methods(path_string, host, content_type)
+            if self.path_to_route(path_string, method, host, content_type)[0] is not None
+        ]
+
+    def by_host(self):
+        """ Returns True if any route is limited to a host """
+        return any(route.host is not None for route in self._routes)
+
+    def by_content_type(self):
+        """ Returns True if any route is limited to a content type """
+        return any(route.content_type is not None for route in self._routes)
+
+    def cache_info(self):
+        """ Returns the dispatch cache's statistics, or None if there is no cache """
+        if isinstance(self._dispatcher, CachingDispatcher):
+            return self._dispatcher.cache_info()
+        return None
+
+    def _get_path_builder(self, route_name):
+        builder = self._path_builders.get(route_name)
+        if builder is None:
+            route = self._routes_by_name.get(route_name)
+            if route is None:
+                raise RoutingException('Unknown route: {}'.format(route_name))
+            builder = self._path_builders[route_name] = PathBuilder(route.path)
+        return builder
+
     def route_to_path(self, route_name, values):
-        # TODO: throw an exception if route_name is not in
-        return self._routes_by_name[route_name].path.build_path(values)
+        return self._get_path_builder(route_name).build(values)
+
+    def route_to_paths(self, route_name, values_list):
+        """ Builds a path for each set of values, all for the same route """
+        return self._get_path_builder(route_name).build_many(values_list)
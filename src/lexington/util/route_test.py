@@ -41,8 +41,11 @@ class NamedPathSegmentTest(unittest.TestCase):
         self.assertEqual(None, path2.get_match('-x/x'))
 
     def test_build_path(self):
-        # TODO: test case when value is missing and value doesn't match format
         self.assertEqual('1234', self._path_segment.build_path({'user_id': 1234}))
+        with self.assertRaises(route.MissingValueException):
+            self._path_segment.build_path({})
+        with self.assertRaises(route.BadValueException):
+            self._path_segment.build_path({'user_id': '12a'})
 
     def test_get_match(self):
         self.assertEqual('1234', self._path_segment.get_match('1234/xyz/'))
@@ -123,7 +126,315 @@ class RoutingTest(unittest.TestCase):
             self.assertEqual(expected, self._routing.path_to_route(path_string, method))
 
     def test_builds_paths(self):
-        pass
+        self.assertEqual('/help', self._routing.route_to_path('help', {}))
+        self.assertEqual('/user/1234/', self._routing.route_to_path('user_page', {'id': 1234}))
+
+    def test_checks_values_when_building_paths(self):
+        with self.assertRaises(route.MissingValueException):
+            self._routing.route_to_path('user_page', {})
+        for bad_value in ['abc', '12/34', '', '12a']:
+            with self.assertRaises(route.BadValueException):
+                self._routing.route_to_path('user_page', {'id': bad_value})
+
+    def test_rejects_unknown_routes(self):
+        with self.assertRaises(route.RoutingException):
+            self._routing.route_to_path('nope', {})
+
+    def test_builds_many_paths(self):
+        self.assertEqual(
+            ['/user/1/', '/user/2/'],
+            self._routing.route_to_paths('user_page', [{'id': 1}, {'id': 2}])
+        )
+
+    def test_built_paths_round_trip(self):
+        routes = route.Routes()
+        routes.add_route('file', 'GET', r'/files/{name:[a-z]+}.{ext:txt|md}/{rest:.+}')
+        routing = routes.get_routing()
+        values = {'name': 'notes', 'ext': 'md', 'rest': 'a/b'}
+        path = routing.route_to_path('file', values)
+        self.assertEqual('/files/notes.md/a/b', path)
+        self.assertEqual(('file', values), routing.path_to_route(path, 'GET'))
+
+    def test_escapes_braces_in_literals(self):
+        path = route.Path([route.PathSegment('/{x}/'), route.NamedPathSegment.no_pattern('y')])
+        self.assertEqual('/{x}/1', route.PathBuilder(path).build({'y': 1}))
+
+class DispatcherTest(unittest.TestCase):
+    def setUp(self):
+        routes = route.Routes()
+        routes.add_route('user_name', 'GET', '/user/{name}/')
+        routes.add_route('user_me', 'GET', '/user/me/')
+        routes.add_route('user_settings', 'GET', '/user/me/settings')
+        routes.add_route('user_id', 'GET', r'/user/{id:\d+}/items')
+        routes.add_route('versioned', 'GET', r'/v{version:\d+}/info')
+        routes.add_route('text_file', 'GET', r'/files/{name:[a-z]+}.txt')
+        routes.add_route('any_file', 'GET', r'/files/{name:[a-z.]+}')
+        routes.add_route('rest', 'GET', r'/static/{rest:.+}')
+        routes.add_route('anchored', 'GET', r'/u/{id:^\d+}')
+        routes.add_route('root', 'GET', '/')
+        routes.add_route('post_root', 'POST', '/')
+        self._routes = routes._routes
+
+    def test_matches_linear_dispatcher(self):
+        linear = route.LinearDispatcher(self._routes)
+        dispatchers = [
+            route.TrieDispatcher(self._routes),
+            route.RegexDispatcher(self._routes),
+        ]
+        test_cases = [
+            ('/user/fry/', 'GET'),
+            ('/user/me/', 'GET'),
+            ('/user/me/settings', 'GET'),
+            ('/user/123/items', 'GET'),
+            ('/user/abc/items', 'GET'),
+            ('/v2/info', 'GET'),
+            ('/vx/info', 'GET'),
+            ('/files/abc.txt', 'GET'),
+            ('/files/abc.tar', 'GET'),
+            ('/static/css/site.css', 'GET'),
+            ('/u/12', 'GET'),
+            ('/u/x', 'GET'),
+            ('/', 'GET'),
+            ('/', 'POST'),
+            ('/', 'PUT'),
+            ('', 'GET'),
+            ('/nothing/here', 'GET'),
+        ]
+        for dispatcher in dispatchers:
+            for path_string, method in test_cases:
+                self.assertEqual(
+                    linear.dispatch(path_string, method),
+                    dispatcher.dispatch(path_string, method),
+                    path_string
+                )
+
+    def test_empty_segment_is_a_miss(self):
+        routes = route.Routes()
+        routes.add_route('optional', 'GET', '/x/{p:[a-z]*}')
+        routes.add_route('fallback', 'GET', '/x/')
+        routes.add_route('middle', 'GET', '/y/{p:[a-z]*}/z')
+        linear = route.LinearDispatcher(routes._routes)
+        for dispatcher in [
+            route.TrieDispatcher(routes._routes), route.RegexDispatcher(routes._routes)
+        ]:
+            for path_string in ['/x/', '/x/a', '/y//z', '/y/a/z']:
+                self.assertEqual(
+                    linear.dispatch(path_string, 'GET'),
+                    dispatcher.dispatch(path_string, 'GET'),
+                    path_string
+                )
+            self.assertEqual(('fallback', {}), dispatcher.dispatch('/x/', 'GET'))
+
+    def _dispatchers(self):
+        return [route.TrieDispatcher(self._routes), route.RegexDispatcher(self._routes)]
+
+    def test_keeps_first_match(self):
+        for dispatcher in self._dispatchers():
+            self.assertEqual(
+                ('user_name', {'name': 'me'}), dispatcher.dispatch('/user/me/', 'GET')
+            )
+            self.assertEqual(
+                ('user_settings', {}), dispatcher.dispatch('/user/me/settings', 'GET')
+            )
+
+    def test_checks_patterns(self):
+        for dispatcher in self._dispatchers():
+            self.assertEqual(
+                ('user_id', {'id': '123'}), dispatcher.dispatch('/user/123/items', 'GET')
+            )
+            self.assertEqual((None, None), dispatcher.dispatch('/user/abc/items', 'GET'))
+            self.assertEqual(
+                ('versioned', {'version': '2'}), dispatcher.dispatch('/v2/info', 'GET')
+            )
+            self.assertEqual(('rest', {'rest': 'a/b'}), dispatcher.dispatch('/static/a/b', 'GET'))
+
+    def test_regex_escapes_literals(self):
+        routes = route.Routes()
+        routes.add_route('dotted', 'GET', '/a.b/(c)')
+        dispatcher = route.RegexDispatcher(routes._routes)
+        self.assertEqual(('dotted', {}), dispatcher.dispatch('/a.b/(c)', 'GET'))
+        self.assertEqual((None, None), dispatcher.dispatch('/axb/(c)', 'GET'))
+
+    def test_regex_keeps_pattern_flags(self):
+        routes = route.Routes()
+        routes.add_route('shout', 'GET', '/{word:(?i)[a-z]+}!')
+        dispatcher = route.RegexDispatcher(routes._routes)
+        self.assertEqual(('shout', {'word': 'HEY'}), dispatcher.dispatch('/HEY!', 'GET'))
+
+    def test_get_routing_selects_engine(self):
+        routes = route.Routes()
+        routes.add_route('help', 'GET', '/help')
+        for engine in route.DISPATCHERS:
+            routing = routes.get_routing(engine=engine)
+            self.assertEqual(('help', {}), routing.path_to_route('/help', 'GET'))
+        with self.assertRaises(route.RoutingException):
+            routes.get_routing(engine='magic')
+
+class ConverterTest(unittest.TestCase):
+    def setUp(self):
+        self._routes = route.Routes()
+        self._routes.add_converter('hex', '[0-9a-f]+', lambda text: int(text, 16), '{:x}'.format)
+        self._routes.add_route('item', 'GET', '/items/{id:int}')
+        self._routes.add_route('page', 'GET', '/pages/{slug}')
+        self._routes.add_route('file', 'GET', '/files/{rest:path}')
+        self._routes.add_route('color', 'GET', '/colors/{value:hex}')
+
+    def test_converts_values(self):
+        for engine in route.DISPATCHERS:
+            routing = self._routes.get_routing(engine=engine)
+            self.assertEqual(('item', {'id': 42}), routing.path_to_route('/items/42', 'GET'))
+            self.assertEqual(('page', {'slug': 'a-b'}), routing.path_to_route('/pages/a-b', 'GET'))
+            self.assertEqual(
+                ('file', {'rest': 'a/b.txt'}), routing.path_to_route('/files/a/b.txt', 'GET')
+            )
+            self.assertEqual(('color', {'value': 255}), routing.path_to_route('/colors/ff', 'GET'))
+
+    def test_patterns_reject_bad_values(self):
+        for engine in route.DISPATCHERS:
+            routing = self._routes.get_routing(engine=engine)
+            self.assertEqual((None, None), routing.path_to_route('/items/abc', 'GET'))
+            self.assertEqual((None, None), routing.path_to_route('/pages/a/b', 'GET'))
+            self.assertEqual((None, None), routing.path_to_route('/colors/fg', 'GET'))
+
+    def test_failed_conversion_is_a_miss(self):
+        self._routes.add_converter('odd', r'\d+', self._odd)
+        self._routes.add_route('odd', 'GET', '/odd/{n:odd}')
+        routing = self._routes.get_routing()
+        self.assertEqual(('odd', {'n': 3}), routing.path_to_route('/odd/3', 'GET'))
+        self.assertEqual((None, None), routing.path_to_route('/odd/4', 'GET'))
+        self.assertEqual(['GET'], routing.allowed_methods('/odd/3'))
+        self.assertEqual([], routing.allowed_methods('/odd/4'))
+
+    def test_failed_conversion_tries_later_routes(self):
+        self._routes.add_converter('odd', r'\d+', self._odd)
+        self._routes.add_route('odd', 'GET', '/n/{n:odd}')
+        self._routes.add_route('any', 'GET', '/n/{s}')
+        for engine in route.DISPATCHERS:
+            for cache_size in [0, 10]:
+                routing = self._routes.get_routing(engine=engine, cache_size=cache_size)
+                for _ in range(2):
+                    self.assertEqual(('odd', {'n': 3}), routing.path_to_route('/n/3', 'GET'))
+                    self.assertEqual(('any', {'s': '4'}), routing.path_to_route('/n/4', 'GET'))
+
+    def test_converts_cached_values(self):
+        routing = self._routes.get_routing(cache_size=10, cache_named_routes=True)
+        for _ in range(2):
+            self.assertEqual(('item', {'id': 42}), routing.path_to_route('/items/42', 'GET'))
+
+    def test_builds_paths_with_to_url(self):
+        routing = self._routes.get_routing()
+        self.assertEqual('/items/42', routing.route_to_path('item', {'id': 42}))
+        self.assertEqual('/colors/ff', routing.route_to_path('color', {'value': 255}))
+        with self.assertRaises(route.BadValueException):
+            routing.route_to_path('item', {'id': 'abc'})
+
+    def test_unknown_spec_is_a_regex(self):
+        path = route.Path.from_description('/{code:[A-Z]+}')
+        self.assertEqual((True, {'code': 'ABC'}), path.matches('/ABC'))
+        self.assertFalse(path.has_converters())
+
+    @staticmethod
+    def _odd(text):
+        n = int(text)
+        if n % 2 == 0:
+            raise ValueError('not odd')
+        return n
+
+class PartitionedDispatcherTest(unittest.TestCase):
+    def setUp(self):
+        routes = route.Routes()
+        routes.add_route('tenant_home', 'GET', '/', host='{tenant}.example.com')
+        routes.add_route('admin_home', 'GET', '/', host='admin.example.com')
+        routes.add_route('home', 'GET', '/')
+        routes.add_route('item', 'GET', r'/items/{id:\d+}')
+        routes.add_route('update_item', 'PUT', r'/items/{id:\d+}')
+        routes.add_route('upload_json', 'POST', '/upload', content_type='Application/JSON')
+        routes.add_route('upload', 'POST', '/upload')
+        self._routes = routes
+
+    def test_finds_most_specific_partition(self):
+        for engine in route.DISPATCHERS:
+            routing = self._routes.get_routing(engine=engine)
+            test_cases = [
+                (('admin_home', {}), 'admin.example.com', None),
+                (('tenant_home', {'tenant': 'acme'}), 'acme.example.com', None),
+                (('home', {}), 'example.com', None),
+                (('home', {}), 'a.b.example.com', None),
+                (('home', {}), None, None),
+            ]
+            for expected, host, content_type in test_cases:
+                self.assertEqual(
+                    expected, routing.path_to_route('/', 'GET', host, content_type), host
+                )
+            self.assertEqual(
+                ('item', {'id': '1'}),
+                routing.path_to_route('/items/1', 'GET', 'x.example.com')
+            )
+
+    def test_content_types(self):
+        routing = self._routes.get_routing()
+        self.assertEqual(
+            ('upload_json', {}),
+            routing.path_to_route('/upload', 'POST', None, 'application/json')
+        )
+        self.assertEqual(
+            ('upload', {}), routing.path_to_route('/upload', 'POST', None, 'text/plain')
+        )
+        self.assertEqual(('upload', {}), routing.path_to_route('/upload', 'POST'))
+
+    def test_allowed_methods(self):
+        routing = self._routes.get_routing(cache_size=10)
+        self.assertEqual(['GET', 'PUT'], routing.allowed_methods('/items/1'))
+        self.assertEqual(['POST'], routing.allowed_methods('/upload', 'x.example.com'))
+        self.assertEqual([], routing.allowed_methods('/nope'))
+
+    def test_cache_keys_on_host(self):
+        routing = self._routes.get_routing(cache_size=10, cache_named_routes=True)
+        for _ in range(2):
+            for tenant in ['a', 'b']:
+                self.assertEqual(
+                    ('tenant_home', {'tenant': tenant}),
+                    routing.path_to_route('/', 'GET', tenant + '.example.com')
+                )
+
+    def test_rejects_bad_hosts(self):
+        with self.assertRaises(route.RoutingException):
+            self._routes.add_route('bad', 'GET', '/', host='{a}.{b}.example.com')
+
+class CachingDispatcherTest(unittest.TestCase):
+    def setUp(self):
+        routes = route.Routes()
+        routes.add_route('help', 'GET', '/help')
+        routes.add_route('user_page', 'GET', r'/user/{id:\d+}/')
+        self._routes = routes
+
+    def test_caches_static_routes_and_misses(self):
+        routing = self._routes.get_routing(cache_size=10)
+        for _ in range(2):
+            self.assertEqual(('help', {}), routing.path_to_route('/help', 'GET'))
+            self.assertEqual((None, None), routing.path_to_route('/nope', 'GET'))
+            self.assertEqual(
+                ('user_page', {'id': '1'}), routing.path_to_route('/user/1/', 'GET')
+            )
+        info = routing.cache_info()
+        self.assertEqual(2, info.hits)
+        self.assertEqual(2, info.currsize)
+
+    def test_can_cache_named_routes(self):
+        routing = self._routes.get_routing(cache_size=10, cache_named_routes=True)
+        routing.path_to_route('/user/1/', 'GET')
+        values = routing.path_to_route('/user/1/', 'GET')[1]
+        values['id'] = 'changed'
+        self.assertEqual(('user_page', {'id': '1'}), routing.path_to_route('/user/1/', 'GET'))
+        self.assertEqual(2, routing.cache_info().hits)
+
+    def test_keys_on_method(self):
+        routing = self._routes.get_routing(cache_size=10)
+        self.assertEqual(('help', {}), routing.path_to_route('/help', 'GET'))
+        self.assertEqual((None, None), routing.path_to_route('/help', 'POST'))
+
+    def test_no_cache_by_default(self):
+        self.assertEqual(None, self._routes.get_routing().cache_info())
 
 if __name__ == '__main__':
     unittest.main()
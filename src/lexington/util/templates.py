@@ -0,0 +1,82 @@
+"""
+Rendering Jinja templates, with one environment shared by all requests
+"""
+
+import jinja2
+
+from lexington.util import di
+
+def make_environment(templates, bytecode_cache=True, precompile=False, **options):
+    """ Builds a Jinja environment.
+
+    templates      - a jinja2 loader, or the path of a directory of templates
+    bytecode_cache - True to keep compiled templates in Jinja's default directory (under
+                     the system's temporary directory), the path of a directory to keep
+                     them there instead, or False to not keep them. With a bytecode
+                     cache, a restarted process loads templates without compiling them.
+    precompile     - if True, every template is loaded now rather than on the first
+                     request that renders it
+    options        - passed on to jinja2.Environment
+    """
+    if isinstance(templates, jinja2.BaseLoader):
+        loader = templates
+    else:
+        loader = jinja2.FileSystemLoader(templates)
+
+    if bytecode_cache is True:
+        options['bytecode_cache'] = jinja2.FileSystemBytecodeCache()
+    elif bytecode_cache:
+        options['bytecode_cache'] = jinja2.FileSystemBytecodeCache(bytecode_cache)
+
+    if precompile:
+        # Never evict a template that was loaded up front
+        options.setdefault('cache_size', -1)
+    environment = jinja2.Environment(loader=loader, **options)
+    if precompile:
+        load_all(environment)
+    return environment
+
+def load_all(environment):
+    """ Loads (compiling, if needed) every template the environment's loader can list.
+
+    Returns the number of templates loaded.
+    """
+    names = environment.list_templates()
+    for name in names:
+        environment.get_template(name)
+    return len(names)
+
+def make_render(jinja_env, respond):
+    def render(template_name, values=None, stream=False, status=200,
+               mimetype='text/html'):
+        """ Renders a template into a response.
+
+        stream - if True, the response body is produced a piece at a time (with
+                 Template.generate) as the server sends it, instead of all at once
+        """
+        template = jinja_env.get_template(template_name)
+        if values is None:
+            values = {}
+        if stream:
+            body = template.generate(**values)
+        else:
+            body = template.render(**values)
+        return respond(body, status=status, mimetype=mimetype)
+    return render
+
+def register_all(dependencies, templates, bytecode_cache=True, precompile=False,
+                 **options):
+    """ Registers `jinja_env`, the shared Jinja environment, and `render`, a function
+    that renders a template into a response.
+
+    Both are singletons, so the environment (and with `precompile`, every template) is
+    built when the application is created. See `make_environment` for the arguments.
+    """
+    dependencies.register_factory(
+        'jinja_env',
+        lambda: make_environment(templates, bytecode_cache, precompile, **options),
+        scope=di.SINGLETON
+    )
+    dependencies.register_factory(
+        'render', make_render, ['jinja_env', 'respond'], scope=di.SINGLETON
+    )
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+import unittest
+
+import jinja2
+from werkzeug.wrappers import Response
+
+from lexington.util import di
+from lexington.util import templates
+
+TEMPLATES = {
+    'hello.html': 'Hello, {{ name }}!',
+    'list.html': '{% for item in items %}<li>{{ item }}</li>{% endfor %}',
+}
+
+class CountingLoader(jinja2.DictLoader):
+    def __init__(self, mapping):
+        super().__init__(mapping)
+        self.loads = 0
+
+    def get_source(self, environment, template):
+        self.loads += 1
+        return super().get_source(environment, template)
+
+class TemplatesTest(unittest.TestCase):
+    def setUp(self):
+        self.loader = CountingLoader(TEMPLATES)
+
+    def _plan(self, **options):
+        dependencies = di.Dependencies()
+        dependencies.register_value('respond', Response)
+        templates.register_all(dependencies, self.loader, bytecode_cache=False, **options)
+        plan = dependencies.compile()
+        plan.warm()
+        return plan
+
+    def test_renders(self):
+        render = self._plan().build_injector().get_dependency('render')
+        response = render('hello.html', {'name': 'you'})
+        self.assertEqual(b'Hello, you!', response.get_data())
+        self.assertEqual('text/html', response.mimetype)
+        self.assertFalse(response.is_streamed)
+
+    def test_streams(self):
+        render = self._plan().build_injector().get_dependency('render')
+        response = render('list.html', {'items': [1, 2]}, stream=True, status=201)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(201, response.status_code)
+        self.assertEqual(b'<li>1</li><li>2</li>', response.get_data())
+
+    def test_shares_environment(self):
+        plan = self._plan()
+        plan.build_injector().get_dependency('render')('hello.html')
+        plan.build_injector().get_dependency('render')('hello.html')
+        self.assertEqual(1, self.loader.loads)
+
+    def test_precompiles(self):
+        plan = self._plan(precompile=True)
+        self.assertEqual(2, self.loader.loads)
+        plan.build_injector().get_dependency('render')('list.html')
+        self.assertEqual(2, self.loader.loads)
+
+    def test_bytecode_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            templates.make_environment(self.loader, directory, precompile=True)
+            self.assertEqual(2, len(os.listdir(directory)))
+            environment = templates.make_environment(self.loader, directory)
+            cache = environment.bytecode_cache
+            bucket = cache.get_bucket(environment, 'hello.html', None, TEMPLATES['hello.html'])
+            self.assertIsNotNone(bucket.code)
+
+    def test_loads_directory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'a.txt'), 'w') as f:
+                f.write('{{ 1 + 1 }}')
+            environment = templates.make_environment(directory, bytecode_cache=False)
+            self.assertEqual(1, templates.load_all(environment))
+            self.assertEqual('2', environment.get_template('a.txt').render())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,13 +4,32 @@ A mapping between routes and views
 
 import collections
 
-class View(collections.namedtuple('View', 'fn route_name dependencies')):
+from lexington.util.di import is_async_function
+
+# cache_vary - if not None, the names of the dependencies that the view's response
+#              depends on, which lets the application cache the response (see
+#              response_cache.ResponseCache)
+# validator  - if not None, the name of a (cheap) dependency whose value changes
+#              whenever the response would, like a version number or a modification
+#              time. It is used to answer conditional GET requests with 304 Not Modified
+#              without calling the view (see responses.is_not_modified).
+class View(collections.namedtuple('View', 'fn route_name dependencies cache_vary validator',
+                                  defaults=[None, None])):
+    __slots__ = ()
+
     def __call__(self, *args):
         return self.fn(*args)
 
-def view(route_name, dependencies):
+    def all_dependencies(self):
+        """ Returns the names of everything the application may build for the view """
+        names = list(self.dependencies) + list(self.cache_vary or [])
+        if self.validator is not None:
+            names.append(self.validator)
+        return names
+
+def view(route_name, dependencies, cache_vary=None, validator=None):
     def view_wrapper(view_fn):
-        return View(view_fn, route_name, dependencies)
+        return View(view_fn, route_name, dependencies, cache_vary, validator)
     return view_wrapper
 
 # FIXME: should inherit from base exception
@@ -27,19 +46,42 @@ class ViewMapFactory:
             raise ViewMapException('View already assigned for route {}'.format(route_name))
         self._route_to_view[route_name] = view
 
-    def create(self, valid_route_names, provided_dependencies):
+    def views(self):
+        """ Returns (route name, view) for each view """
+        return self._route_to_view.items()
+
+    def registrations(self):
+        """ Returns a description of the views (without the functions themselves), in
+        the order they were added
+        """
+        return [
+            (
+                route_name, view.dependencies, view.cache_vary, view.validator,
+                is_async_function(view.fn)
+            )
+            for route_name, view in self._route_to_view.items()
+        ]
+
+    def create(self, valid_route_names, provided_dependencies, check=True):
+        """ Checks the views and builds a ViewMap.
+
+        check - set to False to skip the checks for views that are known to be valid
+        """
+        if check:
+            self._check_views(valid_route_names, provided_dependencies)
+        return ViewMap(self._route_to_view)
+
+    def _check_views(self, valid_route_names, provided_dependencies):
         for route_name, view in self._route_to_view.items():
             if route_name not in valid_route_names:
                 raise ViewMapException('View mapped to nonexistant route {}'.format(route_name))
-            for dependency in view.dependencies:
+            for dependency in view.all_dependencies():
                 if dependency not in provided_dependencies:
                     raise ViewMapException(
                         'View mapped to route depends on nonexistant dependency: {}'
                         .format(dependency)
                     )
 
-        return ViewMap(self._route_to_view)
-
 class ViewMap:
     def __init__(self, route_to_view):
         """ This class should be constructed using ViewMapFactory